@@ -0,0 +1,32 @@
+"""add_prompt_list_order_index
+
+Revision ID: 5f2a9c7e1b43
+Revises: d33fd0df882b
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5f2a9c7e1b43"
+down_revision = "d33fd0df882b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Составной индекс для keyset пагинации (только неудаленные промпты)
+    op.create_index(
+        "idx_prompt_list_order",
+        "prompts",
+        ["is_pinned", "created_at", "id"],
+        unique=False,
+        sqlite_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_prompt_list_order", table_name="prompts")
@@ -0,0 +1,34 @@
+"""add_sync_state
+
+Revision ID: 8c1d4e6f2a90
+Revises: 5f2a9c7e1b43
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c1d4e6f2a90"
+down_revision = "5f2a9c7e1b43"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Отметка последнего синхронизированного сообщения для каждого канала
+    op.create_table(
+        "sync_state",
+        sa.Column("channel_id", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("last_message_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("channel_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sync_state")
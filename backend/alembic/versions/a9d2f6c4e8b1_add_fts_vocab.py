@@ -0,0 +1,24 @@
+"""add_fts_vocab
+
+Revision ID: a9d2f6c4e8b1
+Revises: f1c7a3e9d5b2
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a9d2f6c4e8b1"
+down_revision = "f1c7a3e9d5b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Словарь терминов FTS5 индекса для подсказок поиска (термин, количество промптов, вхождений)
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts_vocab USING fts5vocab(prompts_fts, row)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS prompts_fts_vocab")
@@ -0,0 +1,52 @@
+"""narrow_fts_update_triggers
+
+Триггеры обновления prompts_fts и prompts_trigram срабатывают только при изменении индексируемых
+столбцов и deleted_at (закрепление, updated_at и прочие столбцы больше не переписывают строку индекса)
+
+Revision ID: b2e7d4a9f1c6
+Revises: d8f3a1c6e9b4
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b2e7d4a9f1c6"
+down_revision = "d8f3a1c6e9b4"
+branch_labels = None
+depends_on = None
+
+DELETE_SQL = """
+    INSERT INTO {table}({table}, rowid, {columns})
+    SELECT 'delete', id, {columns} FROM prompts_fts_content WHERE id = old.id;
+"""
+INSERT_SQL = """
+    INSERT INTO {table}(rowid, {columns})
+    SELECT id, {columns} FROM prompts_fts_content WHERE id = new.id;
+"""
+
+# (индекс, индексируемые столбцы, столбцы prompts, изменение которых обновляет индекс)
+INDEXES = (
+    ("prompts_fts", "text, normalized_text, tags", "text, normalized_text, deleted_at"),
+    ("prompts_trigram", "normalized_text", "normalized_text, deleted_at"),
+)
+
+
+def _recreate_update_triggers(narrow: bool) -> None:
+    for table, columns, update_columns in INDEXES:
+        event = f"UPDATE OF {update_columns} ON prompts" if narrow else "UPDATE ON prompts"
+        for name, timing, body in (
+            (f"{table}_before_update", "BEFORE", DELETE_SQL),
+            (f"{table}_update", "AFTER", INSERT_SQL),
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+            op.execute(f"CREATE TRIGGER {name} {timing} {event} BEGIN {body.format(table=table, columns=columns)} END")
+
+
+def upgrade() -> None:
+    _recreate_update_triggers(narrow=True)
+
+
+def downgrade() -> None:
+    _recreate_update_triggers(narrow=False)
@@ -0,0 +1,45 @@
+"""add_tag_prompt_count
+
+Revision ID: b7e3f1a9c2d5
+Revises: 8c1d4e6f2a90
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7e3f1a9c2d5"
+down_revision = "8c1d4e6f2a90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Поддерживаемое количество промптов у тега (вместо GROUP BY на каждый запрос облака)
+    op.add_column("tags", sa.Column("prompt_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # Начальный пересчет (без мягко удаленных промптов)
+    op.execute("""
+        UPDATE tags SET prompt_count = (
+            SELECT COUNT(*)
+            FROM prompt_tags pt
+            JOIN prompts p ON p.id = pt.prompt_id
+            WHERE pt.tag_id = tags.id AND p.deleted_at IS NULL
+        )
+    """)
+
+    op.create_index(
+        "idx_tag_cloud",
+        "tags",
+        [sa.text("prompt_count DESC"), "name"],
+        unique=False,
+        sqlite_where=sa.text("prompt_count > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_tag_cloud", table_name="tags")
+    op.drop_column("tags", "prompt_count")
@@ -0,0 +1,195 @@
+"""rebuild_fts_prefix_tokenizer
+
+Пересоздание prompts_fts: префиксные индексы, remove_diacritics, ё = е в normalized_text и представление содержимого
+prompts_fts_content вместо таблицы prompts (в ней нет столбцов prompt_id и tags, поэтому
+'rebuild' и триггеры обновления прежней схемы не работали).
+
+Revision ID: c5e1b8d3f7a2
+Revises: a9d2f6c4e8b1
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e1b8d3f7a2"
+down_revision = "a9d2f6c4e8b1"
+branch_labels = None
+depends_on = None
+
+CONTENT_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS prompts_fts_content AS
+    SELECT
+        p.id,
+        p.text,
+        p.normalized_text,
+        (SELECT GROUP_CONCAT(name, ' ')
+         FROM (SELECT t.name FROM prompt_tags pt JOIN tags t ON t.id = pt.tag_id
+               WHERE pt.prompt_id = p.id ORDER BY t.id)) AS tags
+    FROM prompts p
+    WHERE p.deleted_at IS NULL
+"""
+
+DELETE_SQL = """
+    INSERT INTO prompts_fts(prompts_fts, rowid, text, normalized_text, tags)
+    SELECT 'delete', id, text, normalized_text, tags FROM prompts_fts_content WHERE {condition};
+"""
+INSERT_SQL = """
+    INSERT INTO prompts_fts(rowid, text, normalized_text, tags)
+    SELECT id, text, normalized_text, tags FROM prompts_fts_content WHERE {condition};
+"""
+TAG_PROMPTS = "id IN (SELECT prompt_id FROM prompt_tags WHERE tag_id = {ref}.id)"
+
+# (имя, событие, тело)
+TRIGGERS = (
+    ("prompts_fts_insert", "AFTER INSERT ON prompts", INSERT_SQL.format(condition="id = new.id")),
+    ("prompts_fts_before_update", "BEFORE UPDATE ON prompts", DELETE_SQL.format(condition="id = old.id")),
+    ("prompts_fts_update", "AFTER UPDATE ON prompts", INSERT_SQL.format(condition="id = new.id")),
+    ("prompts_fts_delete", "BEFORE DELETE ON prompts", DELETE_SQL.format(condition="id = old.id")),
+    (
+        "prompts_fts_tags_before_insert",
+        "BEFORE INSERT ON prompt_tags",
+        DELETE_SQL.format(condition="id = new.prompt_id"),
+    ),
+    ("prompts_fts_tags_insert", "AFTER INSERT ON prompt_tags", INSERT_SQL.format(condition="id = new.prompt_id")),
+    (
+        "prompts_fts_tags_before_delete",
+        "BEFORE DELETE ON prompt_tags",
+        DELETE_SQL.format(condition="id = old.prompt_id"),
+    ),
+    ("prompts_fts_tags_delete", "AFTER DELETE ON prompt_tags", INSERT_SQL.format(condition="id = old.prompt_id")),
+    (
+        "prompts_fts_tag_before_rename",
+        "BEFORE UPDATE OF name ON tags",
+        DELETE_SQL.format(condition=TAG_PROMPTS.format(ref="old")),
+    ),
+    (
+        "prompts_fts_tag_rename",
+        "AFTER UPDATE OF name ON tags",
+        INSERT_SQL.format(condition=TAG_PROMPTS.format(ref="new")),
+    ),
+    ("prompts_fts_tag_delete", "BEFORE DELETE ON tags", "DELETE FROM prompt_tags WHERE tag_id = old.id;"),
+)
+
+OLD_TRIGGERS = (
+    "prompts_fts_insert",
+    "prompts_fts_update",
+    "prompts_fts_delete",
+    "prompts_fts_tags_update",
+    "prompts_fts_tags_delete",
+)
+
+
+def upgrade() -> None:
+    for name in OLD_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS prompts_fts")
+
+    # normalize_text теперь заменяет ё на е (до создания триггеров, чтобы не обновлять индекс построчно)
+    op.execute(
+        "UPDATE prompts SET normalized_text = REPLACE(normalized_text, 'ё', 'е') WHERE normalized_text LIKE '%ё%'"
+    )
+
+    op.execute(CONTENT_VIEW_SQL)
+    op.execute("""
+        CREATE VIRTUAL TABLE prompts_fts USING fts5(
+            text,
+            normalized_text,
+            tags,
+            content='prompts_fts_content',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        )
+    """)
+    for name, event, body in TRIGGERS:
+        op.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+    # Построение индекса по текущим данным
+    op.execute("INSERT INTO prompts_fts(prompts_fts) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    for name, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS prompts_fts")
+    op.execute("DROP VIEW IF EXISTS prompts_fts_content")
+
+    # Прежняя схема 001_add_fts5
+    op.execute("""
+        CREATE VIRTUAL TABLE prompts_fts USING fts5(
+            prompt_id UNINDEXED,
+            text,
+            normalized_text,
+            tags,
+            content='prompts',
+            content_rowid='id'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_fts_insert AFTER INSERT ON prompts BEGIN
+            INSERT INTO prompts_fts(rowid, prompt_id, text, normalized_text, tags)
+            VALUES (
+                new.id,
+                new.id,
+                new.text,
+                new.normalized_text,
+                (SELECT GROUP_CONCAT(t.name, ' ')
+                 FROM tags t
+                 JOIN prompt_tags pt ON t.id = pt.tag_id
+                 WHERE pt.prompt_id = new.id)
+            );
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_fts_update AFTER UPDATE ON prompts BEGIN
+            UPDATE prompts_fts SET
+                text = new.text,
+                normalized_text = new.normalized_text,
+                tags = (SELECT GROUP_CONCAT(t.name, ' ')
+                       FROM tags t
+                       JOIN prompt_tags pt ON t.id = pt.tag_id
+                       WHERE pt.prompt_id = new.id)
+            WHERE rowid = new.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_fts_delete AFTER UPDATE OF deleted_at ON prompts BEGIN
+            DELETE FROM prompts_fts WHERE rowid = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_fts_tags_update AFTER INSERT ON prompt_tags BEGIN
+            UPDATE prompts_fts SET
+                tags = (SELECT GROUP_CONCAT(t.name, ' ')
+                       FROM tags t
+                       JOIN prompt_tags pt ON t.id = pt.tag_id
+                       WHERE pt.prompt_id = new.prompt_id)
+            WHERE prompt_id = new.prompt_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_fts_tags_delete AFTER DELETE ON prompt_tags BEGIN
+            UPDATE prompts_fts SET
+                tags = (SELECT GROUP_CONCAT(t.name, ' ')
+                       FROM tags t
+                       JOIN prompt_tags pt ON t.id = pt.tag_id
+                       WHERE pt.prompt_id = old.prompt_id)
+            WHERE prompt_id = old.prompt_id;
+        END
+    """)
+    op.execute("""
+        INSERT INTO prompts_fts(rowid, prompt_id, text, normalized_text, tags)
+        SELECT
+            p.id,
+            p.id,
+            p.text,
+            p.normalized_text,
+            COALESCE((SELECT GROUP_CONCAT(t.name, ' ')
+                      FROM tags t
+                      JOIN prompt_tags pt ON t.id = pt.tag_id
+                      WHERE pt.prompt_id = p.id), '')
+        FROM prompts p
+        WHERE p.deleted_at IS NULL
+    """)
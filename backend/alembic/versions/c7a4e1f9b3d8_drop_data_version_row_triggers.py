@@ -0,0 +1,44 @@
+"""drop_data_version_row_triggers
+
+Версия данных увеличивается один раз при фиксации транзакции (события сессии в app/database.py),
+а не триггером на каждую строку: массовый импорт больше не выполняет UPDATE data_version
+на каждый вставленный промпт
+
+Revision ID: c7a4e1f9b3d8
+Revises: b2e7d4a9f1c6
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7a4e1f9b3d8"
+down_revision = "b2e7d4a9f1c6"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = (
+    ("prompts", "INSERT"),
+    ("prompts", "UPDATE"),
+    ("prompts", "DELETE"),
+    ("tags", "INSERT"),
+    ("tags", "UPDATE"),
+    ("tags", "DELETE"),
+    ("prompt_tags", "INSERT"),
+    ("prompt_tags", "DELETE"),
+)
+
+
+def upgrade() -> None:
+    for table, event in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS data_version_{table}_{event.lower()}")
+
+
+def downgrade() -> None:
+    for table, event in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS data_version_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+            END
+        """)
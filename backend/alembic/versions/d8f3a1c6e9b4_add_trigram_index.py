@@ -0,0 +1,56 @@
+"""add_trigram_index
+
+Триграммный FTS5 индекс normalized_text для резервного поиска подстрок (вместо LIKE '%...%')
+
+Revision ID: d8f3a1c6e9b4
+Revises: c5e1b8d3f7a2
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d8f3a1c6e9b4"
+down_revision = "c5e1b8d3f7a2"
+branch_labels = None
+depends_on = None
+
+DELETE_SQL = """
+    INSERT INTO prompts_trigram(prompts_trigram, rowid, normalized_text)
+    SELECT 'delete', id, normalized_text FROM prompts_fts_content WHERE {condition};
+"""
+INSERT_SQL = """
+    INSERT INTO prompts_trigram(rowid, normalized_text)
+    SELECT id, normalized_text FROM prompts_fts_content WHERE {condition};
+"""
+
+# (имя, событие, тело)
+TRIGGERS = (
+    ("prompts_trigram_insert", "AFTER INSERT ON prompts", INSERT_SQL.format(condition="id = new.id")),
+    ("prompts_trigram_before_update", "BEFORE UPDATE ON prompts", DELETE_SQL.format(condition="id = old.id")),
+    ("prompts_trigram_update", "AFTER UPDATE ON prompts", INSERT_SQL.format(condition="id = new.id")),
+    ("prompts_trigram_delete", "BEFORE DELETE ON prompts", DELETE_SQL.format(condition="id = old.id")),
+)
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS prompts_trigram USING fts5(
+            normalized_text,
+            content='prompts_fts_content',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    for name, event, body in TRIGGERS:
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    # Построение индекса по текущим данным
+    op.execute("INSERT INTO prompts_trigram(prompts_trigram) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    for name, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS prompts_trigram")
@@ -0,0 +1,57 @@
+"""add_data_version
+
+Revision ID: e4a8d2c6b1f3
+Revises: b7e3f1a9c2d5
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4a8d2c6b1f3"
+down_revision = "b7e3f1a9c2d5"
+branch_labels = None
+depends_on = None
+
+# Таблицы и события, меняющие ответы API
+TRIGGERS = (
+    ("prompts", "INSERT"),
+    ("prompts", "UPDATE"),
+    ("prompts", "DELETE"),
+    ("tags", "INSERT"),
+    ("tags", "UPDATE"),
+    ("tags", "DELETE"),
+    ("prompt_tags", "INSERT"),
+    ("prompt_tags", "DELETE"),
+)
+
+
+def upgrade() -> None:
+    # Глобальная версия данных для ETag (одна строка)
+    op.create_table(
+        "data_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO data_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)")
+
+    # Триггеры увеличивают версию при любом изменении промптов, тегов и связей
+    for table, event in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS data_version_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+            END
+        """)
+
+
+def downgrade() -> None:
+    for table, event in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS data_version_{table}_{event.lower()}")
+    op.drop_table("data_version")
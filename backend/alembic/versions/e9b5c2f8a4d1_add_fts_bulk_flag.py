@@ -0,0 +1,65 @@
+"""add_fts_bulk_flag
+
+Таблица fts_bulk и условие WHEN в триггерах синхронизации prompts_fts и prompts_trigram:
+массовый импорт с rebuild пишет без обновления индексов (флаг виден только транзакциям импорта)
+и перестраивает индексы в конце
+
+Revision ID: e9b5c2f8a4d1
+Revises: c7a4e1f9b3d8
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+import re
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e9b5c2f8a4d1"
+down_revision = "c7a4e1f9b3d8"
+branch_labels = None
+depends_on = None
+
+GUARD = "WHEN NOT EXISTS (SELECT 1 FROM fts_bulk WHERE writing = 1)"
+
+# Триггер удаления тега меняет prompt_tags, а не индекс - он срабатывает всегда
+UNGUARDED_TRIGGERS = ("prompts_fts_tag_delete",)
+
+_BEGIN = re.compile(r"\s+BEGIN\s", re.IGNORECASE)
+
+
+def _sync_triggers() -> list:
+    """(имя, SQL) триггеров синхронизации индексов"""
+    rows = op.get_bind().execute(
+        sa.text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            "AND (name LIKE 'prompts\\_fts\\_%' ESCAPE '\\' OR name LIKE 'prompts\\_trigram\\_%' ESCAPE '\\')"
+        )
+    )
+    return [(name, sql) for name, sql in rows if name not in UNGUARDED_TRIGGERS]
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS fts_bulk (
+            id INTEGER PRIMARY KEY,
+            writing INTEGER NOT NULL DEFAULT 0,
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for name, sql in _sync_triggers():
+        if GUARD in sql:
+            continue
+        op.execute(f"DROP TRIGGER {name}")
+        op.execute(_BEGIN.sub(f" {GUARD} BEGIN ", sql, count=1))
+
+
+def downgrade() -> None:
+    for name, sql in _sync_triggers():
+        if GUARD not in sql:
+            continue
+        op.execute(f"DROP TRIGGER {name}")
+        op.execute(sql.replace(f" {GUARD}", ""))
+    op.execute("DROP TABLE IF EXISTS fts_bulk")
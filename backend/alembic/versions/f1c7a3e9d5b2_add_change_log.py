@@ -0,0 +1,64 @@
+"""add_change_log
+
+Revision ID: f1c7a3e9d5b2
+Revises: e4a8d2c6b1f3
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f1c7a3e9d5b2"
+down_revision = "e4a8d2c6b1f3"
+branch_labels = None
+depends_on = None
+
+# (таблица, событие, сущность, выражение ID)
+TRIGGERS = (
+    ("prompts", "INSERT", "prompt", "NEW.id"),
+    ("prompts", "UPDATE", "prompt", "NEW.id"),
+    ("prompts", "DELETE", "prompt", "OLD.id"),
+    ("tags", "INSERT", "tag", "NEW.id"),
+    ("tags", "UPDATE OF name, slug", "tag", "NEW.id"),
+    ("tags", "DELETE", "tag", "OLD.id"),
+    ("prompt_tags", "INSERT", "prompt", "NEW.prompt_id"),
+    ("prompt_tags", "DELETE", "prompt", "OLD.prompt_id"),
+)
+
+
+def _trigger_name(table: str, event: str) -> str:
+    return f"change_log_{table}_{event.split()[0].lower()}"
+
+
+def upgrade() -> None:
+    # Журнал изменений для дельта-синхронизации (seq - токен изменений)
+    op.create_table(
+        "change_log",
+        sa.Column("seq", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("entity", sa.String(length=16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("idx_change_log_entity", "change_log", ["entity", "entity_id", "seq"], unique=False)
+
+    # Существующие данные - первые изменения журнала
+    op.execute("INSERT INTO change_log (entity, entity_id) SELECT 'tag', id FROM tags ORDER BY id")
+    op.execute("INSERT INTO change_log (entity, entity_id) SELECT 'prompt', id FROM prompts ORDER BY id")
+
+    for table, event, entity, id_expr in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {_trigger_name(table, event)} AFTER {event} ON {table} BEGIN
+                INSERT INTO change_log (entity, entity_id) VALUES ('{entity}', {id_expr});
+            END
+        """)
+
+
+def downgrade() -> None:
+    for table, event, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {_trigger_name(table, event)}")
+    op.drop_index("idx_change_log_entity", table_name="change_log")
+    op.drop_table("change_log")
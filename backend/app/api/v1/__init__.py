@@ -3,13 +3,14 @@ import importlib
 
 from fastapi import APIRouter
 
-from app.api.v1 import prompts, search, tags
+from app.api.v1 import admin, prompts, search, tags
 
 api_router = APIRouter()
 
 api_router.include_router(prompts.router)
 api_router.include_router(tags.router)
 api_router.include_router(search.router)
+api_router.include_router(admin.router)
 
 # Импорт модуля import через importlib (import - зарезервированное слово)
 import_module = importlib.import_module("app.api.v1.import")
@@ -0,0 +1,44 @@
+"""
+API эндпоинты обслуживания (только с токеном API)
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.core.logging_config import get_logger
+from app.database import get_db, run_db
+from app.schemas.maintenance import FtsIndexStats, FtsMaintenanceResponse
+from app.search.maintenance import FTS5_COMMANDS, FTS5_MERGE_PAGES, fts5_stats, run_fts5_command
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_user)])
+logger = get_logger(__name__)
+
+
+@router.get("/fts", response_model=List[FtsIndexStats])
+async def get_fts_stats(db: Session = Depends(get_db)):
+    """Количество сегментов и размер FTS5 индексов"""
+    return await run_db(fts5_stats, db)
+
+
+@router.post("/fts/{command}", response_model=FtsMaintenanceResponse)
+async def run_fts_command(
+    command: str = Path(..., description=f"Команда FTS5: {', '.join(FTS5_COMMANDS)}"),
+    pages: int = Query(FTS5_MERGE_PAGES, ge=1, le=100000, description="Страниц за одну команду merge"),
+    db: Session = Depends(get_db),
+):
+    """
+    Выполнить команду обслуживания FTS5 индексов
+
+    merge сливает сегменты порцией не более pages страниц; optimize и rebuild обрабатывают индекс
+    целиком и на время выполнения блокируют запись в БД (для больших БД - scripts/maintenance.py).
+    """
+    try:
+        return await run_db(run_fts5_command, db, command, pages)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except Exception as e:
+        logger.error(f"Ошибка FTS5 {command}: {e}", extra={"error": str(e)})
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка FTS5 {command}") from e
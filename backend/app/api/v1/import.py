@@ -2,17 +2,22 @@
 API эндпоинт для импорта промптов
 """
 
-from typing import List
+import json
+import time
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
 from app.core.logging_config import get_logger
 from app.crud import prompt as crud_prompt
-from app.database import get_db
+from app.database import SessionLocal, get_db, run_db
 from app.schemas.prompt import PromptCreate
+from app.search.fts5 import FTS5_BULK_REBUILD_MIN_ITEMS, fts5_bulk_begin, fts5_bulk_end, fts5_bulk_mode
+from app.utils.import_stream import MAX_ITEM_SIZE, TelegramExportReader, flatten_telegram_text, iter_lines
 
 router = APIRouter(prefix="/import", tags=["import"])
 logger = get_logger(__name__)
@@ -25,6 +30,7 @@ class ImportItem(BaseModel):
     tg_channel_id: int
     text: str
     is_pinned: bool = False
+    image_url: Optional[str] = None
 
 
 class ImportRequest(BaseModel):
@@ -37,8 +43,63 @@ class ImportResponse(BaseModel):
     """Ответ на импорт"""
 
     created: int
+    updated: int = 0
     skipped: int
     errors: List[str] = []
+    duration_ms: float = 0.0
+    items_per_second: float = 0.0
+
+
+def _import_items(db: Session, items: List[ImportItem]) -> ImportResponse:
+    """Записать элементы импорта в БД пачками (выполняется в пуле потоков БД)"""
+    started = time.perf_counter()
+    errors = []
+    prompts = []
+
+    for item in items:
+        try:
+            prompts.append(
+                PromptCreate(
+                    tg_message_id=item.tg_message_id,
+                    tg_channel_id=item.tg_channel_id,
+                    text=item.text,
+                    is_pinned=item.is_pinned,
+                    image_url=item.image_url,
+                )
+            )
+        except ValidationError as e:
+            error_msg = f"Ошибка при импорте промпта {item.tg_message_id}: {str(e)}"
+            errors.append(error_msg)
+            logger.error(error_msg, extra={"error": str(e), "tg_message_id": item.tg_message_id})
+
+    created = 0
+    updated = 0
+    skipped = 0
+    try:
+        # Индекс FTS5 обслуживается один раз в конце, а не после каждой пачки;
+        # большой импорт не обновляет индексы триггерами, они перестраиваются в конце
+        with fts5_bulk_mode(db, rebuild=len(prompts) >= FTS5_BULK_REBUILD_MIN_ITEMS):
+            created, updated, skipped = crud_prompt.bulk_upsert_prompts(db, prompts)
+    except Exception as e:
+        db.rollback()
+        error_msg = f"Ошибка при массовом импорте: {str(e)}"
+        errors.append(error_msg)
+        logger.error(error_msg, extra={"error": str(e)})
+
+    duration = time.perf_counter() - started
+    logger.info(
+        f"Импорт завершен: создано {created}, обновлено {updated}, пропущено {skipped}, ошибок {len(errors)}",
+        extra={"duration_ms": round(duration * 1000, 1)},
+    )
+
+    return ImportResponse(
+        created=created,
+        updated=updated,
+        skipped=skipped,
+        errors=errors,
+        duration_ms=round(duration * 1000, 1),
+        items_per_second=round(len(items) / duration, 1) if duration > 0 else 0.0,
+    )
 
 
 @router.post("/", response_model=ImportResponse, status_code=status.HTTP_200_OK)
@@ -50,34 +111,182 @@ async def import_prompts(
 
     Пропускает дубликаты по tg_message_id
     """
-    created = 0
-    skipped = 0
-    errors = []
+    return await run_db(_import_items, db, import_data.items)
 
-    for item in import_data.items:
-        try:
-            # Проверка на существование
-            existing = crud_prompt.get_prompt_by_tg_message_id(db, item.tg_message_id)
-            if existing:
-                skipped += 1
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, который формируется во время чтения тела запроса
+
+    Стандартный StreamingResponse параллельно слушает receive() для отслеживания разрыва соединения
+    и забирает себе сообщения с телом запроса. Здесь тело читает сам генератор ответа,
+    а разрыв соединения проявится как ошибка чтения тела.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _iter_stream_items(
+    request: Request, channel_id: Optional[int]
+) -> AsyncIterator[tuple[Optional[PromptCreate], Optional[str]]]:
+    """
+    Элементы импорта из тела запроса по мере его получения
+
+    application/x-ndjson - по одному ImportItem в строке,
+    application/json - result.json экспорта Telegram Desktop.
+
+    Yields:
+        tuple: (промпт, None) или (None, текст ошибки) для невалидного элемента
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type == "application/json":
+        reader = TelegramExportReader()
+        async for message in reader.messages(request.stream()):
+            if message.get("type") != "message":
                 continue
+            text = flatten_telegram_text(message.get("text"))
+            if not text.strip():
+                continue
+            try:
+                yield (
+                    PromptCreate(
+                        tg_message_id=message.get("id"),
+                        tg_channel_id=channel_id if channel_id is not None else reader.channel_id,
+                        text=text,
+                    ),
+                    None,
+                )
+            except ValidationError as e:
+                yield None, f"Ошибка при импорте промпта {message.get('id')}: {str(e)}"
+        return
 
-            # Создание промпта
-            prompt_create = PromptCreate(
-                tg_message_id=item.tg_message_id,
-                tg_channel_id=item.tg_channel_id,
-                text=item.text,
-                is_pinned=item.is_pinned,
+    line_number = 0
+    async for line in iter_lines(request.stream()):
+        line_number += 1
+        if line is None:
+            yield None, f"Ошибка в строке {line_number}: строка длиннее {MAX_ITEM_SIZE // (1024 * 1024)} МБ"
+            continue
+        try:
+            item = ImportItem.model_validate_json(line)
+            yield (
+                PromptCreate(
+                    tg_message_id=item.tg_message_id,
+                    tg_channel_id=item.tg_channel_id,
+                    text=item.text,
+                    is_pinned=item.is_pinned,
+                    image_url=item.image_url,
+                ),
+                None,
             )
+        except ValidationError as e:
+            yield None, f"Ошибка в строке {line_number}: {str(e)}"
+
+
+async def _stream_import(
+    request: Request, channel_id: Optional[int], batch_size: int, rebuild_index: bool
+) -> AsyncIterator[bytes]:
+    """Читать тело запроса, записывать пачками и отдавать прогресс строками NDJSON"""
+    started = time.perf_counter()
+    processed = 0
+    created = 0
+    updated = 0
+    skipped = 0
+    errors = 0
 
-            crud_prompt.create_prompt(db, prompt_create)
-            created += 1
+    def progress(**extra) -> bytes:
+        data = {
+            "processed": processed,
+            "created": created,
+            "updated": updated,
+            "skipped": skipped,
+            "errors": errors,
+            **extra,
+        }
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
 
+    # Своя сессия: генератор живет дольше, чем зависимости эндпоинта
+    db = SessionLocal()
+    bulk_enabled = await run_db(fts5_bulk_begin, db, rebuild_index)
+    try:
+        batch: List[PromptCreate] = []
+        batch_errors: List[str] = []
+
+        async def flush() -> bytes:
+            nonlocal created, updated, skipped
+            batch_created, batch_updated, batch_skipped = await run_db(crud_prompt.bulk_upsert_prompts, db, batch)
+            created += batch_created
+            updated += batch_updated
+            skipped += batch_skipped
+            line = progress(batch_errors=batch_errors[:])
+            batch.clear()
+            batch_errors.clear()
+            return line
+
+        try:
+            async for prompt, error in _iter_stream_items(request, channel_id):
+                processed += 1
+                if error:
+                    errors += 1
+                    batch_errors.append(error)
+                    logger.error(error)
+                else:
+                    batch.append(prompt)
+                if len(batch) >= batch_size:
+                    yield await flush()
+            if batch or batch_errors:
+                yield await flush()
+        except ValueError as e:
+            # Поток оборван или поврежден - записываем уже проверенные элементы
+            errors += 1
+            logger.error(f"Ошибка чтения потока импорта: {e}", extra={"error": str(e)})
+            yield await flush()
+            yield progress(error=str(e))
         except Exception as e:
-            error_msg = f"Ошибка при импорте промпта {item.tg_message_id}: {str(e)}"
-            errors.append(error_msg)
-            logger.error(error_msg, extra={"error": str(e), "tg_message_id": item.tg_message_id})
+            await run_db(db.rollback)
+            errors += 1
+            logger.error(f"Ошибка при потоковом импорте: {e}", extra={"error": str(e)})
+            yield progress(error=str(e))
 
-    logger.info(f"Импорт завершен: создано {created}, пропущено {skipped}, ошибок {len(errors)}")
+        duration = time.perf_counter() - started
+        logger.info(
+            f"Потоковый импорт завершен: создано {created}, обновлено {updated}, пропущено {skipped}, ошибок {errors}",
+            extra={"duration_ms": round(duration * 1000, 1)},
+        )
+        yield progress(
+            done=True,
+            duration_ms=round(duration * 1000, 1),
+            items_per_second=round(processed / duration, 1) if duration > 0 else 0.0,
+        )
+    finally:
+        if bulk_enabled:
+            await run_db(fts5_bulk_end, db)
+        await run_db(db.close)
 
-    return ImportResponse(created=created, skipped=skipped, errors=errors)
+
+@router.post("/stream", status_code=status.HTTP_200_OK)
+async def import_prompts_stream(
+    request: Request,
+    channel_id: Optional[int] = Query(None, description="ID канала для экспорта Telegram (по умолчанию из файла)"),
+    batch_size: int = Query(crud_prompt.BULK_BATCH_SIZE, ge=1, le=5000, description="Размер пачки записи"),
+    rebuild_index: bool = Query(
+        False, description="Не обновлять поисковые индексы построчно и перестроить их в конце (для больших выгрузок)"
+    ),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Потоковый импорт больших выгрузок
+
+    Принимает application/x-ndjson (ImportItem в каждой строке) или result.json экспорта
+    Telegram Desktop (application/json). Тело читается по частям и записывается пачками
+    фиксированного размера, прогресс возвращается строками NDJSON после каждой пачки.
+    С rebuild_index=true записи импорта не обновляют поисковые индексы построчно, индексы
+    перестраиваются после импорта: быстрее для больших выгрузок, но до конца импорта новые промпты
+    не находятся поиском (записи других клиентов индексируются как обычно).
+    """
+    return DuplexStreamingResponse(
+        _stream_import(request, channel_id, batch_size, rebuild_index), media_type="application/x-ndjson"
+    )
@@ -0,0 +1,85 @@
+"""
+Страница списка промптов: общий сборщик для /prompts и /search
+
+Оба эндпоинта отдают одну и ту же страницу (page/limit или cursor, проекция fields=/preview_len=)
+и кэшируют поисковые запросы под одним ключом, поэтому запрос, курсор, проекция и кэш собраны здесь.
+"""
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache, search_cache_key
+from app.core.responses import ORJSONResponse
+from app.crud import prompt as crud_prompt
+from app.crud.projection import PromptProjection
+from app.schemas.prompt import PromptListResponse, PromptResponse
+
+
+def get_prompt_page(
+    db: Session,
+    page: int,
+    limit: int,
+    cursor: Optional[str],
+    projection: Optional[PromptProjection],
+    search: Optional[str] = None,
+    **filters,
+) -> PromptListResponse | dict:
+    """
+    Получить страницу промптов (выполняется в пуле потоков БД)
+
+    Страницы с поисковым запросом кэшируются (общий ключ для /prompts?search= и /search?q=),
+    страницы без запроса каждый раз читаются из БД.
+    """
+    if not search:
+        return build_prompt_page(db, page, limit, cursor, projection, **filters)
+
+    key = search_cache_key(search, page, limit, cursor, fields=projection.key if projection else None, **filters)
+    return cache.get_or_set(
+        key, lambda: build_prompt_page(db, page, limit, cursor, projection, search=search, **filters)
+    )
+
+
+def build_prompt_page(
+    db: Session,
+    page: int,
+    limit: int,
+    cursor: Optional[str],
+    projection: Optional[PromptProjection],
+    search: Optional[str] = None,
+    **filters,
+) -> PromptListResponse | dict:
+    """
+    Выполнить запрос и сериализовать страницу
+
+    С проекцией (fields=, preview_len= или FAST_JSON_RESPONSES) страница собирается словарем
+    из строк выбранных столбцов, без ORM объектов и pydantic.
+    """
+    if cursor:
+        prompts, next_cursor = crud_prompt.get_prompts_after_cursor(
+            db=db, cursor=cursor, limit=limit, search=search, projection=projection, **filters
+        )
+        total = None
+    else:
+        skip = (page - 1) * limit
+        prompts, total = crud_prompt.get_prompts(
+            db=db, skip=skip, limit=limit, search=search, projection=projection, **filters
+        )
+        next_cursor = crud_prompt.next_page_cursor(prompts, skip=skip, total=total, search=search)
+
+    if projection is not None:
+        items = crud_prompt.prompt_rows_to_dicts(db, prompts, projection)
+        return {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor}
+
+    return PromptListResponse(
+        items=[PromptResponse.model_validate(p) for p in prompts],
+        total=total,
+        page=page,
+        limit=limit,
+        next_cursor=next_cursor,
+    )
+
+
+def prompt_page_response(result: PromptListResponse | dict) -> PromptListResponse | ORJSONResponse:
+    """Ответ эндпоинта: готовый словарь проекции отдается без повторной валидации по response_model"""
+    return ORJSONResponse(result) if isinstance(result, dict) else result
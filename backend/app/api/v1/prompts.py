@@ -7,11 +7,27 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.api.v1.pages import get_prompt_page, prompt_page_response
 from app.core.auth import get_current_user
+from app.core.cache import cache
 from app.core.logging_config import get_logger
+from app.crud import changes as crud_changes
 from app.crud import prompt as crud_prompt
-from app.database import get_db
-from app.schemas.prompt import PromptCreate, PromptListResponse, PromptResponse, PromptUpdate
+from app.crud.projection import (
+    FIELDS_DESCRIPTION,
+    MAX_PREVIEW_LEN,
+    PREVIEW_LEN_DESCRIPTION,
+    resolve_projection,
+)
+from app.database import get_db, run_db
+from app.schemas.prompt import (
+    PromptChangesResponse,
+    PromptCreate,
+    PromptListResponse,
+    PromptResponse,
+    PromptUpdate,
+    TagResponse,
+)
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 logger = get_logger(__name__)
@@ -24,33 +40,95 @@ async def get_prompts(
     search: Optional[str] = Query(None, description="Поисковый запрос"),
     tags: Optional[List[int]] = Query(None, description="Фильтр по ID тегов"),
     pinned: Optional[bool] = Query(None, description="Только закрепленные"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor), без подсчета total"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    preview_len: Optional[int] = Query(None, ge=1, le=MAX_PREVIEW_LEN, description=PREVIEW_LEN_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    """Получить список промптов с фильтрацией и пагинацией"""
-    try:
-        skip = (page - 1) * limit
-        prompts, total = crud_prompt.get_prompts(
-            db=db, skip=skip, limit=limit, search=search, tag_ids=tags, pinned_only=pinned
-        )
+    """
+    Получить список промптов с фильтрацией и пагинацией
 
-        return PromptListResponse(
-            items=[PromptResponse.model_validate(p) for p in prompts], total=total, page=page, limit=limit
+    Поддерживает два режима: page/limit (с total) и курсорный (cursor из next_cursor, без COUNT).
+    fields= и preview_len= сокращают выбираемые столбцы и размер ответа (например, для компактного списка).
+    """
+    try:
+        projection = resolve_projection(fields, preview_len)
+        result = await run_db(
+            get_prompt_page,
+            db,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+            search=search,
+            tag_ids=tags,
+            pinned_only=pinned,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
     except Exception as e:
         logger.error(f"Ошибка при получении списка промптов: {e}", extra={"error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ошибка при получении списка промптов"
         ) from e
 
+    return prompt_page_response(result)
+
+
+def _get_changes(db: Session, since: int, limit: int) -> PromptChangesResponse:
+    """Получить и сериализовать изменения после токена (выполняется в пуле потоков БД)"""
+    changes = crud_changes.get_changes(db, since=since, limit=limit)
+    return PromptChangesResponse(
+        items=[PromptResponse.model_validate(p) for p in changes.prompts],
+        deleted_ids=changes.deleted_prompt_ids,
+        tags=[TagResponse.model_validate(t) for t in changes.tags],
+        deleted_tag_ids=changes.deleted_tag_ids,
+        next_since=changes.next_since,
+        has_more=changes.has_more,
+    )
+
+
+@router.get("/changes", response_model=PromptChangesResponse)
+async def get_prompt_changes(
+    since: int = Query(0, ge=0, description="Токен next_since из предыдущего ответа (0 - все данные)"),
+    limit: int = Query(500, ge=1, le=1000, description="Максимальное количество измененных сущностей"),
+    db: Session = Depends(get_db),
+):
+    """
+    Изменения промптов и тегов после токена since (дельта-синхронизация офлайн клиента)
+
+    Возвращает созданные, измененные и удаленные промпты и теги. Клиент сохраняет next_since
+    и повторяет запрос, пока has_more = true. Ответ 400 означает, что токен неизвестен
+    (например, БД восстановлена из копии) и нужна полная синхронизация с since = 0.
+    """
+    try:
+        return await run_db(_get_changes, db, since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+
+def _get_prompt_response(db: Session, prompt_id: int) -> Optional[PromptResponse]:
+    """Получить и сериализовать промпт по ID (выполняется в пуле потоков БД)"""
+    prompt = crud_prompt.get_prompt(db, prompt_id)
+    return PromptResponse.model_validate(prompt) if prompt else None
+
+
+def _get_prompt_response_by_tg_id(db: Session, tg_message_id: int) -> Optional[PromptResponse]:
+    """Получить и сериализовать неудаленный промпт по Telegram message ID (выполняется в пуле потоков БД)"""
+    prompt = crud_prompt.get_prompt_by_tg_message_id(db, tg_message_id)
+    if not prompt or prompt.deleted_at:
+        return None
+    return PromptResponse.model_validate(prompt)
+
 
 @router.get("/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(prompt_id: int, db: Session = Depends(get_db)):
     """Получить промпт по ID"""
-    prompt = crud_prompt.get_prompt(db, prompt_id)
+    prompt = await run_db(cache.get_or_set, f"prompt:{prompt_id}", lambda: _get_prompt_response(db, prompt_id))
     if not prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
-    return PromptResponse.model_validate(prompt)
+    return prompt
 
 
 @router.post("/", response_model=PromptResponse, status_code=status.HTTP_201_CREATED)
@@ -60,15 +138,15 @@ async def create_prompt(
     """Создать новый промпт (требует аутентификации)"""
     try:
         # Проверка на дубликат по tg_message_id
-        existing = crud_prompt.get_prompt_by_tg_message_id(db, prompt.tg_message_id)
+        existing = await run_db(crud_prompt.get_prompt_by_tg_message_id, db, prompt.tg_message_id)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, detail="Промпт с таким tg_message_id уже существует"
             )
 
-        db_prompt = crud_prompt.create_prompt(db, prompt)
+        db_prompt = await run_db(crud_prompt.create_prompt, db, prompt)
         logger.info(f"Создан промпт: {db_prompt.id}")
-        return PromptResponse.model_validate(db_prompt)
+        return await run_db(PromptResponse.model_validate, db_prompt)
     except HTTPException:
         raise
     except Exception as e:
@@ -86,18 +164,18 @@ async def update_prompt(
     current_user: dict = Depends(get_current_user),
 ):
     """Обновить промпт (требует аутентификации)"""
-    db_prompt = crud_prompt.update_prompt(db, prompt_id, prompt_update)
+    db_prompt = await run_db(crud_prompt.update_prompt, db, prompt_id, prompt_update)
     if not db_prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
     logger.info(f"Обновлен промпт: {prompt_id}")
-    return PromptResponse.model_validate(db_prompt)
+    return await run_db(PromptResponse.model_validate, db_prompt)
 
 
 @router.delete("/{prompt_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_prompt(prompt_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Удалить промпт (мягкое удаление, требует аутентификации)"""
-    success = crud_prompt.delete_prompt(db, prompt_id)
+    success = await run_db(crud_prompt.delete_prompt, db, prompt_id)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
@@ -112,12 +190,12 @@ async def pin_prompt(
     current_user: dict = Depends(get_current_user),
 ):
     """Закрепить/открепить промпт (требует аутентификации)"""
-    db_prompt = crud_prompt.pin_prompt(db, prompt_id, pin)
+    db_prompt = await run_db(crud_prompt.pin_prompt, db, prompt_id, pin)
     if not db_prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
     logger.info(f"Промпт {prompt_id} {'закреплен' if pin else 'откреплен'}")
-    return PromptResponse.model_validate(db_prompt)
+    return await run_db(PromptResponse.model_validate, db_prompt)
 
 
 @router.post("/{prompt_id}/tags/{tag_id}", response_model=PromptResponse)
@@ -125,12 +203,12 @@ async def add_tag_to_prompt(
     prompt_id: int, tag_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)
 ):
     """Добавить тег к промпту (требует аутентификации)"""
-    db_prompt = crud_prompt.add_tag_to_prompt(db, prompt_id, tag_id)
+    db_prompt = await run_db(crud_prompt.add_tag_to_prompt, db, prompt_id, tag_id)
     if not db_prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт или тег не найден")
 
     logger.info(f"Добавлен тег {tag_id} к промпту {prompt_id}")
-    return PromptResponse.model_validate(db_prompt)
+    return await run_db(PromptResponse.model_validate, db_prompt)
 
 
 @router.delete("/{prompt_id}/tags/{tag_id}", response_model=PromptResponse)
@@ -138,22 +216,24 @@ async def remove_tag_from_prompt(
     prompt_id: int, tag_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)
 ):
     """Удалить тег из промпта (требует аутентификации)"""
-    db_prompt = crud_prompt.remove_tag_from_prompt(db, prompt_id, tag_id)
+    db_prompt = await run_db(crud_prompt.remove_tag_from_prompt, db, prompt_id, tag_id)
     if not db_prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт или тег не найден")
 
     logger.info(f"Удален тег {tag_id} из промпта {prompt_id}")
-    return PromptResponse.model_validate(db_prompt)
+    return await run_db(PromptResponse.model_validate, db_prompt)
 
 
 @router.get("/by-tg-id/{tg_message_id}", response_model=PromptResponse)
 async def get_prompt_by_tg_id(tg_message_id: int, db: Session = Depends(get_db)):
     """Получить промпт по Telegram message ID"""
-    prompt = crud_prompt.get_prompt_by_tg_message_id(db, tg_message_id)
-    if not prompt or prompt.deleted_at:
+    prompt = await run_db(
+        cache.get_or_set, f"prompt:tg:{tg_message_id}", lambda: _get_prompt_response_by_tg_id(db, tg_message_id)
+    )
+    if not prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
-    return PromptResponse.model_validate(prompt)
+    return prompt
 
 
 @router.patch("/by-tg-id/{tg_message_id}", response_model=PromptResponse)
@@ -164,16 +244,16 @@ async def update_prompt_by_tg_id(
     current_user: dict = Depends(get_current_user),
 ):
     """Обновить промпт по Telegram message ID (требует аутентификации)"""
-    prompt = crud_prompt.get_prompt_by_tg_message_id(db, tg_message_id)
+    prompt = await run_db(crud_prompt.get_prompt_by_tg_message_id, db, tg_message_id)
     if not prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
-    db_prompt = crud_prompt.update_prompt(db, prompt.id, prompt_update)
+    db_prompt = await run_db(crud_prompt.update_prompt, db, prompt.id, prompt_update)
     if not db_prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
     logger.info(f"Обновлен промпт по tg_message_id: {tg_message_id}")
-    return PromptResponse.model_validate(db_prompt)
+    return await run_db(PromptResponse.model_validate, db_prompt)
 
 
 @router.delete("/by-tg-id/{tg_message_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -181,11 +261,11 @@ async def delete_prompt_by_tg_id(
     tg_message_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)
 ):
     """Удалить промпт по Telegram message ID (мягкое удаление, требует аутентификации)"""
-    prompt = crud_prompt.get_prompt_by_tg_message_id(db, tg_message_id)
+    prompt = await run_db(crud_prompt.get_prompt_by_tg_message_id, db, tg_message_id)
     if not prompt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
-    success = crud_prompt.delete_prompt(db, prompt.id)
+    success = await run_db(crud_prompt.delete_prompt, db, prompt.id)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Промпт не найден")
 
@@ -4,13 +4,20 @@ API эндпоинт для поиска
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.api.v1.pages import get_prompt_page, prompt_page_response
 from app.core.logging_config import get_logger
-from app.crud import prompt as crud_prompt
-from app.database import get_db
-from app.schemas.prompt import PromptListResponse, PromptResponse
+from app.crud.projection import (
+    FIELDS_DESCRIPTION,
+    MAX_PREVIEW_LEN,
+    PREVIEW_LEN_DESCRIPTION,
+    resolve_projection,
+)
+from app.database import get_db, run_db
+from app.schemas.prompt import PromptListResponse, SuggestResponse
+from app.search.suggest import SUGGEST_LIMIT_MAX, suggestions
 
 router = APIRouter(prefix="/search", tags=["search"])
 logger = get_logger(__name__)
@@ -18,27 +25,56 @@ logger = get_logger(__name__)
 
 @router.get("/", response_model=PromptListResponse)
 async def search_prompts(
-    q: str = Query(..., min_length=1, description="Поисковый запрос"),
+    q: str = Query(..., min_length=1, description='Поисковый запрос: слова, "фраза", -исключение, OR, tags:тег'),
     page: int = Query(1, ge=1, description="Номер страницы"),
     limit: int = Query(50, ge=1, le=100, description="Количество элементов на странице"),
     tags: Optional[List[int]] = Query(None, description="Фильтр по ID тегов"),
     pinned: Optional[bool] = Query(None, description="Только закрепленные"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor), без подсчета total"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    preview_len: Optional[int] = Query(None, ge=1, le=MAX_PREVIEW_LEN, description=PREVIEW_LEN_DESCRIPTION),
+    fuzzy: bool = Query(False, description="Учитывать опечатки: слова не из словаря заменяются близкими"),
     db: Session = Depends(get_db),
 ):
     """
     Поиск промптов по тексту
 
-    Использует нормализованный текст для поиска
+    Использует нормализованный текст для поиска. С fuzzy=true слова, которых нет в индексе,
+    дополнительно ищутся как близкие термины (до двух ошибок).
     """
     try:
-        skip = (page - 1) * limit
-        prompts, total = crud_prompt.get_prompts(
-            db=db, skip=skip, limit=limit, search=q, tag_ids=tags, pinned_only=pinned
-        )
-
-        return PromptListResponse(
-            items=[PromptResponse.model_validate(p) for p in prompts], total=total, page=page, limit=limit
+        projection = resolve_projection(fields, preview_len)
+        result = await run_db(
+            get_prompt_page,
+            db,
+            search=q,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+            tag_ids=tags,
+            pinned_only=pinned,
+            fuzzy=fuzzy,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
     except Exception as e:
         logger.error(f"Ошибка при поиске промптов: {e}", extra={"error": str(e)})
         raise
+
+    return prompt_page_response(result)
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Введенный текст"),
+    limit: int = Query(10, ge=1, le=SUGGEST_LIMIT_MAX, description="Количество подсказок"),
+    db: Session = Depends(get_db),
+):
+    """
+    Подсказки по мере ввода: завершения последнего слова по тегам и терминам индекса
+
+    Обслуживается из словаря в памяти (без поискового запроса к БД), для поля поиска с автодополнением.
+    """
+    items = await run_db(suggestions.suggest, db, prefix, limit)
+    return SuggestResponse(prefix=prefix, items=items)
@@ -8,9 +8,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_user
+from app.core.cache import cache
 from app.core.logging_config import get_logger
 from app.crud import tag as crud_tag
-from app.database import get_db
+from app.database import get_db, run_db
 from app.schemas.tag import TagCreate, TagResponse, TagUpdate, TagWithCountResponse
 
 router = APIRouter(prefix="/tags", tags=["tags"])
@@ -24,7 +25,7 @@ async def get_tags(
     db: Session = Depends(get_db),
 ):
     """Получить список всех тегов"""
-    tags = crud_tag.get_tags(db, skip=skip, limit=limit)
+    tags = await run_db(crud_tag.get_tags, db, skip=skip, limit=limit)
     return [TagResponse.model_validate(tag) for tag in tags]
 
 
@@ -33,17 +34,19 @@ async def get_tags_cloud(
     limit: int = Query(50, ge=1, le=200, description="Количество тегов для облака"), db: Session = Depends(get_db)
 ):
     """Получить теги с количеством промптов для облака тегов"""
-    tags_with_count = crud_tag.get_tags_with_count(db, skip=0, limit=limit)
-    return [
-        TagWithCountResponse(id=tag.id, name=tag.name, slug=tag.slug, created_at=tag.created_at, prompt_count=count)
-        for tag, count in tags_with_count
-    ]
+    return await run_db(cache.get_or_set, f"tags:cloud:{limit}", lambda: _get_tags_cloud(db, limit))
+
+
+def _get_tags_cloud(db: Session, limit: int) -> List[TagWithCountResponse]:
+    """Посчитать облако тегов (выполняется в пуле потоков БД)"""
+    tags = crud_tag.get_tags_with_count(db, skip=0, limit=limit)
+    return [TagWithCountResponse.model_validate(tag) for tag in tags]
 
 
 @router.get("/{tag_id}", response_model=TagResponse)
 async def get_tag(tag_id: int, db: Session = Depends(get_db)):
     """Получить тег по ID"""
-    tag = crud_tag.get_tag(db, tag_id)
+    tag = await run_db(crud_tag.get_tag, db, tag_id)
     if not tag:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тег не найден")
 
@@ -54,7 +57,7 @@ async def get_tag(tag_id: int, db: Session = Depends(get_db)):
 async def create_tag(tag: TagCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Создать новый тег (требует аутентификации)"""
     try:
-        db_tag = crud_tag.create_tag(db, tag)
+        db_tag = await run_db(crud_tag.create_tag, db, tag)
         logger.info(f"Создан тег: {db_tag.id} ({db_tag.name})")
         return TagResponse.model_validate(db_tag)
     except Exception as e:
@@ -67,7 +70,7 @@ async def update_tag(
     tag_id: int, tag_update: TagUpdate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)
 ):
     """Обновить тег (требует аутентификации)"""
-    db_tag = crud_tag.update_tag(db, tag_id, tag_update)
+    db_tag = await run_db(crud_tag.update_tag, db, tag_id, tag_update)
     if not db_tag:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тег не найден")
 
@@ -78,7 +81,7 @@ async def update_tag(
 @router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_tag(tag_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Удалить тег (требует аутентификации)"""
-    success = crud_tag.delete_tag(db, tag_id)
+    success = await run_db(crud_tag.delete_tag, db, tag_id)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тег не найден")
 
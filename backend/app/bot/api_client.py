@@ -6,12 +6,37 @@ from typing import Any, Dict, Optional
 
 import aiohttp
 
-from app.bot.config import API_BASE_URL, API_SECRET
+from app.bot.config import (
+    API_BASE_URL,
+    API_CONNECT_TIMEOUT,
+    API_DNS_CACHE_TTL,
+    API_KEEPALIVE_TIMEOUT,
+    API_POOL_LIMIT,
+    API_SECRET,
+    API_TIMEOUT,
+)
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 
+def create_session() -> aiohttp.ClientSession:
+    """
+    Создать общую сессию aiohttp для запросов к backend
+
+    Одна сессия на процесс бота: соединения переиспользуются между сообщениями
+    пользователей (keep-alive), DNS кэшируется, число соединений ограничено.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=API_POOL_LIMIT,
+        limit_per_host=API_POOL_LIMIT,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=API_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(total=API_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
 class APIClient:
     """Клиент для работы с PromptVault API"""
 
@@ -23,6 +48,8 @@ class APIClient:
         }
         if self.api_secret:
             self.headers["Authorization"] = f"Bearer {self.api_secret}"
+        # Таймаут на каждый запрос (не зависит от настроек переданной сессии)
+        self.timeout = aiohttp.ClientTimeout(total=API_TIMEOUT, connect=API_CONNECT_TIMEOUT)
 
     @property
     def base_url(self) -> str:
@@ -44,13 +71,13 @@ class APIClient:
         Returns:
             Dict с данными промпта или None при ошибке
         """
-        url = f"{self._base_url}/api/v1/prompts"
+        url = f"{self._base_url}/api/v1/prompts/"
         data = {"tg_message_id": tg_message_id, "tg_channel_id": tg_channel_id, "text": text, "is_pinned": is_pinned}
         if image_url:
             data["image_url"] = image_url
 
         try:
-            async with session.post(url, json=data, headers=self.headers) as response:
+            async with session.post(url, json=data, headers=self.headers, timeout=self.timeout) as response:
                 if response.status == 201:
                     result = await response.json()
                     logger.info(f"Промпт создан: {tg_message_id}")
@@ -82,7 +109,7 @@ class APIClient:
             data["image_url"] = image_url
 
         try:
-            async with session.patch(url, json=data, headers=self.headers) as response:
+            async with session.patch(url, json=data, headers=self.headers, timeout=self.timeout) as response:
                 if response.status == 200:
                     result = await response.json()
                     logger.info(f"Промпт обновлен: {tg_message_id}")
@@ -108,7 +135,7 @@ class APIClient:
         url = f"{self._base_url}/api/v1/prompts/by-tg-id/{tg_message_id}"
 
         try:
-            async with session.delete(url, headers=self.headers) as response:
+            async with session.delete(url, headers=self.headers, timeout=self.timeout) as response:
                 if response.status == 204:
                     logger.info(f"Промпт удален: {tg_message_id}")
                     return True
@@ -133,7 +160,7 @@ class APIClient:
         url = f"{self._base_url}/api/v1/prompts/by-tg-id/{tg_message_id}"
 
         try:
-            async with session.get(url, headers=self.headers) as response:
+            async with session.get(url, headers=self.headers, timeout=self.timeout) as response:
                 if response.status == 200:
                     result = await response.json()
                     return result
@@ -146,3 +173,51 @@ class APIClient:
         except Exception as e:
             logger.error(f"Исключение при получении промпта {tg_message_id}: {e}", extra={"error": str(e)})
             return None
+
+    async def search_prompts(
+        self, session: aiohttp.ClientSession, query: str, limit: int = 5, fuzzy: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Полнотекстовый поиск промптов
+
+        Args:
+            fuzzy: Учитывать опечатки в запросе
+
+        Returns:
+            Dict со страницей результатов или None при ошибке
+        """
+        params = {"q": query, "limit": limit}
+        if fuzzy:
+            params["fuzzy"] = "true"
+        return await self._get_list(session, "/api/v1/search/", params, f"поиске '{query}'")
+
+    async def list_prompts(
+        self, session: aiohttp.ClientSession, limit: int = 10, page: int = 1, pinned: Optional[bool] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Получить страницу списка промптов
+
+        Returns:
+            Dict со страницей промптов или None при ошибке
+        """
+        params = {"limit": limit, "page": page}
+        if pinned is not None:
+            params["pinned"] = "true" if pinned else "false"
+        return await self._get_list(session, "/api/v1/prompts/", params, "получении списка промптов")
+
+    async def _get_list(
+        self, session: aiohttp.ClientSession, path: str, params: Dict[str, Any], action: str
+    ) -> Optional[Dict[str, Any]]:
+        """GET запрос списочного эндпоинта: разобранный JSON или None при ошибке"""
+        url = f"{self._base_url}{path}"
+
+        try:
+            async with session.get(url, params=params, headers=self.headers, timeout=self.timeout) as response:
+                if response.status == 200:
+                    return await response.json()
+                error_text = await response.text()
+                logger.error(f"Ошибка при {action}: {response.status} - {error_text}")
+                return None
+        except Exception as e:
+            logger.error(f"Исключение при {action}: {e}", extra={"error": str(e)})
+            return None
@@ -2,7 +2,7 @@
 Обработчики команд Telegram бота
 """
 
-
+import aiohttp
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup
@@ -79,7 +79,7 @@ async def cmd_help(message: Message):
 
 
 @router.message(Command("get"))
-async def cmd_get(message: Message):
+async def cmd_get(message: Message, session: aiohttp.ClientSession):
     """Обработчик команды /get - поиск промпта"""
     try:
         # Извлечение аргумента команды
@@ -95,7 +95,7 @@ async def cmd_get(message: Message):
         # Проверка, является ли запрос числом (ID)
         if query.isdigit():
             prompt_id = int(query)
-            result = await retry_with_backoff(api_client.get_prompt_by_tg_id, tg_message_id=prompt_id)
+            result = await retry_with_backoff(api_client.get_prompt_by_tg_id, session=session, tg_message_id=prompt_id)
 
             if result:
                 await send_prompt(message, result)
@@ -106,36 +106,26 @@ async def cmd_get(message: Message):
         # Поиск по тексту
         await message.answer("🔍 Ищу промпты...")
 
-        # Используем поиск через API
-        # Для упрощения используем прямой запрос к API
-        import aiohttp
-
-        search_url = f"{api_client._base_url}/api/v1/search"
-        params = {"q": query, "limit": 5}
-        headers = api_client.headers
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    prompts = data.get("items", [])
-
-                    if not prompts:
-                        await message.answer(f"❌ Промпты по запросу '{query}' не найдены.")
-                        return
-
-                    # Отправляем первый найденный промпт
-                    if len(prompts) > 0:
-                        await send_prompt(message, prompts[0])
-
-                        # Если найдено больше одного, предлагаем посмотреть остальные
-                        if len(prompts) > 1:
-                            await message.answer(
-                                f"📋 Найдено промптов: {data.get('total', len(prompts))}\n"
-                                f"Показан первый результат. Уточните запрос для более точного поиска."
-                            )
-                else:
-                    await message.answer("❌ Ошибка при поиске. Попробуйте позже.")
+        # Поиск через API (общая сессия бота), с учетом опечаток - запросы набирают с телефона
+        data = await api_client.search_prompts(session, query, limit=5, fuzzy=True)
+        if data is None:
+            await message.answer("❌ Ошибка при поиске. Попробуйте позже.")
+            return
+
+        prompts = data.get("items", [])
+        if not prompts:
+            await message.answer(f"❌ Промпты по запросу '{query}' не найдены.")
+            return
+
+        # Отправляем первый найденный промпт
+        await send_prompt(message, prompts[0])
+
+        # Если найдено больше одного, предлагаем посмотреть остальные
+        if len(prompts) > 1:
+            await message.answer(
+                f"📋 Найдено промптов: {data.get('total') or len(prompts)}\n"
+                f"Показан первый результат. Уточните запрос для более точного поиска."
+            )
 
         logger.info(f"Команда /get выполнена для пользователя {message.from_user.id}, запрос: {query}")
     except Exception as e:
@@ -144,45 +134,36 @@ async def cmd_get(message: Message):
 
 
 @router.message(Command("recent"))
-async def cmd_recent(message: Message):
+async def cmd_recent(message: Message, session: aiohttp.ClientSession):
     """Обработчик команды /recent - последние промпты"""
     try:
         await message.answer("📋 Загружаю последние промпты...")
 
-        import aiohttp
-
-        url = f"{api_client._base_url}/api/v1/prompts"
-        params = {"limit": 10, "page": 1}
-        headers = api_client.headers
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    prompts = data.get("items", [])
+        data = await api_client.list_prompts(session, limit=10, page=1)
+        if data is None:
+            await message.answer("❌ Ошибка при загрузке промптов.")
+            return
 
-                    if not prompts:
-                        await message.answer("❌ Промпты не найдены.")
-                        return
+        prompts = data.get("items", [])
+        if not prompts:
+            await message.answer("❌ Промпты не найдены.")
+            return
 
-                    # Отправляем список промптов
-                    text = f"📋 Последние {len(prompts)} промптов:\n\n"
-                    for i, prompt in enumerate(prompts[:10], 1):
-                        preview = prompt.get("text", "")[:100]
-                        if len(prompt.get("text", "")) > 100:
-                            preview += "..."
+        # Отправляем список промптов
+        text = f"📋 Последние {len(prompts)} промптов:\n\n"
+        for i, prompt in enumerate(prompts[:10], 1):
+            preview = prompt.get("text", "")[:100]
+            if len(prompt.get("text", "")) > 100:
+                preview += "..."
 
-                        pinned_icon = "📌 " if prompt.get("is_pinned") else ""
-                        text += f"{i}. {pinned_icon}ID: {prompt.get('id')}\n"
-                        text += f"   {preview}\n\n"
+            pinned_icon = "📌 " if prompt.get("is_pinned") else ""
+            text += f"{i}. {pinned_icon}ID: {prompt.get('id')}\n"
+            text += f"   {preview}\n\n"
 
-                    await message.answer(text)
+        await message.answer(text)
 
-                    # Отправляем первый промпт полностью
-                    if prompts:
-                        await send_prompt(message, prompts[0])
-                else:
-                    await message.answer("❌ Ошибка при загрузке промптов.")
+        # Отправляем первый промпт полностью
+        await send_prompt(message, prompts[0])
 
         logger.info(f"Команда /recent выполнена для пользователя {message.from_user.id}")
     except Exception as e:
@@ -191,44 +172,35 @@ async def cmd_recent(message: Message):
 
 
 @router.message(Command("pinned"))
-async def cmd_pinned(message: Message):
+async def cmd_pinned(message: Message, session: aiohttp.ClientSession):
     """Обработчик команды /pinned - закрепленные промпты"""
     try:
         await message.answer("📌 Загружаю закрепленные промпты...")
 
-        import aiohttp
-
-        url = f"{api_client._base_url}/api/v1/prompts"
-        params = {"limit": 10, "page": 1, "pinned": True}
-        headers = api_client.headers
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    prompts = data.get("items", [])
+        data = await api_client.list_prompts(session, limit=10, page=1, pinned=True)
+        if data is None:
+            await message.answer("❌ Ошибка при загрузке закрепленных промптов.")
+            return
 
-                    if not prompts:
-                        await message.answer("❌ Закрепленные промпты не найдены.")
-                        return
+        prompts = data.get("items", [])
+        if not prompts:
+            await message.answer("❌ Закрепленные промпты не найдены.")
+            return
 
-                    # Отправляем список
-                    text = f"📌 Закрепленные промпты ({len(prompts)}):\n\n"
-                    for i, prompt in enumerate(prompts[:10], 1):
-                        preview = prompt.get("text", "")[:100]
-                        if len(prompt.get("text", "")) > 100:
-                            preview += "..."
+        # Отправляем список
+        text = f"📌 Закрепленные промпты ({len(prompts)}):\n\n"
+        for i, prompt in enumerate(prompts[:10], 1):
+            preview = prompt.get("text", "")[:100]
+            if len(prompt.get("text", "")) > 100:
+                preview += "..."
 
-                        text += f"{i}. ID: {prompt.get('id')}\n"
-                        text += f"   {preview}\n\n"
+            text += f"{i}. ID: {prompt.get('id')}\n"
+            text += f"   {preview}\n\n"
 
-                    await message.answer(text)
+        await message.answer(text)
 
-                    # Отправляем первый промпт полностью
-                    if prompts:
-                        await send_prompt(message, prompts[0])
-                else:
-                    await message.answer("❌ Ошибка при загрузке закрепленных промптов.")
+        # Отправляем первый промпт полностью
+        await send_prompt(message, prompts[0])
 
         logger.info(f"Команда /pinned выполнена для пользователя {message.from_user.id}")
     except Exception as e:
@@ -275,7 +247,7 @@ async def send_prompt(message: Message, prompt_data: dict):
 
 
 @router.message()
-async def handle_text_message(message: Message):
+async def handle_text_message(message: Message, session: aiohttp.ClientSession):
     """
     Обработчик текстовых сообщений (поиск без команды)
     """
@@ -294,37 +266,27 @@ async def handle_text_message(message: Message):
 
         await message.answer("🔍 Ищу промпты...")
 
-        # Используем поиск
-        import aiohttp
-
-        search_url = f"{api_client._base_url}/api/v1/search"
-        params = {"q": query, "limit": 3}
-        headers = api_client.headers
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    prompts = data.get("items", [])
-
-                    if not prompts:
-                        await message.answer(
-                            f"❌ Промпты по запросу '{query}' не найдены.\n"
-                            "Попробуйте другой запрос или используйте /help для справки."
-                        )
-                        return
-
-                    # Отправляем найденные промпты
-                    total = data.get("total", len(prompts))
-                    if total > 3:
-                        await message.answer(
-                            f"📋 Найдено промптов: {total}\nПоказаны первые {len(prompts)} результатов."
-                        )
-
-                    for prompt in prompts:
-                        await send_prompt(message, prompt)
-                else:
-                    await message.answer("❌ Ошибка при поиске. Попробуйте позже.")
+        # Используем поиск с учетом опечаток (общая сессия бота)
+        data = await api_client.search_prompts(session, query, limit=3, fuzzy=True)
+        if data is None:
+            await message.answer("❌ Ошибка при поиске. Попробуйте позже.")
+            return
+
+        prompts = data.get("items", [])
+        if not prompts:
+            await message.answer(
+                f"❌ Промпты по запросу '{query}' не найдены.\n"
+                "Попробуйте другой запрос или используйте /help для справки."
+            )
+            return
+
+        # Отправляем найденные промпты
+        total = data.get("total") or len(prompts)
+        if total > 3:
+            await message.answer(f"📋 Найдено промптов: {total}\nПоказаны первые {len(prompts)} результатов.")
+
+        for prompt in prompts:
+            await send_prompt(message, prompt)
 
         logger.info(f"Поиск выполнен для пользователя {message.from_user.id}, запрос: {query}")
     except Exception as e:
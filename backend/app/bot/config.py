@@ -9,3 +9,10 @@ BOT_SECRET = settings.bot_secret
 CHANNEL_ID = int(settings.channel_id) if settings.channel_id else None
 API_BASE_URL = "http://localhost:8000"  # В production изменить на реальный URL
 API_SECRET = settings.api_secret
+
+# Пул соединений aiohttp для запросов к backend
+API_POOL_LIMIT = 20  # Максимум одновременных соединений
+API_KEEPALIVE_TIMEOUT = 60  # секунды простоя, после которых соединение закрывается
+API_DNS_CACHE_TTL = 300  # секунды
+API_TIMEOUT = 10  # Общий таймаут запроса, секунды
+API_CONNECT_TIMEOUT = 3  # Таймаут установки соединения, секунды
@@ -163,7 +163,7 @@ async def handle_edited_channel_post(message: Message, session: aiohttp.ClientSe
         logger.warning(f"Не удалось обновить промпт: {message.message_id}")
 
 
-async def handle_delete_message(tg_message_id: int, tg_channel_id: int, session: aiohttp.ClientSession = None):
+async def handle_delete_message(tg_message_id: int, tg_channel_id: int, session: aiohttp.ClientSession):
     """
     Обработчик удаления поста
 
@@ -173,7 +173,7 @@ async def handle_delete_message(tg_message_id: int, tg_channel_id: int, session:
     Args:
         tg_message_id: ID удаленного сообщения
         tg_channel_id: ID канала
-        session: aiohttp сессия (если есть)
+        session: Общая aiohttp сессия бота (create_session)
     """
     # Проверка канала
     if tg_channel_id != CHANNEL_ID:
@@ -182,14 +182,6 @@ async def handle_delete_message(tg_message_id: int, tg_channel_id: int, session:
 
     logger.info(f"Получено уведомление об удалении поста: {tg_message_id}")
 
-    if session is None:
-        # Fallback если сессии нет (хотя должна быть)
-        async with aiohttp.ClientSession() as temp_session:
-            result = await retry_with_backoff(
-                api_client.delete_prompt, session=temp_session, tg_message_id=tg_message_id
-            )
-            return
-
     # Попытка удаления с повторами
     result = await retry_with_backoff(api_client.delete_prompt, session=session, tg_message_id=tg_message_id)
 
@@ -5,10 +5,10 @@
 import asyncio
 import sys
 
-import aiohttp
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 
+from app.bot.api_client import create_session
 from app.bot.commands import router as commands_router
 from app.bot.config import BOT_TOKEN, CHANNEL_ID
 from app.bot.handlers import router as channel_router
@@ -31,8 +31,8 @@ async def main():
 
     logger.info(f"Запуск Telegram бота для канала {CHANNEL_ID}")
 
-    # Инициализация глобальной сессии aiohttp
-    session = aiohttp.ClientSession()
+    # Инициализация глобальной сессии aiohttp (общий пул соединений к backend)
+    session = create_session()
 
     # Создание бота и диспетчера
     bot = Bot(
@@ -0,0 +1,313 @@
+"""
+Кэш горячих результатов (поиск, облако тегов, промпт по ID)
+
+Хранилище выбирается настройкой CACHE_BACKEND:
+- memory - LRU в памяти процесса (по умолчанию, для одного воркера);
+- sqlite - общий файл SQLite, который разделяют все воркеры uvicorn на сервере.
+
+Записи привязаны к поколению данных: любое изменение промптов или тегов увеличивает
+поколение, и записи предыдущих поколений перестают читаться. В sqlite поколение хранится
+в том же файле, поэтому сброс после записи в одном воркере сразу виден остальным.
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class CacheBackend(ABC):
+    """Хранилище записей кэша"""
+
+    name = ""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Получить значение текущего поколения (None при промахе или истекшем TTL)"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, generation: int) -> None:
+        """Сохранить значение, если поколение generation все еще текущее"""
+
+    @abstractmethod
+    def current_generation(self) -> int:
+        """Текущее поколение данных"""
+
+    @abstractmethod
+    def invalidate(self) -> None:
+        """Увеличить поколение и сбросить записи"""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Количество записей"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Потокобезопасный LRU кэш с ограничением времени жизни записей в памяти процесса"""
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._generation = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def current_generation(self) -> int:
+        return self._generation
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Общий кэш в файле SQLite для нескольких процессов
+
+    Значения сериализуются pickle. Каждый поток использует свое соединение.
+    Лишние и устаревшие записи удаляются периодически при записи (по времени истечения).
+    """
+
+    name = "sqlite"
+
+    # Очистка выполняется раз в столько вызовов set
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: str, max_size: int = 1024, ttl: float = 300.0):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local = threading.local()
+        self._sets = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, generation INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ? "
+                "AND generation = (SELECT value FROM cache_meta WHERE name = 'generation')",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, generation: int) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, generation) "
+            "SELECT ?, ?, ?, value FROM cache_meta WHERE name = 'generation' AND value = ?",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time() + self.ttl, generation),
+        )
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Удалить устаревшие записи и ограничить размер"""
+        conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at <= ? "
+            "OR generation <> (SELECT value FROM cache_meta WHERE name = 'generation')",
+            (time.time(),),
+        )
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN "
+            "(SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+
+    def current_generation(self) -> int:
+        row = self._connection().execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()
+        return row[0]
+
+    def invalidate(self) -> None:
+        conn = self._connection()
+        conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+        conn.execute("DELETE FROM cache_entries")
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class Cache:
+    """Кэш с поколениями данных и счетчиками попаданий для мониторинга"""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Кэш включен"""
+        return self.backend is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Получить значение (None при промахе)"""
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Ошибка чтения кэша: {e}", extra={"error": str(e)})
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def current_generation(self) -> Optional[int]:
+        """Поколение данных перед вычислением значения (None - кэш отключен или недоступен)"""
+        if not self.enabled:
+            return None
+        try:
+            return self.backend.current_generation()
+        except Exception as e:
+            logger.warning(f"Ошибка чтения поколения кэша: {e}", extra={"error": str(e)})
+            return None
+
+    def set(self, key: str, value: Any, generation: Optional[int]) -> None:
+        """
+        Сохранить значение, вычисленное в поколении generation (из current_generation)
+
+        Если данные успели измениться, значение не сохраняется. None не кэшируется.
+        """
+        if generation is None or value is None:
+            return
+        try:
+            self.backend.set(key, value, generation)
+        except Exception as e:
+            logger.warning(f"Ошибка записи в кэш: {e}", extra={"error": str(e)})
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Получить значение из кэша или вычислить и сохранить его
+
+        Результат, вычисленный во время изменения данных (поколение сменилось), не сохраняется.
+        None не кэшируется.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self.current_generation()
+        value = compute()
+        self.set(key, value, generation)
+        return value
+
+    def invalidate(self) -> None:
+        """Сбросить кэш после изменения данных (во всех воркерах для общего хранилища)"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.invalidate()
+        except Exception as e:
+            logger.error(f"Ошибка сброса кэша: {e}", extra={"error": str(e)})
+
+    def stats(self) -> dict:
+        """Счетчики для мониторинга (попадания и промахи - по текущему процессу)"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        requests = hits + misses
+        result = {
+            "backend": self.backend.name if self.enabled else "none",
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / requests, 3) if requests else 0.0,
+        }
+        if self.enabled:
+            result["size"] = self.backend.size()
+            result["generation"] = self.backend.current_generation()
+        return result
+
+
+def search_cache_key(
+    query: str,
+    page: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    tag_ids: Optional[Iterable[int]] = None,
+    pinned_only: Optional[bool] = None,
+    fields: Optional[str] = None,
+    fuzzy: bool = False,
+) -> str:
+    """
+    Ключ кэша поиска: запрос, фильтры, позиция страницы, проекция полей и режим
+
+    Запрос берется как есть (без пробелов по краям): нормализация склеила бы запросы с разным смыслом
+    (#котики и котики, OR и or).
+    """
+    parts = [query.strip(), sorted(set(tag_ids or ())), pinned_only, page, limit, cursor, fields, fuzzy]
+    return "search:" + json.dumps(parts, ensure_ascii=False)
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    """Создать хранилище по настройкам (None - кэш отключен)"""
+    if settings.cache_size <= 0 or settings.cache_ttl <= 0 or settings.cache_backend == "none":
+        return None
+    if settings.cache_backend == "sqlite":
+        return SQLiteCacheBackend(settings.cache_path, max_size=settings.cache_size, ttl=settings.cache_ttl)
+    if settings.cache_backend != "memory":
+        logger.warning(f"Неизвестный CACHE_BACKEND={settings.cache_backend}, используется memory")
+    return MemoryCacheBackend(max_size=settings.cache_size, ttl=settings.cache_ttl)
+
+
+cache = Cache(create_cache_backend())
@@ -0,0 +1,198 @@
+"""
+Сжатие ответов API (brotli / gzip) и кэш сжатых горячих страниц
+
+Ответы сжимаются, если клиент их принимает, тело пришло целиком (потоковые ответы импорта
+проходят без изменений) и не меньше порога. brotli используется, если установлен пакет brotli
+(необязательная зависимость), иначе gzip.
+
+Первые страницы списка без фильтров запрашиваются чаще всего, поэтому их сжатые байты
+сохраняются в общем кэше (app.core.cache) и сбрасываются вместе с ним при изменении данных:
+повторный запрос не выполняет ни запрос к БД, ни сериализацию, ни сжатие.
+"""
+
+import asyncio
+import gzip
+from typing import Optional, Sequence
+from urllib.parse import parse_qsl
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.cache import cache
+from app.core.logging_config import get_logger
+from app.database import run_db
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен
+    brotli = None
+
+logger = get_logger(__name__)
+
+# Тела больше этого размера сжимаются в пуле потоков, чтобы не блокировать event loop
+OFFLOAD_SIZE = 256 * 1024
+
+# Параметры запроса, при которых страница считается первой страницей без фильтров
+HOT_PAGE_PARAMS = {"page", "limit"}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Выбрать кодировку по заголовку Accept-Encoding: br (если доступен brotli), затем gzip"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def add_vary_header(headers: MutableHeaders) -> None:
+    """
+    Vary: Accept-Encoding для ответа, который сжимается при поддержке клиентом
+
+    Заголовок нужен и несжатому варианту: иначе общий кэш (прокси, CDN) отдаст его клиенту,
+    принимающему сжатие, или сжатый вариант - клиенту без его поддержки.
+    """
+    if "content-encoding" not in headers and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+        headers.add_vary_header("Accept-Encoding")
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Сжать тело ответа (gzip без времени в заголовке - одинаковый результат для одинаковых данных)"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: сжатие ответов с порогом размера и кэшем сжатых горячих страниц
+
+    hot_paths - пути, первые страницы которых без фильтров (только page=1 и limit) кэшируются сжатыми.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        hot_paths: Sequence[str] = (),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.hot_paths = set(hot_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+
+            async def send_with_vary(message) -> None:
+                if message["type"] == "http.response.start":
+                    add_vary_header(MutableHeaders(scope=message))
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        key = self._hot_page_key(scope, encoding)
+        generation = None
+        if key is not None:
+            cached = await run_db(cache.get, key)
+            if cached is not None:
+                headers, body = cached
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            generation = await run_db(cache.current_generation)
+
+        responder = _CompressingResponder(self, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+        if key is not None and responder.compressed is not None:
+            await run_db(cache.set, key, responder.compressed, generation)
+
+    def _hot_page_key(self, scope, encoding: str) -> Optional[str]:
+        """Ключ кэша для первой страницы без фильтров (None - страница не кэшируется)"""
+        if scope["method"] != "GET" or scope["path"] not in self.hot_paths:
+            return None
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        params = dict(parse_qsl(query_string))
+        if not set(params) <= HOT_PAGE_PARAMS or params.get("page", "1") != "1":
+            return None
+        return f"compressed:{encoding}:{scope['path']}?{query_string}"
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        """Сжать тело (большие тела - в пуле потоков)"""
+        if len(body) < OFFLOAD_SIZE:
+            return compress(body, encoding, self.gzip_level, self.brotli_quality)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, compress, body, encoding, self.gzip_level, self.brotli_quality)
+
+
+class _CompressingResponder:
+    """Обертка send одного ответа: откладывает заголовки до первой части тела и сжимает тело целиком"""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str):
+        self.middleware = middleware
+        self.downstream = send
+        self.encoding = encoding
+        self.start_message = None
+        self.passthrough = False
+        # (заголовки, тело) сжатого ответа 200 для кэша горячих страниц
+        self.compressed: Optional[tuple[list, bytes]] = None
+
+    async def send(self, message) -> None:
+        if self.passthrough:
+            await self.downstream(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        # Первая часть тела: решаем, сжимать ли ответ
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if message.get("more_body", False) or not self._should_compress(headers, body):
+            # Потоковый, маленький, уже сжатый или несжимаемый ответ отдается как есть
+            add_vary_header(headers)
+            self.passthrough = True
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        compressed = await self.middleware.compress(body, self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        if self.start_message["status"] == 200:
+            self.compressed = (list(self.start_message["headers"]), compressed)
+
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": compressed})
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        content_type = headers.get("content-type", "")
+        return (
+            len(body) >= self.middleware.minimum_size
+            and "content-encoding" not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
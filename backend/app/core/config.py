@@ -32,6 +32,41 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./data/promptvault.db"
+    db_executor_workers: int = 8  # Размер пула потоков для операций с БД
+
+    # SQLite tuning (применяется к каждому новому соединению)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456  # 256 МБ
+    sqlite_cache_size: int = -65536  # Отрицательное значение - размер в КиБ (64 МБ)
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout: int = 5000  # мс
+    sqlite_foreign_keys: bool = True
+    sqlite_maintenance_interval: int = 3600  # Период PRAGMA optimize / wal_checkpoint в секундах (0 - отключить)
+
+    # Кэш горячих результатов: memory (в процессе), sqlite (общий файл для всех воркеров), none
+    cache_backend: str = "memory"
+    cache_path: str = "./data/cache.db"  # Файл общего кэша для cache_backend=sqlite
+    cache_size: int = 1024  # Максимум записей (0 - отключить)
+    cache_ttl: int = 300  # Время жизни записи в секундах (0 - отключить)
+
+    # Условные GET запросы (ETag / 304) для эндпоинтов чтения (только SQLite)
+    http_cache_enabled: bool = True
+    http_cache_nginx_ttl: int = 1  # Микрокэш nginx через X-Accel-Expires, секунды (0 - не отдавать)
+
+    # Сжатие ответов (brotli, если установлен пакет brotli, иначе gzip)
+    compression_enabled: bool = True
+    compression_min_size: int = 1024  # Ответы меньше порога (байт) не сжимаются
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Токенизатор полнотекстового индекса: unicode61 или porter (+ основы английских слов), см. app/search/fts5.py
+    fts5_tokenizer: str = "unicode61"
+    fts5_merge_interval: int = 600  # Период фонового слияния сегментов FTS5 в секундах (0 - отключить)
+    fts5_merge_pages: int = 64  # Страниц за одну порцию слияния (порции выполняются короткими транзакциями)
+
+    # Быстрый путь списков и поиска: выборка столбцов без ORM и ответ без повторной валидации pydantic
+    fast_json_responses: bool = False
 
     # Environment
     environment: str = "development"
@@ -0,0 +1,201 @@
+"""
+Условные GET запросы (ETag / Last-Modified / 304) для эндпоинтов чтения
+
+ETag строится из глобальной версии данных (таблица data_version, которую увеличивает фиксация
+транзакции с изменениями промптов и тегов, см. app/database.py)
+и URL запроса. Если If-None-Match совпадает с текущим ETag, middleware отвечает 304 сразу,
+без обращения к эндпоинту, БД и сериализации.
+
+Текущая версия читается из БД только после того, как какое-либо соединение зафиксировало
+изменения (PRAGMA data_version на выделенном соединении), поэтому обычный запрос стоит
+одной проверки заголовка файла БД. Проверка выполняется в пуле потоков БД.
+
+Ответы за ETag могут браться из кэшей процесса (кэш результатов, сжатые горячие страницы,
+словари подсказок), которые сбрасывают только записи через API этого процесса. Поэтому при
+новой версии данных (например, после scripts/sync_channel.py) трекер вызывает обработчики
+on_change, сбрасывающие эти кэши, до того как ответ будет построен под новым ETag.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.database import run_db
+
+logger = get_logger(__name__)
+
+# Кодировки сжатых представлений (суффиксы ETag, см. app/core/compression.py)
+ENCODINGS = ("gzip", "br")
+
+# Триггеры прежней схемы, увеличивавшие версию на каждую измененную строку
+LEGACY_DATA_VERSION_TRIGGERS = (
+    ("prompts", "INSERT"),
+    ("prompts", "UPDATE"),
+    ("prompts", "DELETE"),
+    ("tags", "INSERT"),
+    ("tags", "UPDATE"),
+    ("tags", "DELETE"),
+    ("prompt_tags", "INSERT"),
+    ("prompt_tags", "DELETE"),
+)
+
+
+def init_data_version(db: Session) -> None:
+    """Создать строку версии данных (таблица создается моделью DataVersion) и удалить старые триггеры"""
+    db.execute(text("INSERT OR IGNORE INTO data_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)"))
+    for table, event in LEGACY_DATA_VERSION_TRIGGERS:
+        db.execute(text(f"DROP TRIGGER IF EXISTS data_version_{table}_{event.lower()}"))
+    db.commit()
+
+
+class DataVersionTracker:
+    """
+    Текущая версия данных для ETag
+
+    Держит выделенное соединение только для чтения: PRAGMA data_version на нем меняется,
+    когда любое другое соединение (другой поток, воркер или скрипт синхронизации)
+    фиксирует транзакцию. Только тогда перечитывается строка data_version, и если версия
+    изменилась, вызываются обработчики on_change (сброс кэшей процесса).
+    """
+
+    def __init__(self, database_path: str, on_change: Sequence[Callable[[], None]] = ()):
+        self.database_path = database_path
+        self.on_change = tuple(on_change)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._seen: Optional[int] = None
+        self._value: Optional[tuple[int, datetime]] = None
+        self._lock = threading.Lock()
+
+    async def current(self) -> tuple[int, datetime]:
+        """
+        Версия и время последнего изменения данных (чтение в пуле потоков БД)
+
+        Raises:
+            sqlite3.Error: Если таблица версии недоступна
+        """
+        return await run_db(self.read)
+
+    def read(self) -> tuple[int, datetime]:
+        """Синхронное чтение версии (см. current)"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(
+                    f"file:{self.database_path}?mode=ro", uri=True, isolation_level=None, check_same_thread=False
+                )
+            seen = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if seen != self._seen or self._value is None:
+                row = self._conn.execute("SELECT version, updated_at FROM data_version WHERE id = 1").fetchone()
+                if row is None:
+                    raise sqlite3.OperationalError("data_version не инициализирована")
+                updated_at = datetime.fromisoformat(str(row[1])).replace(tzinfo=timezone.utc)
+                changed = self._value is None or self._value[0] != row[0]
+                self._value = (row[0], updated_at)
+                self._seen = seen
+                if changed:
+                    self._notify()
+            return self._value
+
+    def _notify(self) -> None:
+        for callback in self.on_change:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика изменения версии данных: {e}", extra={"error": str(e)})
+
+
+def make_etag(version: int, path: str, query_string: bytes) -> str:
+    """Сильный ETag для версии данных и URL"""
+    digest = hashlib.sha1(f"{version}:{path}?".encode() + query_string).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag сжатого представления (у каждой кодировки свой ETag)"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def matching_etag(if_none_match: str, etag: str) -> Optional[str]:
+    """
+    Проверка If-None-Match (слабое сравнение: W/ от прокси с gzip тоже совпадает)
+
+    Returns:
+        Optional[str]: Совпавший ETag клиента (с суффиксом кодировки, если он был) или None
+    """
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        base = tag
+        for encoding in ENCODINGS:
+            if tag.endswith(f'-{encoding}"'):
+                base = f'{tag[: -len(encoding) - 2]}"'
+                break
+        if base == etag:
+            return tag
+    return None
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware: ETag, Last-Modified, Cache-Control и ответ 304 для GET/HEAD
+
+    Браузеру отдается Cache-Control: no-cache (всегда перепроверять по ETag),
+    nginx - X-Accel-Expires для микрокэширования на nginx_ttl секунд.
+    """
+
+    def __init__(self, app, tracker: DataVersionTracker, paths: Sequence[str], nginx_ttl: int = 0):
+        self.app = app
+        self.tracker = tracker
+        self.paths = tuple(paths)
+        self.nginx_ttl = nginx_ttl
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        if not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            version, updated_at = await self.tracker.current()
+        except Exception as e:
+            logger.warning(f"Версия данных недоступна, ETag не используется: {e}", extra={"error": str(e)})
+            await self.app(scope, receive, send)
+            return
+
+        etag = make_etag(version, scope["path"], scope.get("query_string", b""))
+        cache_headers = [
+            (b"last-modified", format_datetime(updated_at, usegmt=True).encode()),
+            (b"cache-control", b"no-cache"),
+        ]
+        if self.nginx_ttl > 0:
+            cache_headers.append((b"x-accel-expires", str(self.nginx_ttl).encode()))
+
+        if_none_match = next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+        matched = matching_etag(if_none_match.decode("latin-1"), etag) if if_none_match is not None else None
+        if matched is not None:
+            headers = [(b"etag", matched.encode())] + cache_headers
+            if matched != etag:
+                headers.append((b"vary", b"Accept-Encoding"))
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cache_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = list(message.get("headers", []))
+                # Сжатый ответ (CompressionMiddleware внутри) получает ETag своей кодировки
+                encoding = next((value for name, value in headers if name == b"content-encoding"), None)
+                response_etag = encoded_etag(etag, encoding.decode("latin-1")) if encoding else etag
+                message["headers"] = headers + [(b"etag", response_etag.encode())] + cache_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
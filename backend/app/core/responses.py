@@ -0,0 +1,38 @@
+"""
+Быстрая сериализация JSON ответов
+
+Ответы кодируются orjson (requirements.txt); если он не установлен - стандартным json
+с тем же компактным форматом.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен
+    orjson = None
+
+# Кодировщик ответов (для отчетов бенчмарка)
+JSON_ENCODER = f"orjson {orjson.__version__}" if orjson is not None else "json (стандартный)"
+
+
+def _json_default(value: Any) -> str:
+    """Даты для стандартного json в том же формате, что у orjson и pydantic"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON ответ через orjson (класс ответа по умолчанию для приложения)"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default
+        ).encode("utf-8")
@@ -0,0 +1,140 @@
+"""
+Журнал изменений для дельта-синхронизации офлайн клиентов
+
+Триггеры записывают в change_log каждое создание, изменение и удаление промпта или тега
+(изменение связей промпт-тег считается изменением промпта). Клиент хранит последний
+полученный seq и запрашивает только изменения после него.
+"""
+
+from typing import List, NamedTuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.change_log import ChangeLog
+from app.models.prompt import Prompt
+from app.models.tag import Tag
+
+# (таблица, событие, сущность, выражение ID) - по триггеру на каждую пару
+CHANGE_LOG_TRIGGERS = (
+    ("prompts", "INSERT", "prompt", "NEW.id"),
+    ("prompts", "UPDATE", "prompt", "NEW.id"),
+    ("prompts", "DELETE", "prompt", "OLD.id"),
+    ("tags", "INSERT", "tag", "NEW.id"),
+    # prompt_count меняется при каждой привязке тега и клиенту не нужен
+    ("tags", "UPDATE OF name, slug", "tag", "NEW.id"),
+    ("tags", "DELETE", "tag", "OLD.id"),
+    ("prompt_tags", "INSERT", "prompt", "NEW.prompt_id"),
+    ("prompt_tags", "DELETE", "prompt", "OLD.prompt_id"),
+)
+
+
+class ChangeSet(NamedTuple):
+    """Изменения после токена since"""
+
+    prompts: List[Prompt]
+    deleted_prompt_ids: List[int]
+    tags: List[Tag]
+    deleted_tag_ids: List[int]
+    next_since: int
+    has_more: bool
+
+
+def change_log_trigger_sql(table: str, event: str, entity: str, id_expr: str) -> str:
+    """SQL триггера, записывающего изменение в журнал"""
+    name = f"change_log_{table}_{event.split()[0].lower()}"
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN
+            INSERT INTO change_log (entity, entity_id) VALUES ('{entity}', {id_expr});
+        END
+    """
+
+
+# Первичное заполнение журнала существующими тегами и промптами
+BACKFILL_CHANGE_LOG_SQL = (
+    "INSERT INTO change_log (entity, entity_id) SELECT 'tag', id FROM tags ORDER BY id",
+    "INSERT INTO change_log (entity, entity_id) SELECT 'prompt', id FROM prompts ORDER BY id",
+)
+
+
+def init_change_log(db: Session) -> None:
+    """Создать триггеры журнала и заполнить его, если он пуст (таблица создается моделью ChangeLog)"""
+    if db.query(ChangeLog.seq).first() is None:
+        for statement in BACKFILL_CHANGE_LOG_SQL:
+            db.execute(text(statement))
+    for table, event, entity, id_expr in CHANGE_LOG_TRIGGERS:
+        db.execute(text(change_log_trigger_sql(table, event, entity, id_expr)))
+    db.commit()
+
+
+def get_last_seq(db: Session) -> int:
+    """Последний токен изменений (0 - журнал пуст)"""
+    return db.query(func.max(ChangeLog.seq)).scalar() or 0
+
+
+def get_changes(db: Session, since: int, limit: int = 500) -> ChangeSet:
+    """
+    Промпты и теги, измененные после токена since
+
+    Каждая сущность возвращается один раз в состоянии на момент запроса. Если изменений больше limit,
+    has_more = True и следующую часть нужно запросить с since = next_since.
+
+    Raises:
+        ValueError: Если токен since больше последнего (журнал из другой БД)
+    """
+    last_seq = get_last_seq(db)
+    if since > last_seq:
+        raise ValueError("Неизвестный токен изменений, требуется полная синхронизация")
+
+    # Последнее изменение каждой сущности, по порядку изменений
+    latest_seq = func.max(ChangeLog.seq).label("latest_seq")
+    rows = (
+        db.query(ChangeLog.entity, ChangeLog.entity_id, latest_seq)
+        .filter(ChangeLog.seq > since)
+        .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        .order_by(latest_seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_since = rows[-1].latest_seq if has_more else last_seq
+
+    prompt_ids = [row.entity_id for row in rows if row.entity == "prompt"]
+    tag_ids = [row.entity_id for row in rows if row.entity == "tag"]
+
+    prompts = (
+        db.query(Prompt).options(selectinload(Prompt.tags)).filter(Prompt.id.in_(prompt_ids)).all()
+        if prompt_ids
+        else []
+    )
+    tags = db.query(Tag).filter(Tag.id.in_(tag_ids)).all() if tag_ids else []
+
+    alive_prompts = [prompt for prompt in prompts if prompt.deleted_at is None]
+    alive_prompt_ids = {prompt.id for prompt in alive_prompts}
+    alive_tag_ids = {tag.id for tag in tags}
+
+    return ChangeSet(
+        prompts=alive_prompts,
+        deleted_prompt_ids=[prompt_id for prompt_id in prompt_ids if prompt_id not in alive_prompt_ids],
+        tags=tags,
+        deleted_tag_ids=[tag_id for tag_id in tag_ids if tag_id not in alive_tag_ids],
+        next_since=next_since,
+        has_more=has_more,
+    )
+
+
+def compact_change_log(db: Session) -> int:
+    """
+    Удалить записи журнала, перекрытые более поздними изменениями той же сущности
+
+    Выдача get_changes для любого токена не меняется: для каждой сущности остается последняя запись.
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    result = db.execute(
+        text("DELETE FROM change_log WHERE seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY entity, entity_id)")
+    )
+    db.commit()
+    return result.rowcount
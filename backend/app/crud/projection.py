@@ -0,0 +1,115 @@
+"""
+Проекция промптов для списков: выборка только нужных столбцов (fields=) и превью текста (preview_len=)
+
+Проекция заменяет ORM объекты строками столбцов: запрос читает из prompts только выбранные
+столбцы, текст обрезается в SQL (substr), а ответ собирается словарем без валидации pydantic.
+"""
+
+from typing import Iterable, List, Optional
+
+from sqlalchemy import column, func
+
+from app.core.config import settings
+from app.models.prompt import Prompt
+from app.schemas.prompt import PROMPT_RESPONSE_COLUMNS
+
+# Поля ответа, доступные в fields= (в порядке PromptResponse)
+PROMPT_FIELDS = PROMPT_RESPONSE_COLUMNS + ("tags",)
+
+# Столбцы порядка и курсора списка (выбираются всегда, в ответ попадает только id)
+REQUIRED_COLUMNS = ("id", "is_pinned", "created_at")
+
+# Столбцы, которые обрезаются до preview_len символов
+TRUNCATED_COLUMNS = ("text", "normalized_text")
+
+MAX_PREVIEW_LEN = 10000
+
+FIELDS_DESCRIPTION = f"Поля ответа через запятую (id всегда включен): {', '.join(PROMPT_FIELDS)}"
+PREVIEW_LEN_DESCRIPTION = "Обрезать text и normalized_text до указанного числа символов (в SQL)"
+
+
+class PromptProjection:
+    """Набор полей ответа и длина превью текста"""
+
+    def __init__(self, fields: Optional[Iterable[str]] = None, preview_len: Optional[int] = None):
+        """
+        Raises:
+            ValueError: Если поле неизвестно или длина превью вне допустимого диапазона
+        """
+        requested = set(PROMPT_FIELDS if fields is None else fields)
+        unknown = requested - set(PROMPT_FIELDS)
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}. Доступны: {', '.join(PROMPT_FIELDS)}")
+        if preview_len is not None and not 1 <= preview_len <= MAX_PREVIEW_LEN:
+            raise ValueError(f"preview_len должен быть от 1 до {MAX_PREVIEW_LEN}")
+
+        # id есть в ответе всегда
+        requested.add("id")
+        self.fields = tuple(name for name in PROMPT_FIELDS if name in requested)
+        self.preview_len = preview_len
+        self.with_tags = "tags" in requested
+        self.column_names = tuple(
+            name for name in PROMPT_RESPONSE_COLUMNS if name in requested or name in REQUIRED_COLUMNS
+        )
+
+    @classmethod
+    def parse(cls, fields: Optional[str], preview_len: Optional[int] = None) -> "PromptProjection":
+        """Проекция из параметров запроса (fields - имена полей через запятую)"""
+        names = None
+        if fields:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+        return cls(names, preview_len)
+
+    @property
+    def key(self) -> str:
+        """Представление проекции для ключа кэша"""
+        return f"{','.join(self.fields)}|{self.preview_len or ''}"
+
+    def columns(self) -> List:
+        """Выражения столбцов для ORM/Core запроса"""
+        result = []
+        for name in self.column_names:
+            expression = Prompt.__table__.c[name]
+            if self.preview_len and name in TRUNCATED_COLUMNS:
+                expression = func.substr(expression, 1, self.preview_len).label(name)
+            result.append(expression)
+        return result
+
+    def sql_columns(self, alias: str) -> str:
+        """Список столбцов для текстового SQL (alias - псевдоним таблицы prompts)"""
+        result = []
+        for name in self.column_names:
+            if self.preview_len and name in TRUNCATED_COLUMNS:
+                result.append(f"substr({alias}.{name}, 1, {int(self.preview_len)}) AS {name}")
+            else:
+                result.append(f"{alias}.{name}")
+        return ", ".join(result)
+
+    def typed_columns(self) -> List:
+        """Типизированные столбцы результата текстового SQL (для TextClause.columns)"""
+        return [column(name, Prompt.__table__.c[name].type) for name in self.column_names]
+
+    def to_dict(self, row, tags: Optional[List[dict]] = None) -> dict:
+        """Строка проекции в словарь ответа (только запрошенные поля)"""
+        data = {name: getattr(row, name) for name in self.fields if name != "tags"}
+        if self.with_tags:
+            data["tags"] = tags or []
+        return data
+
+
+def resolve_projection(fields: Optional[str], preview_len: Optional[int]) -> Optional[PromptProjection]:
+    """
+    Проекция для запроса списка
+
+    Returns:
+        Optional[PromptProjection]: Проекция из fields/preview_len, полная проекция при FAST_JSON_RESPONSES,
+            иначе None (ORM объекты и PromptResponse)
+
+    Raises:
+        ValueError: Если параметры проекции неверны
+    """
+    if fields or preview_len is not None:
+        return PromptProjection.parse(fields, preview_len)
+    if settings.fast_json_responses:
+        return PromptProjection()
+    return None
@@ -3,20 +3,30 @@ CRUD операции для Prompt
 """
 
 from datetime import datetime
-from typing import List, Optional
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import String, and_, bindparam, literal, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
 
+from app.core.cache import cache
 from app.core.logging_config import get_logger
+from app.crud import tag as crud_tag
+from app.crud.projection import PromptProjection
 from app.models.prompt import Prompt
+from app.models.prompt_tag import PromptTag
 from app.models.tag import Tag
 from app.schemas.prompt import PromptCreate, PromptUpdate
 from app.search.fts5 import search_fallback, search_fts5
-from app.utils.text import normalize_text
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.text import normalize_text, normalize_texts
 
 logger = get_logger(__name__)
 
+# Размер пачки для массовых операций (одна транзакция и один запрос IN на пачку)
+BULK_BATCH_SIZE = 500
+
 
 def get_prompt(db: Session, prompt_id: int) -> Optional[Prompt]:
     """Получить промпт по ID (без удаленных)"""
@@ -28,6 +38,67 @@ def get_prompt_by_tg_message_id(db: Session, tg_message_id: int) -> Optional[Pro
     return db.query(Prompt).filter(Prompt.tg_message_id == tg_message_id).first()
 
 
+def prompt_query(db: Session, projection: Optional[PromptProjection] = None):
+    """
+    Запрос промптов: ORM объекты с тегами или строки столбцов проекции
+
+    С проекцией выбираются только ее столбцы prompts (Row с доступом по атрибутам), без ORM объектов,
+    identity map и тегов - их догружает prompt_rows_to_dicts.
+    """
+    if projection is not None:
+        return db.query(*projection.columns())
+    # Теги загружаются одним дополнительным SELECT ... IN
+    return db.query(Prompt).options(selectinload(Prompt.tags))
+
+
+def _browse_query(
+    db: Session,
+    tag_ids: Optional[List[int]] = None,
+    pinned_only: Optional[bool] = None,
+    projection: Optional[PromptProjection] = None,
+):
+    """Базовый запрос списка промптов без поиска"""
+    query = prompt_query(db, projection=projection).filter(Prompt.deleted_at.is_(None))
+
+    # Фильтр по тегам: подзапрос вместо JOIN, чтобы промпт с несколькими тегами из фильтра
+    # не повторялся в выборке столбцов и в подсчете
+    if tag_ids:
+        query = query.filter(Prompt.id.in_(select(PromptTag.prompt_id).where(PromptTag.tag_id.in_(tag_ids))))
+
+    # Фильтр по закрепленным
+    if pinned_only is not None:
+        query = query.filter(Prompt.is_pinned == pinned_only)
+
+    return query
+
+
+def _order_browse_query(query):
+    """Сортировка: сначала закрепленные, потом по дате создания (новые первые), id - для стабильного порядка"""
+    return query.order_by(Prompt.is_pinned.desc(), Prompt.created_at.desc(), Prompt.id.desc())
+
+
+def _sqlite_datetime(value: datetime) -> str:
+    """Представление даты в том же виде, в котором SQLite хранит ее в столбце (для сравнения в курсоре)"""
+    result = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        result += f".{value.microsecond:06d}"
+    return result
+
+
+def encode_prompt_cursor(prompt: Prompt) -> str:
+    """Курсор, указывающий на позицию сразу после промпта в порядке (is_pinned, created_at, id)"""
+    return encode_cursor({"p": int(prompt.is_pinned), "c": _sqlite_datetime(prompt.created_at), "i": prompt.id})
+
+
+def next_page_cursor(prompts: List[Prompt], skip: int, total: int, search: Optional[str] = None) -> Optional[str]:
+    """Курсор следующей страницы для ответа в режиме page/limit"""
+    if not prompts or skip + len(prompts) >= total:
+        return None
+    if search:
+        return encode_cursor({"o": skip + len(prompts)})
+    return encode_prompt_cursor(prompts[-1])
+
+
 def get_prompts(
     db: Session,
     skip: int = 0,
@@ -36,7 +107,10 @@ def get_prompts(
     tag_ids: Optional[List[int]] = None,
     pinned_only: Optional[bool] = None,
     use_fts5: bool = True,
-) -> tuple[List[Prompt], int]:
+    with_total: bool = True,
+    projection: Optional[PromptProjection] = None,
+    fuzzy: bool = False,
+) -> tuple[List[Prompt], Optional[int]]:
     """
     Получить список промптов с фильтрацией и пагинацией
 
@@ -51,47 +125,139 @@ def get_prompts(
         tag_ids: Фильтр по ID тегов
         pinned_only: Только закрепленные
         use_fts5: Использовать FTS5 для поиска (если доступно)
+        with_total: Подсчитывать общее количество (COUNT), иначе total = None
+        projection: Вернуть строки столбцов проекции вместо ORM объектов (без тегов, см. prompt_query)
+        fuzzy: Поиск с опечатками (только FTS5)
 
     Returns:
         tuple: (список промптов, общее количество)
     """
+    filters = {
+        "skip": skip,
+        "limit": limit,
+        "tag_ids": tag_ids,
+        "pinned_only": pinned_only,
+        "with_total": with_total,
+        "projection": projection,
+    }
+
     # Если есть поисковый запрос, используем FTS5
     if search and use_fts5:
         try:
-            return search_fts5(db=db, query=search, skip=skip, limit=limit, tag_ids=tag_ids, pinned_only=pinned_only)
+            return search_fts5(db=db, query=search, fuzzy=fuzzy, **filters)
         except Exception as e:
             logger.warning(f"Ошибка FTS5 поиска, используем fallback: {e}", extra={"error": str(e)})
             # Fallback на обычный поиск
-            return search_fallback(
-                db=db, query=search, skip=skip, limit=limit, tag_ids=tag_ids, pinned_only=pinned_only
-            )
+            return search_fallback(db=db, query=search, **filters)
     elif search:
         # Используем fallback поиск
-        return search_fallback(db=db, query=search, skip=skip, limit=limit, tag_ids=tag_ids, pinned_only=pinned_only)
+        return search_fallback(db=db, query=search, **filters)
 
     # Обычный запрос без поиска
-    query = db.query(Prompt).filter(Prompt.deleted_at.is_(None))
-
-    # Фильтр по тегам
-    if tag_ids:
-        query = query.join(Prompt.tags).filter(Tag.id.in_(tag_ids))
-
-    # Фильтр по закрепленным
-    if pinned_only is not None:
-        query = query.filter(Prompt.is_pinned == pinned_only)
+    query = _browse_query(db, tag_ids=tag_ids, pinned_only=pinned_only, projection=projection)
 
     # Подсчет общего количества
-    total = query.count()
-
-    # Сортировка: сначала закрепленные, потом по дате создания (новые первые)
-    query = query.order_by(Prompt.is_pinned.desc(), Prompt.created_at.desc())
+    total = query.count() if with_total else None
 
     # Пагинация
-    prompts = query.offset(skip).limit(limit).all()
+    prompts = _order_browse_query(query).offset(skip).limit(limit).all()
 
     return prompts, total
 
 
+def get_prompts_after_cursor(
+    db: Session,
+    cursor: str,
+    limit: int = 50,
+    search: Optional[str] = None,
+    tag_ids: Optional[List[int]] = None,
+    pinned_only: Optional[bool] = None,
+    projection: Optional[PromptProjection] = None,
+    fuzzy: bool = False,
+) -> tuple[List[Prompt], Optional[str]]:
+    """
+    Получить следующую страницу промптов по курсору (keyset пагинация, без COUNT)
+
+    Для обычного списка курсор содержит (is_pinned, created_at, id) последнего элемента,
+    и страница выбирается условием по индексу idx_prompt_list_order без OFFSET.
+    Для поиска порядок задается релевантностью, поэтому курсор содержит смещение.
+
+    Args:
+        db: Сессия БД
+        cursor: Курсор из next_cursor предыдущей страницы
+        limit: Максимум результатов
+        search: Поисковый запрос
+        tag_ids: Фильтр по ID тегов
+        pinned_only: Только закрепленные
+        projection: Вернуть строки столбцов проекции вместо ORM объектов (без тегов, см. prompt_query)
+        fuzzy: Поиск с опечатками (только FTS5)
+
+    Returns:
+        tuple: (список промптов, курсор следующей страницы или None)
+
+    Raises:
+        ValueError: Если курсор поврежден или не соответствует режиму запроса
+    """
+    position = decode_cursor(cursor)
+
+    # Запрашиваем на один элемент больше, чтобы узнать, есть ли следующая страница
+    if search:
+        if not isinstance(position.get("o"), int) or position["o"] < 0:
+            raise ValueError("Неверный курсор")
+        offset = position["o"]
+        prompts, _ = get_prompts(
+            db,
+            skip=offset,
+            limit=limit + 1,
+            search=search,
+            tag_ids=tag_ids,
+            pinned_only=pinned_only,
+            with_total=False,
+            projection=projection,
+            fuzzy=fuzzy,
+        )
+        has_more = len(prompts) > limit
+        return prompts[:limit], encode_cursor({"o": offset + limit}) if has_more else None
+
+    try:
+        after = (bool(position["p"]), str(position["c"]), int(position["i"]))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Неверный курсор") from e
+
+    query = _browse_query(db, tag_ids=tag_ids, pinned_only=pinned_only, projection=projection)
+    query = query.filter(
+        tuple_(Prompt.is_pinned, Prompt.created_at, Prompt.id)
+        < tuple_(literal(after[0]), literal(after[1], String), literal(after[2]))
+    )
+    prompts = _order_browse_query(query).limit(limit + 1).all()
+
+    has_more = len(prompts) > limit
+    prompts = prompts[:limit]
+    return prompts, encode_prompt_cursor(prompts[-1]) if has_more else None
+
+
+def get_tags_by_prompt_ids(db: Session, prompt_ids: List[int]) -> dict[int, List[dict]]:
+    """Теги промптов одним запросом по столбцам (для строк проекции)"""
+    if not prompt_ids:
+        return {}
+    rows = (
+        db.query(PromptTag.prompt_id, Tag.name, Tag.slug, Tag.id, Tag.created_at)
+        .join(Tag, Tag.id == PromptTag.tag_id)
+        .filter(PromptTag.prompt_id.in_(prompt_ids))
+        .all()
+    )
+    tags: dict[int, List[dict]] = {}
+    for prompt_id, name, slug, tag_id, created_at in rows:
+        tags.setdefault(prompt_id, []).append({"name": name, "slug": slug, "id": tag_id, "created_at": created_at})
+    return tags
+
+
+def prompt_rows_to_dicts(db: Session, rows: list, projection: PromptProjection) -> List[dict]:
+    """Строки проекции в словари ответа (теги, если запрошены, - одним дополнительным запросом)"""
+    tags = get_tags_by_prompt_ids(db, [row.id for row in rows]) if projection.with_tags else {}
+    return [projection.to_dict(row, tags.get(row.id)) for row in rows]
+
+
 def create_prompt(db: Session, prompt: PromptCreate) -> Prompt:
     """Создать новый промпт"""
     normalized = normalize_text(prompt.text)
@@ -107,11 +273,105 @@ def create_prompt(db: Session, prompt: PromptCreate) -> Prompt:
 
     db.add(db_prompt)
     db.commit()
+    cache.invalidate()
     db.refresh(db_prompt)
 
     return db_prompt
 
 
+def get_image_urls_by_tg_message_id(db: Session, tg_message_ids: List[int]) -> dict[int, Optional[str]]:
+    """Получить image_url уже существующих промптов по tg_message_id (одним запросом IN)"""
+    if not tg_message_ids:
+        return {}
+    rows = db.query(Prompt.tg_message_id, Prompt.image_url).filter(Prompt.tg_message_id.in_(tg_message_ids)).all()
+    return dict(rows)
+
+
+def bulk_upsert_prompts(
+    db: Session, prompts: Iterable[PromptCreate], batch_size: int = BULK_BATCH_SIZE
+) -> tuple[int, int, int]:
+    """
+    Массовое создание и обновление промптов
+
+    Обрабатывает промпты пачками, каждая пачка - одна транзакция: существующие tg_message_id
+    находятся одним запросом, новые промпты вставляются одним INSERT ... ON CONFLICT DO NOTHING,
+    существующим без изображения image_url проставляется одним UPDATE (executemany).
+    Остальные существующие промпты и дубликаты внутри пачки пропускаются.
+
+    Args:
+        db: Сессия БД
+        prompts: Промпты для создания или обновления
+        batch_size: Размер пачки
+
+    Returns:
+        tuple: (создано, обновлено, пропущено)
+    """
+    created = 0
+    updated = 0
+    skipped = 0
+
+    for batch in _batched(prompts, batch_size):
+        batch_created, batch_updated = _upsert_batch(db, batch)
+        db.commit()
+        if batch_created or batch_updated:
+            cache.invalidate()
+        created += batch_created
+        updated += batch_updated
+        skipped += len(batch) - batch_created - batch_updated
+
+    return created, updated, skipped
+
+
+def _upsert_batch(db: Session, batch: List[PromptCreate]) -> tuple[int, int]:
+    """Записать одну пачку без коммита, вернуть (создано, обновлено)"""
+    # Дубликаты внутри самой пачки пропускаются (остается первый)
+    unique: dict[int, PromptCreate] = {}
+    for p in batch:
+        unique.setdefault(p.tg_message_id, p)
+    existing = get_image_urls_by_tg_message_id(db, list(unique))
+
+    new_prompts = [p for tg_message_id, p in unique.items() if tg_message_id not in existing]
+    image_updates = [
+        {"b_tg_message_id": tg_message_id, "b_image_url": p.image_url}
+        for tg_message_id, p in unique.items()
+        if tg_message_id in existing and p.image_url and not existing[tg_message_id]
+    ]
+
+    inserted = 0
+    if new_prompts:
+        rows = [
+            {
+                "tg_message_id": p.tg_message_id,
+                "tg_channel_id": p.tg_channel_id,
+                "text": p.text,
+                "normalized_text": normalized,
+                "is_pinned": p.is_pinned,
+                "image_url": p.image_url,
+            }
+            for p, normalized in zip(new_prompts, normalize_texts(p.text for p in new_prompts), strict=True)
+        ]
+        statement = sqlite_insert(Prompt.__table__).on_conflict_do_nothing(index_elements=["tg_message_id"])
+        inserted = db.execute(statement, rows).rowcount
+
+    if image_updates:
+        table = Prompt.__table__
+        statement = (
+            update(table)
+            .where(table.c.tg_message_id == bindparam("b_tg_message_id"))
+            .values(image_url=bindparam("b_image_url"))
+        )
+        db.execute(statement, image_updates)
+
+    return inserted, len(image_updates)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    """Разбить последовательность на пачки фиксированного размера"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 def update_prompt(db: Session, prompt_id: int, prompt_update: PromptUpdate) -> Optional[Prompt]:
     """Обновить промпт"""
     db_prompt = get_prompt(db, prompt_id)
@@ -129,6 +389,7 @@ def update_prompt(db: Session, prompt_id: int, prompt_update: PromptUpdate) -> O
         db_prompt.image_url = prompt_update.image_url
 
     db.commit()
+    cache.invalidate()
     db.refresh(db_prompt)
 
     return db_prompt
@@ -141,7 +402,10 @@ def delete_prompt(db: Session, prompt_id: int) -> bool:
         return False
 
     db_prompt.deleted_at = datetime.utcnow()
+    # Удаленный промпт больше не учитывается в облаке тегов
+    crud_tag.adjust_prompt_counts(db, [tag.id for tag in db_prompt.tags], -1)
     db.commit()
+    cache.invalidate()
 
     return True
 
@@ -154,6 +418,7 @@ def pin_prompt(db: Session, prompt_id: int, pin: bool) -> Optional[Prompt]:
 
     db_prompt.is_pinned = pin
     db.commit()
+    cache.invalidate()
     db.refresh(db_prompt)
 
     return db_prompt
@@ -171,7 +436,9 @@ def add_tag_to_prompt(db: Session, prompt_id: int, tag_id: int) -> Optional[Prom
 
     if db_tag not in db_prompt.tags:
         db_prompt.tags.append(db_tag)
+        crud_tag.adjust_prompt_counts(db, [tag_id], 1)
         db.commit()
+        cache.invalidate()
         db.refresh(db_prompt)
 
     return db_prompt
@@ -186,7 +453,9 @@ def remove_tag_from_prompt(db: Session, prompt_id: int, tag_id: int) -> Optional
     db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
     if db_tag and db_tag in db_prompt.tags:
         db_prompt.tags.remove(db_tag)
+        crud_tag.adjust_prompt_counts(db, [tag_id], -1)
         db.commit()
+        cache.invalidate()
         db.refresh(db_prompt)
 
     return db_prompt
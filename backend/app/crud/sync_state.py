@@ -0,0 +1,34 @@
+"""
+CRUD операции для SyncState
+"""
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.sync_state import SyncState
+
+
+def get_last_message_id(db: Session, channel_id: int) -> int:
+    """Получить ID последнего синхронизированного сообщения канала (0, если синхронизации не было)"""
+    state = db.get(SyncState, channel_id)
+    return state.last_message_id if state else 0
+
+
+def advance_last_message_id(db: Session, channel_id: int, message_id: int, commit: bool = True) -> None:
+    """
+    Сдвинуть отметку синхронизации канала вперед
+
+    Отметка никогда не уменьшается: повторная полная синхронизация не откатывает ее назад.
+    """
+    statement = sqlite_insert(SyncState.__table__).values(channel_id=channel_id, last_message_id=message_id)
+    statement = statement.on_conflict_do_update(
+        index_elements=["channel_id"],
+        set_={
+            "last_message_id": func.max(SyncState.__table__.c.last_message_id, statement.excluded.last_message_id),
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(statement)
+    if commit:
+        db.commit()
@@ -4,8 +4,10 @@ CRUD операции для Tag
 
 from typing import List, Optional
 
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.core.cache import cache
 from app.models.tag import Tag
 from app.schemas.tag import TagCreate, TagUpdate
 from app.utils.text import generate_slug
@@ -26,28 +28,61 @@ def get_tags(db: Session, skip: int = 0, limit: int = 100) -> List[Tag]:
     return db.query(Tag).order_by(Tag.name).offset(skip).limit(limit).all()
 
 
-def get_tags_with_count(db: Session, skip: int = 0, limit: int = 100) -> List[tuple]:
+def get_tags_with_count(db: Session, skip: int = 0, limit: int = 100) -> List[Tag]:
     """
-    Получить список тегов с количеством промптов для каждого
+    Получить теги с промптами, отсортированные по количеству промптов
 
-    Returns:
-        List[tuple]: Список кортежей (Tag, count)
+    Использует поддерживаемый столбец prompt_count (обход индекса idx_tag_cloud, без GROUP BY).
     """
-    from sqlalchemy import func
-
-    from app.models.prompt_tag import PromptTag
-
     return (
-        db.query(Tag, func.count(PromptTag.prompt_id).label("prompt_count"))
-        .join(PromptTag, Tag.id == PromptTag.tag_id)
-        .group_by(Tag.id)
-        .order_by(func.count(PromptTag.prompt_id).desc(), Tag.name)
+        db.query(Tag)
+        .filter(Tag.prompt_count > 0)
+        .order_by(Tag.prompt_count.desc(), Tag.name)
         .offset(skip)
         .limit(limit)
         .all()
     )
 
 
+def adjust_prompt_counts(db: Session, tag_ids: List[int], delta: int) -> None:
+    """Изменить prompt_count тегов на delta в текущей транзакции (коммит делает вызывающий код)"""
+    if not tag_ids:
+        return
+    db.query(Tag).filter(Tag.id.in_(tag_ids)).update(
+        {Tag.prompt_count: Tag.prompt_count + delta}, synchronize_session=False
+    )
+
+
+def recompute_prompt_counts(db: Session) -> int:
+    """
+    Пересчитать prompt_count всех тегов за один проход по prompt_tags
+
+    Returns:
+        int: Количество тегов, у которых счетчик был неверным
+    """
+    before = dict(db.query(Tag.id, Tag.prompt_count).all())
+
+    db.execute(text("UPDATE tags SET prompt_count = 0"))
+    db.execute(
+        text("""
+            UPDATE tags SET prompt_count = counts.prompt_count
+            FROM (
+                SELECT pt.tag_id, COUNT(*) AS prompt_count
+                FROM prompt_tags pt
+                JOIN prompts p ON p.id = pt.prompt_id
+                WHERE p.deleted_at IS NULL
+                GROUP BY pt.tag_id
+            ) AS counts
+            WHERE counts.tag_id = tags.id
+        """)
+    )
+    after = dict(db.query(Tag.id, Tag.prompt_count).all())
+    db.commit()
+    cache.invalidate()
+
+    return sum(1 for tag_id, count in after.items() if before.get(tag_id) != count)
+
+
 def create_tag(db: Session, tag: TagCreate) -> Tag:
     """Создать новый тег"""
     slug = generate_slug(tag.name)
@@ -69,6 +104,7 @@ def create_tag(db: Session, tag: TagCreate) -> Tag:
 
     db.add(db_tag)
     db.commit()
+    cache.invalidate()
     db.refresh(db_tag)
 
     return db_tag
@@ -99,6 +135,7 @@ def update_tag(db: Session, tag_id: int, tag_update: TagUpdate) -> Optional[Tag]
                 counter += 1
 
     db.commit()
+    cache.invalidate()
     db.refresh(db_tag)
 
     return db_tag
@@ -112,5 +149,6 @@ def delete_tag(db: Session, tag_id: int) -> bool:
 
     db.delete(db_tag)
     db.commit()
+    cache.invalidate()
 
     return True
@@ -2,24 +2,131 @@
 Подключение к базе данных и создание сессий
 """
 
-from sqlalchemy import create_engine
+import asyncio
+import functools
+import itertools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy import TextClause, create_engine, event, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.core.config import settings
+from app.core.logging_config import get_logger
+
+T = TypeVar("T")
+
+logger = get_logger(__name__)
+
+IS_SQLITE = "sqlite" in settings.database_url
 
 # Создание движка БД
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
     echo=settings.environment == "development",
 )
 
+
+def sqlite_pragmas() -> dict:
+    """
+    Профиль настройки SQLite из Settings
+
+    WAL позволяет читателям (web) не блокироваться писателем (бот, импорт),
+    busy_timeout заставляет писателя ждать освобождения блокировки вместо "database is locked".
+    """
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "foreign_keys": "ON" if settings.sqlite_foreign_keys else "OFF",
+    }
+
+
+if IS_SQLITE:
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """Применить профиль PRAGMA к новому соединению SQLite"""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in sqlite_pragmas().items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Таблицы, изменение которых меняет ответы API: версия данных (ETag, app/core/http_cache.py)
+# увеличивается один раз при фиксации транзакции, изменившей хотя бы одну из них
+DATA_VERSION_TABLES = frozenset({"prompts", "tags", "prompt_tags"})
+DATA_VERSION_BUMP_SQL = "UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+_DATA_CHANGED = "data_version_changed"
+
+# Таблица, которую меняет текстовый SQL запрос (text(): у него нет .table, как у ORM и Core выражений)
+_TEXT_DML_TABLE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+
+def _dml_table(statement) -> Optional[str]:
+    """Имя таблицы, которую меняет INSERT/UPDATE/DELETE (None - запрос не меняет данные)"""
+    if isinstance(statement, TextClause):
+        match = _TEXT_DML_TABLE.match(statement.text)
+        return match.group(1).lower() if match else None
+    if statement.is_dml:
+        return getattr(statement.table, "name", None)
+    return None
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_dml(state) -> None:
+    """Отметить сессию, если INSERT/UPDATE/DELETE (ORM, Core или text()) меняет таблицы версии данных"""
+    if _dml_table(state.statement) in DATA_VERSION_TABLES:
+        state.session.info[_DATA_CHANGED] = True
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    """Отметить сессию, если flush записал промпты, теги или их связи (связи меняют промпт)"""
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if getattr(instance, "__tablename__", None) in DATA_VERSION_TABLES:
+            session.info[_DATA_CHANGED] = True
+            return
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_data_version(session) -> None:
+    """Увеличить версию данных одним UPDATE на транзакцию (а не триггером на каждую строку)"""
+    session.flush()
+    if session.info.pop(_DATA_CHANGED, False):
+        try:
+            session.execute(text(DATA_VERSION_BUMP_SQL))
+        except Exception as e:
+            # Таблицы версии нет (БД без миграции) - ETag просто не используется
+            logger.debug(f"Версия данных не обновлена: {e}", extra={"error": str(e)})
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _reset_data_changed(session) -> None:
+    session.info.pop(_DATA_CHANGED, None)
+
+
 # Базовый класс для моделей
 Base = declarative_base()
 
+# Выделенный пул потоков для синхронной работы с БД.
+# Ограничен по размеру, чтобы медленные запросы (например, FTS5) не блокировали event loop
+# и не исчерпывали общий пул потоков uvicorn/anyio.
+db_executor = ThreadPoolExecutor(max_workers=settings.db_executor_workers, thread_name_prefix="db")
+
 
 def get_db():
     """
@@ -31,3 +138,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Выполнить синхронную функцию работы с БД в выделенном пуле потоков
+
+    Асинхронный фасад над CRUD слоем: эндпоинты вызывают `await run_db(crud.func, db, ...)`
+    вместо прямого вызова, чтобы не блокировать event loop.
+
+    Args:
+        func: Синхронная функция (CRUD операция, сериализация ORM объектов и т.п.)
+        *args: Позиционные аргументы функции
+        **kwargs: Именованные аргументы функции
+
+    Returns:
+        Результат функции
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+def run_sqlite_maintenance() -> tuple:
+    """
+    Периодическое обслуживание SQLite
+
+    - PRAGMA optimize: обновление статистики планировщика по мере необходимости
+    - PRAGMA wal_checkpoint(TRUNCATE): перенос WAL в основной файл и усечение WAL до нуля
+
+    Returns:
+        tuple: Результат wal_checkpoint (busy, log_frames, checkpointed_frames)
+    """
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA optimize"))
+        result = connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)")).fetchone()
+        connection.commit()
+    return tuple(result) if result else ()
@@ -2,19 +2,57 @@
 Главный файл FastAPI приложения PromptVault
 """
 
+import asyncio
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import api_router
+from app.core.cache import cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.http_cache import ConditionalGetMiddleware, DataVersionTracker
 from app.core.logging_config import get_logger, setup_logging
-from app.database import Base, engine
+from app.core.responses import ORJSONResponse
+from app.database import IS_SQLITE, Base, db_executor, engine, run_db, run_sqlite_maintenance
+from app.search.fuzzy import fuzzy_search
+from app.search.maintenance import run_fts5_merge_slice
+from app.search.suggest import suggestions
 
 # Настройка логирования
 setup_logging(level="INFO" if settings.environment == "production" else "DEBUG")
 logger = get_logger(__name__)
 
-app = FastAPI(title="PromptVault API", description="API для управления промптами из Telegram канала", version="1.0.0")
+app = FastAPI(
+    title="PromptVault API",
+    description="API для управления промптами из Telegram канала",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
+
+# Сжатие ответов; сжатые первые страницы списка кэшируются вместе с кэшем результатов
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        hot_paths=("/api/v1/prompts/",),
+    )
+
+# ETag / 304 для эндпоинтов чтения (добавляется после сжатия, чтобы ETag отличался для каждой кодировки,
+# и до CORS, чтобы ответы 304 тоже получали заголовки CORS)
+if IS_SQLITE and settings.http_cache_enabled and engine.url.database not in (None, "", ":memory:"):
+    app.add_middleware(
+        ConditionalGetMiddleware,
+        # Новая версия данных (в том числе от записи другим процессом) сбрасывает кэши этого процесса
+        tracker=DataVersionTracker(
+            engine.url.database, on_change=(cache.invalidate, suggestions.expire, fuzzy_search.expire)
+        ),
+        paths=("/api/v1/prompts", "/api/v1/tags", "/api/v1/search"),
+        nginx_ttl=settings.http_cache_nginx_ttl,
+    )
 
 # Настройка CORS
 app.add_middleware(
@@ -28,6 +66,44 @@ app.add_middleware(
 # Подключение роутеров
 app.include_router(api_router, prefix="/api/v1")
 
+# Фоновые задачи обслуживания SQLite и FTS5 индексов
+maintenance_task: Optional[asyncio.Task] = None
+fts_merge_task: Optional[asyncio.Task] = None
+
+# Пауза между порциями слияния FTS5 (запросы к БД выполняются между порциями), секунды
+FTS_MERGE_SLICE_PAUSE = 0.05
+
+
+async def sqlite_maintenance_loop(interval: int) -> None:
+    """Периодически выполнять PRAGMA optimize и wal_checkpoint(TRUNCATE), чтобы WAL не рос бесконечно"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            checkpoint = await run_db(run_sqlite_maintenance)
+            logger.info("Обслуживание SQLite выполнено", extra={"wal_checkpoint": list(checkpoint)})
+        except Exception as e:
+            logger.warning(f"Ошибка обслуживания SQLite: {e}", extra={"error": str(e)})
+
+
+async def fts_merge_loop(interval: int, pages: int) -> None:
+    """
+    Периодически сливать сегменты FTS5 индексов порциями по pages страниц
+
+    Каждая порция - отдельная короткая транзакция в пуле потоков БД, между порциями запросы API
+    выполняются без ожидания. Порции запускаются, пока слияние выполняет работу.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        slices = 0
+        try:
+            while await run_db(run_fts5_merge_slice, pages):
+                slices += 1
+                await asyncio.sleep(FTS_MERGE_SLICE_PAUSE)
+            if slices:
+                logger.info("Слияние сегментов FTS5 выполнено", extra={"slices": slices})
+        except Exception as e:
+            logger.warning(f"Ошибка слияния сегментов FTS5: {e}", extra={"error": str(e)})
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -50,11 +126,58 @@ async def startup_event():
         except Exception as e:
             logger.warning(f"Не удалось инициализировать FTS5: {e}", extra={"error": str(e)})
 
+        # Инициализация версии данных для ETag
+        try:
+            from app.core.http_cache import init_data_version
+            from app.database import SessionLocal
+
+            db = SessionLocal()
+            init_data_version(db)
+            db.close()
+        except Exception as e:
+            logger.warning(f"Не удалось инициализировать версию данных: {e}", extra={"error": str(e)})
+
+        # Инициализация журнала изменений для дельта-синхронизации
+        try:
+            from app.crud.changes import init_change_log
+            from app.database import SessionLocal
+
+            db = SessionLocal()
+            init_change_log(db)
+            db.close()
+        except Exception as e:
+            logger.warning(f"Не удалось инициализировать журнал изменений: {e}", extra={"error": str(e)})
+
+    # Триггеры и automerge FTS5 после импорта, прерванного остановкой процесса (в любом окружении)
+    if IS_SQLITE:
+        try:
+            from app.database import SessionLocal
+            from app.search.fts5 import fts5_restore_sync
+
+            db = SessionLocal()
+            fts5_restore_sync(db)
+            db.close()
+        except Exception as e:
+            logger.warning(f"Не удалось проверить синхронизацию FTS5: {e}", extra={"error": str(e)})
+
+    global maintenance_task
+    if IS_SQLITE and settings.sqlite_maintenance_interval > 0:
+        maintenance_task = asyncio.create_task(sqlite_maintenance_loop(settings.sqlite_maintenance_interval))
+
+    global fts_merge_task
+    if IS_SQLITE and settings.fts5_merge_interval > 0:
+        fts_merge_task = asyncio.create_task(fts_merge_loop(settings.fts5_merge_interval, settings.fts5_merge_pages))
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Очистка при остановке приложения"""
     logger.info("Остановка PromptVault API")
+    if maintenance_task:
+        maintenance_task.cancel()
+    if fts_merge_task:
+        fts_merge_task.cancel()
+    db_executor.shutdown(wait=True)
 
 
 @app.get("/")
@@ -65,5 +188,5 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Эндпоинт для проверки здоровья сервиса"""
-    return {"status": "ok"}
+    """Эндпоинт для проверки здоровья сервиса (со счетчиками кэша для мониторинга)"""
+    return {"status": "ok", "cache": cache.stats()}
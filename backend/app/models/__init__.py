@@ -1,6 +1,9 @@
 # Модели базы данных
+from app.models.change_log import ChangeLog
+from app.models.data_version import DataVersion
 from app.models.prompt import Prompt
 from app.models.prompt_tag import PromptTag
+from app.models.sync_state import SyncState
 from app.models.tag import Tag
 
-__all__ = ["Prompt", "Tag", "PromptTag"]
+__all__ = ["Prompt", "Tag", "PromptTag", "SyncState", "DataVersion", "ChangeLog"]
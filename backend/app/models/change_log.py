@@ -0,0 +1,30 @@
+"""
+Модель ChangeLog (Журнал изменений)
+"""
+
+from sqlalchemy import Column, Index, Integer, String
+
+from app.database import Base
+
+
+class ChangeLog(Base):
+    """
+    Журнал изменений промптов и тегов для дельта-синхронизации клиентов
+
+    Записи добавляются триггерами (app/crud/changes.py). seq - монотонно растущий токен изменений.
+    """
+
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(16), nullable=False)  # prompt или tag
+    entity_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Индекс для сжатия журнала (последняя запись каждой сущности)
+        Index("idx_change_log_entity", "entity", "entity_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<ChangeLog(seq={self.seq}, entity={self.entity}, entity_id={self.entity_id})>"
@@ -0,0 +1,27 @@
+"""
+Модель DataVersion (Версия данных)
+"""
+
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class DataVersion(Base):
+    """
+    Глобальная версия данных (одна строка с id = 1)
+
+    Увеличивается один раз при фиксации транзакции, изменившей промпты, теги или их связи
+    (события сессии в app/database.py).
+    Используется для ETag ответов API.
+    """
+
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<DataVersion(version={self.version}, updated_at={self.updated_at})>"
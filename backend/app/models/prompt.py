@@ -32,6 +32,14 @@ class Prompt(Base):
     __table_args__ = (
         Index("idx_prompt_normalized_text", "normalized_text"),
         Index("idx_prompt_tg_message_id", "tg_message_id", unique=True),
+        # Индекс для keyset пагинации списка (порядок is_pinned DESC, created_at DESC, id DESC)
+        Index(
+            "idx_prompt_list_order",
+            "is_pinned",
+            "created_at",
+            "id",
+            sqlite_where=deleted_at.is_(None),
+        ),
     )
 
     def __repr__(self):
@@ -0,0 +1,21 @@
+"""
+Модель SyncState (Состояние синхронизации канала)
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class SyncState(Base):
+    """Отметка синхронизации: последнее обработанное сообщение канала"""
+
+    __tablename__ = "sync_state"
+
+    channel_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    last_message_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<SyncState(channel_id={self.channel_id}, last_message_id={self.last_message_id})>"
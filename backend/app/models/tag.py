@@ -17,13 +17,19 @@ class Tag(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), nullable=False)
     slug = Column(String(50), unique=True, nullable=False, index=True)
+    # Количество неудаленных промптов с тегом (поддерживается в CRUD, пересчет - scripts/maintenance.py)
+    prompt_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Связь многие-ко-многим с промптами
     prompts = relationship("Prompt", secondary="prompt_tags", back_populates="tags")
 
-    # Индекс для поиска по slug
-    __table_args__ = (Index("idx_tag_slug", "slug", unique=True),)
+    __table_args__ = (
+        # Индекс для поиска по slug
+        Index("idx_tag_slug", "slug", unique=True),
+        # Индекс облака тегов: порядок prompt_count DESC, name (только теги с промптами)
+        Index("idx_tag_cloud", prompt_count.desc(), name, sqlite_where=prompt_count > 0),
+    )
 
     def __repr__(self):
         return f"<Tag(id={self.id}, name={self.name}, slug={self.slug})>"
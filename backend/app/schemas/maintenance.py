@@ -0,0 +1,27 @@
+"""
+Pydantic схемы для обслуживания поисковых индексов
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class FtsIndexStats(BaseModel):
+    """Статистика FTS5 индекса"""
+
+    table: str
+    rows: int = Field(..., description="Проиндексировано промптов")
+    levels: int = Field(..., description="Уровней b-деревьев")
+    segments: int = Field(..., description="Сегментов (чем больше, тем медленнее запросы)")
+    size_bytes: int = Field(..., description="Размер индекса в байтах")
+
+
+class FtsMaintenanceResponse(BaseModel):
+    """Результат команды обслуживания FTS5"""
+
+    command: str
+    duration_ms: float
+    ok: bool = Field(..., description="False - integrity-check нашел повреждение")
+    error: Optional[str] = None
+    indexes: List[FtsIndexStats] = Field(..., description="Статистика индексов после команды")
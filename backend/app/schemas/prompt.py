@@ -64,10 +64,41 @@ class PromptResponse(PromptBase):
         from_attributes = True
 
 
+# Поля PromptResponse, которые берутся из столбцов prompts (проекция списков, app/crud/projection.py)
+PROMPT_RESPONSE_COLUMNS = tuple(name for name in PromptResponse.model_fields if name != "tags")
+
+
 class PromptListResponse(BaseModel):
     """Схема для списка промптов с пагинацией"""
 
     items: List[PromptResponse]
-    total: int
+    total: Optional[int] = Field(None, description="Общее количество (не считается в режиме курсора)")
     page: int
     limit: int
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
+
+
+class SuggestItem(BaseModel):
+    """Подсказка поиска"""
+
+    text: str = Field(..., description="Текст запроса с дополненным последним словом")
+    type: str = Field(..., description="tag - название тега, term - слово из текстов промптов")
+    count: int = Field(..., description="Количество промптов")
+
+
+class SuggestResponse(BaseModel):
+    """Схема ответа с подсказками поиска"""
+
+    prefix: str
+    items: List[SuggestItem]
+
+
+class PromptChangesResponse(BaseModel):
+    """Схема изменений для дельта-синхронизации"""
+
+    items: List[PromptResponse] = Field(..., description="Созданные и измененные промпты")
+    deleted_ids: List[int] = Field(..., description="ID удаленных промптов")
+    tags: List[TagResponse] = Field(..., description="Созданные и измененные теги")
+    deleted_tag_ids: List[int] = Field(..., description="ID удаленных тегов")
+    next_since: int = Field(..., description="Токен для следующего запроса изменений")
+    has_more: bool = Field(..., description="Есть еще изменения после next_since")
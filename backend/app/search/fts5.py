@@ -2,113 +2,380 @@
 Модуль для работы с SQLite FTS5 полнотекстовым поиском
 """
 
-from typing import List, Optional, Tuple
+import math
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, bindparam, column, event, select, text
+from sqlalchemy.orm import Session, selectinload
 
+from app.core.config import settings
 from app.core.logging_config import get_logger
+from app.crud.projection import PromptProjection
+from app.database import DATA_VERSION_BUMP_SQL, SessionLocal
 from app.models.prompt import Prompt
-from app.models.tag import Tag
+from app.models.prompt_tag import PromptTag
+from app.search.query import parse_query
 
 logger = get_logger(__name__)
 
+# Веса столбцов prompts_fts для bm25: text, normalized_text, tags
+BM25_WEIGHTS = "2.0, 1.0, 10.0"
 
-def init_fts5_table(db: Session) -> None:
-    """
-    Инициализация FTS5 таблицы для полнотекстового поиска
+# Значение automerge FTS5 по умолчанию (восстанавливается после массовой записи)
+FTS5_AUTOMERGE = 4
+
+# FTS5 индексы промптов (обслуживаются вместе)
+FTS5_INDEXES = ("prompts_fts", "prompts_trigram")
+
+# Страниц, записываемых одной командой merge (порция фонового слияния и слияние после импорта)
+FTS5_MERGE_PAGES = 64
+
+# Импорт с таким количеством элементов пишет без обновления индексов триггерами и перестраивает
+# индексы в конце: 'rebuild' всего индекса дешевле построчного обновления при большом импорте
+FTS5_BULK_REBUILD_MIN_ITEMS = 20000
+
+# Массовая запись без триггеров синхронизации (fts5_bulk_begin с rebuild=True).
+# Строка импорта фиксируется с writing = 0 и отмечает, что индексы нужно перестроить.
+# writing = 1 ставится в начале каждой транзакции сессии импорта и снимается перед ее фиксацией:
+# триггеры пропускают только записи самого импорта, другие соединения флаг не видят
+# (а писать одновременно с открытой транзакцией импорта SQLite им не дает)
+FTS_BULK_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS fts_bulk (
+        id INTEGER PRIMARY KEY,
+        writing INTEGER NOT NULL DEFAULT 0,
+        started_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+FTS_BULK_GUARD = "WHEN NOT EXISTS (SELECT 1 FROM fts_bulk WHERE writing = 1)"
+
+# Ключ session.info с id строки fts_bulk сессии импорта
+_FTS_BULK_KEY = "fts_bulk_id"
+
+# Токенизаторы prompts_fts (настройка FTS5_TOKENIZER).
+# remove_diacritics 2 убирает диакритику латиницы (café = cafe), ё сводится к е в normalized_text
+# и в запросе; porter дополнительно приводит английские слова к основе (кириллица не меняется)
+FTS5_TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "porter": "porter unicode61 remove_diacritics 2",
+}
+
+# Префиксные индексы: запрос term* с префиксом такой длины (в символах) читает готовый список
+# документов вместо объединения списков всех терминов с этим префиксом
+FTS5_PREFIX = "2 3 4"
+
+# Содержимое индекса: живые промпты с названиями тегов. Индекс external content ссылается на это
+# представление, поэтому 'rebuild' восстанавливает индекс из БД, а триггеры удаляют из индекса
+# ровно те значения, которые были проиндексированы.
+FTS5_CONTENT_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS prompts_fts_content AS
+    SELECT
+        p.id,
+        p.text,
+        p.normalized_text,
+        (SELECT GROUP_CONCAT(name, ' ')
+         FROM (SELECT t.name FROM prompt_tags pt JOIN tags t ON t.id = pt.tag_id
+               WHERE pt.prompt_id = p.id ORDER BY t.id)) AS tags
+    FROM prompts p
+    WHERE p.deleted_at IS NULL
+"""
+
+# Триграммный индекс для резервного поиска подстрок (search_fallback): только normalized_text
+TRIGRAM_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS prompts_trigram USING fts5(
+        normalized_text,
+        content='prompts_fts_content',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+"""
+
+# Минимальная длина подстроки для триграммного индекса (короче - поиск LIKE)
+TRIGRAM_MIN_LENGTH = 3
 
-    Создает виртуальную таблицу FTS5 и триггеры для синхронизации
+# Нечеткий резервный поиск: не более стольких различных триграмм запроса (первые по порядку)
+TRIGRAM_FUZZY_MAX_TRIGRAMS = 32
+
+# Нечеткое совпадение: хотя бы такая доля триграмм запроса, но не меньше TRIGRAM_FUZZY_MIN_OVERLAP
+# (одна общая частая триграмма вроде "ого" есть почти в каждом промпте)
+TRIGRAM_FUZZY_MIN_SHARE = 0.5
+TRIGRAM_FUZZY_MIN_OVERLAP = 2
+
+# Из списка промптов каждой триграммы читаются только самые новые (ограничение кандидатов:
+# частые триграммы не заставляют просматривать весь индекс)
+TRIGRAM_FUZZY_MAX_CANDIDATES = 5000
+
+# Выражения записи строк представления в индекс (condition - отбор промптов)
+_DELETE_SQL = """
+    INSERT INTO {table}({table}, rowid, {columns})
+    SELECT 'delete', id, {columns} FROM prompts_fts_content WHERE {condition};
+"""
+_INSERT_SQL = """
+    INSERT INTO {table}(rowid, {columns})
+    SELECT id, {columns} FROM prompts_fts_content WHERE {condition};
+"""
+_TAG_PROMPTS = "id IN (SELECT prompt_id FROM prompt_tags WHERE tag_id = {ref}.id)"
+
+
+def fts5_sync_triggers(table: str, columns: Sequence[str], with_tags: bool = False) -> List[Tuple[str, str, str]]:
     """
-    # Создание FTS5 таблицы
-    db.execute(
-        text("""
+    Триггеры синхронизации индекса с prompts_fts_content: (имя, событие, тело)
+
+    Перед изменением строка промпта удаляется из индекса со старыми значениями, после изменения
+    добавляется с новыми (мягко удаленные промпты в представление не входят и в индекс не возвращаются).
+    Триггеры обновления срабатывают только на индексируемые столбцы и deleted_at: закрепление,
+    updated_at и прочие столбцы индекс не трогают. Пока транзакция массовой записи держит флаг
+    fts_bulk, триггеры индекс не обновляют (FTS_BULK_GUARD).
+    with_tags - индекс содержит названия тегов и обновляется при изменении связей и тегов.
+    """
+    update_columns = ", ".join([column for column in columns if column != "tags"] + ["deleted_at"])
+
+    def delete(condition: str) -> str:
+        return _DELETE_SQL.format(table=table, columns=", ".join(columns), condition=condition)
+
+    def insert(condition: str) -> str:
+        return _INSERT_SQL.format(table=table, columns=", ".join(columns), condition=condition)
+
+    def guarded(trigger_event: str) -> str:
+        return f"{trigger_event} {FTS_BULK_GUARD}"
+
+    triggers = [
+        (f"{table}_insert", guarded("AFTER INSERT ON prompts"), insert("id = new.id")),
+        (f"{table}_before_update", guarded(f"BEFORE UPDATE OF {update_columns} ON prompts"), delete("id = old.id")),
+        (f"{table}_update", guarded(f"AFTER UPDATE OF {update_columns} ON prompts"), insert("id = new.id")),
+        (f"{table}_delete", guarded("BEFORE DELETE ON prompts"), delete("id = old.id")),
+    ]
+    if with_tags:
+        triggers += [
+            (f"{table}_tags_before_insert", guarded("BEFORE INSERT ON prompt_tags"), delete("id = new.prompt_id")),
+            (f"{table}_tags_insert", guarded("AFTER INSERT ON prompt_tags"), insert("id = new.prompt_id")),
+            (f"{table}_tags_before_delete", guarded("BEFORE DELETE ON prompt_tags"), delete("id = old.prompt_id")),
+            (f"{table}_tags_delete", guarded("AFTER DELETE ON prompt_tags"), insert("id = old.prompt_id")),
+            (
+                f"{table}_tag_before_rename",
+                guarded("BEFORE UPDATE OF name ON tags"),
+                delete(_TAG_PROMPTS.format(ref="old")),
+            ),
+            (f"{table}_tag_rename", guarded("AFTER UPDATE OF name ON tags"), insert(_TAG_PROMPTS.format(ref="new"))),
+            # Связи удаляются до удаления тега, пока его название еще есть в представлении
+            # (каскад внешнего ключа выполняется уже после удаления строки тега)
+            (f"{table}_tag_delete", "BEFORE DELETE ON tags", "DELETE FROM prompt_tags WHERE tag_id = old.id;"),
+        ]
+    return triggers
+
+
+FTS5_TRIGGERS = fts5_sync_triggers("prompts_fts", ("text", "normalized_text", "tags"), with_tags=True)
+TRIGRAM_TRIGGERS = fts5_sync_triggers("prompts_trigram", ("normalized_text",))
+
+# Триггеры прежних версий схемы индекса
+LEGACY_FTS5_TRIGGERS = ("prompts_fts_tags_update",)
+
+
+def fts5_table_sql(tokenizer: Optional[str] = None) -> str:
+    """SQL создания prompts_fts (tokenizer - ключ FTS5_TOKENIZERS, по умолчанию из настроек)"""
+    tokenize = FTS5_TOKENIZERS[tokenizer or settings.fts5_tokenizer]
+    return f"""
         CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
-            prompt_id UNINDEXED,
             text,
             normalized_text,
             tags,
-            content='prompts',
-            content_rowid='id'
+            content='prompts_fts_content',
+            content_rowid='id',
+            tokenize='{tokenize}',
+            prefix='{FTS5_PREFIX}'
         )
-    """)
-    )
+    """
 
-    # Триггер для INSERT
-    db.execute(
-        text("""
-        CREATE TRIGGER IF NOT EXISTS prompts_fts_insert AFTER INSERT ON prompts BEGIN
-            INSERT INTO prompts_fts(rowid, prompt_id, text, normalized_text, tags)
-            VALUES (
-                new.id,
-                new.id,
-                new.text,
-                new.normalized_text,
-                (SELECT GROUP_CONCAT(t.name, ' ')
-                 FROM tags t
-                 JOIN prompt_tags pt ON t.id = pt.tag_id
-                 WHERE pt.prompt_id = new.id)
-            );
-        END
-    """)
-    )
 
-    # Триггер для UPDATE
-    db.execute(
-        text("""
-        CREATE TRIGGER IF NOT EXISTS prompts_fts_update AFTER UPDATE ON prompts BEGIN
-            UPDATE prompts_fts SET
-                text = new.text,
-                normalized_text = new.normalized_text,
-                tags = (SELECT GROUP_CONCAT(t.name, ' ')
-                       FROM tags t
-                       JOIN prompt_tags pt ON t.id = pt.tag_id
-                       WHERE pt.prompt_id = new.id)
-            WHERE rowid = new.id;
-        END
-    """)
-    )
+def _fts5_definition(sql: str) -> str:
+    """Аргументы fts5(...) без пробелов для сравнения определений таблицы"""
+    return "".join(sql[sql.index("fts5(") :].split())
 
-    # Триггер для DELETE (мягкое удаление)
-    db.execute(
-        text("""
-        CREATE TRIGGER IF NOT EXISTS prompts_fts_delete AFTER UPDATE OF deleted_at ON prompts BEGIN
-            DELETE FROM prompts_fts WHERE rowid = old.id;
-        END
-    """)
-    )
 
-    # Триггер для обновления тегов
-    db.execute(
-        text("""
-        CREATE TRIGGER IF NOT EXISTS prompts_fts_tags_update AFTER INSERT ON prompt_tags BEGIN
-            UPDATE prompts_fts SET
-                tags = (SELECT GROUP_CONCAT(t.name, ' ')
-                       FROM tags t
-                       JOIN prompt_tags pt ON t.id = pt.tag_id
-                       WHERE pt.prompt_id = new.prompt_id)
-            WHERE prompt_id = new.prompt_id;
-        END
-    """)
+def _table_exists(db: Session, name: str) -> bool:
+    return (
+        db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}).first()
+        is not None
     )
 
-    db.execute(
-        text("""
-        CREATE TRIGGER IF NOT EXISTS prompts_fts_tags_delete AFTER DELETE ON prompt_tags BEGIN
-            UPDATE prompts_fts SET
-                tags = (SELECT GROUP_CONCAT(t.name, ' ')
-                       FROM tags t
-                       JOIN prompt_tags pt ON t.id = pt.tag_id
-                       WHERE pt.prompt_id = old.prompt_id)
-            WHERE prompt_id = old.prompt_id;
-        END
-    """)
-    )
+
+def _missing_triggers(db: Session, triggers: Sequence[Tuple[str, str, str]]) -> List[str]:
+    """Триггеры из списка, которых нет в БД"""
+    existing = set(db.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    return [name for name, _, _ in triggers if name not in existing]
+
+
+def _create_triggers(db: Session, triggers: Sequence[Tuple[str, str, str]]) -> None:
+    for name, trigger_event, body in triggers:
+        db.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {trigger_event} BEGIN {body} END"))
+
+
+def _drop_triggers(db: Session, triggers: Sequence[Tuple[str, str, str]]) -> None:
+    for name, _, _ in triggers:
+        db.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def _init_index(db: Session, table: str, table_sql: str, triggers: Sequence[Tuple[str, str, str]]) -> None:
+    """Создать индекс и триггеры; индекс с другим определением пересоздается и строится заново"""
+    existing = db.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table})
+    existing = existing.scalar()
+    rebuild = existing is None or _fts5_definition(existing) != _fts5_definition(table_sql)
+    if not rebuild and _missing_triggers(db, triggers):
+        # Индекс без триггеров не получал изменения промптов
+        logger.warning(f"Триггеры {table} отсутствуют, индекс будет перестроен")
+        rebuild = True
+
+    _drop_triggers(db, triggers)
+    if rebuild and existing is not None:
+        logger.info(f"Определение {table} изменилось, индекс будет перестроен")
+        db.execute(text(f"DROP TABLE {table}"))
+
+    db.execute(text(table_sql))
+    _create_triggers(db, triggers)
+    if rebuild:
+        db.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+
+
+def init_fts5_table(db: Session) -> None:
+    """
+    Инициализация FTS5 таблиц для полнотекстового поиска
+
+    Создает представление содержимого, полнотекстовый индекс prompts_fts, триграммный индекс
+    prompts_trigram, таблицу флага массовой записи fts_bulk и триггеры синхронизации. Если таблица
+    создана с другим определением (прежняя схема, другой токенизатор), она пересоздается и индекс
+    строится заново.
+
+    Raises:
+        KeyError: Если FTS5_TOKENIZER не из FTS5_TOKENIZERS
+    """
+    for name in LEGACY_FTS5_TRIGGERS:
+        db.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    db.execute(text(FTS5_CONTENT_VIEW_SQL))
+    db.execute(text(FTS_BULK_TABLE_SQL))
+    _init_index(db, "prompts_fts", fts5_table_sql(), FTS5_TRIGGERS)
+    _init_index(db, "prompts_trigram", TRIGRAM_TABLE_SQL, TRIGRAM_TRIGGERS)
+
+    # Словарь терминов индекса (подсказки поиска, app/search/suggest.py)
+    db.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts_vocab USING fts5vocab(prompts_fts, row)"))
 
     db.commit()
     logger.info("FTS5 таблица и триггеры созданы")
 
 
+def fts5_restore_sync(db: Session) -> None:
+    """
+    Восстановить триггеры синхронизации и automerge FTS5 индексов (при запуске приложения)
+
+    Массовый импорт, прерванный до fts5_bulk_end (остановка процесса), оставляет automerge = 0,
+    а импорт без триггеров - и строку fts_bulk: его зафиксированные пачки не попали в индексы,
+    поэтому строка удаляется и индексы перестраиваются. Индекс без триггеров (удаленных вручную
+    или массовой записью прежних версий) тоже перестраивается.
+    """
+    interrupted = _table_exists(db, "fts_bulk") and db.execute(text("SELECT 1 FROM fts_bulk")).first() is not None
+    if interrupted:
+        logger.warning("Массовый импорт без триггеров FTS5 был прерван, индексы будут перестроены")
+        db.execute(text("DELETE FROM fts_bulk"))
+
+    for table, triggers in (("prompts_fts", FTS5_TRIGGERS), ("prompts_trigram", TRIGRAM_TRIGGERS)):
+        rebuild = interrupted
+        if _missing_triggers(db, triggers):
+            logger.warning(f"Триггеры {table} отсутствуют, индекс будет перестроен")
+            _create_triggers(db, triggers)
+            rebuild = True
+        if rebuild:
+            db.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+        db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('automerge', {FTS5_AUTOMERGE})"))
+    db.commit()
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _fts_bulk_mark(session, transaction, connection) -> None:
+    """Поднять флаг fts_bulk в начале транзакции сессии импорта: триггеры не обновляют индексы"""
+    bulk_id = session.info.get(_FTS_BULK_KEY)
+    if bulk_id is not None:
+        connection.execute(text("UPDATE fts_bulk SET writing = 1 WHERE id = :id"), {"id": bulk_id})
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _fts_bulk_unmark(session) -> None:
+    """Снять флаг перед фиксацией (после последнего flush): другие соединения writing = 1 не видят"""
+    bulk_id = session.info.get(_FTS_BULK_KEY)
+    if bulk_id is not None:
+        session.flush()
+        session.execute(text("UPDATE fts_bulk SET writing = 0 WHERE id = :id"), {"id": bulk_id})
+
+
+def fts5_bulk_begin(db: Session, rebuild: bool = False) -> bool:
+    """
+    Перевести FTS5 индекс в режим массовой записи
+
+    Отключает automerge индексов, чтобы каждая транзакция массовой вставки не выполняла слияние сегментов.
+    С rebuild=True записи этой сессии не обновляют индексы триггерами (флаг fts_bulk, виден только
+    транзакциям сессии), а fts5_bulk_end перестраивает индексы целиком. Записи других клиентов
+    во время импорта индексируются как обычно. Если процесс остановится до fts5_bulk_end,
+    флаг и automerge восстановит fts5_restore_sync при следующем запуске.
+
+    Returns:
+        bool: True если режим включен (нужно вызвать fts5_bulk_end)
+    """
+    try:
+        for table in FTS5_INDEXES:
+            db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('automerge', 0)"))
+        bulk_id = None
+        if rebuild:
+            bulk_id = db.execute(text("INSERT INTO fts_bulk (writing) VALUES (0)")).lastrowid
+        db.commit()
+        if bulk_id is not None:
+            db.info[_FTS_BULK_KEY] = bulk_id
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Не удалось перевести FTS5 в режим массовой записи: {e}", extra={"error": str(e)})
+        return False
+
+
+def fts5_bulk_end(db: Session) -> None:
+    """
+    Завершить режим массовой записи: восстановить automerge и слить сегменты, добавленные импортом
+
+    После записи без триггеров индексы перестраиваются из БД и сливаются в один сегмент (optimize),
+    версия данных увеличивается (ответы поиска, полученные во время импорта, устарели); если это
+    не удалось, индексы перестроит fts5_restore_sync при следующем запуске. Иначе выполняется одна
+    порция merge: optimize переписывал бы весь индекс после каждого небольшого импорта, остальное
+    сольют automerge и фоновое слияние (fts_merge_loop).
+    """
+    bulk_id = db.info.pop(_FTS_BULK_KEY, None)
+    try:
+        if bulk_id is not None:
+            db.execute(text("DELETE FROM fts_bulk WHERE id = :id"), {"id": bulk_id})
+        for table in FTS5_INDEXES:
+            db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('automerge', {FTS5_AUTOMERGE})"))
+            if bulk_id is not None:
+                db.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+                db.execute(text(f"INSERT INTO {table}({table}) VALUES('optimize')"))
+            else:
+                db.execute(
+                    text(f"INSERT INTO {table}({table}, rank) VALUES('merge', :pages)"), {"pages": FTS5_MERGE_PAGES}
+                )
+        if bulk_id is not None:
+            db.execute(text(DATA_VERSION_BUMP_SQL))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка обслуживания FTS5 после массовой записи: {e}", extra={"error": str(e)})
+
+
+@contextmanager
+def fts5_bulk_mode(db: Session, rebuild: bool = False) -> Iterator[None]:
+    """Контекст массовой записи: fts5_bulk_begin при входе, fts5_bulk_end при выходе"""
+    enabled = fts5_bulk_begin(db, rebuild)
+    try:
+        yield
+    finally:
+        if enabled:
+            fts5_bulk_end(db)
+
+
 def search_fts5(
     db: Session,
     query: str,
@@ -116,7 +383,10 @@ def search_fts5(
     limit: int = 50,
     tag_ids: Optional[List[int]] = None,
     pinned_only: Optional[bool] = None,
-) -> Tuple[List[Prompt], int]:
+    with_total: bool = True,
+    projection: Optional[PromptProjection] = None,
+    fuzzy: bool = False,
+) -> Tuple[List[Prompt], Optional[int]]:
     """
     Поиск промптов с использованием FTS5
 
@@ -127,99 +397,173 @@ def search_fts5(
         limit: Максимум результатов
         tag_ids: Фильтр по тегам
         pinned_only: Только закрепленные
+        with_total: Подсчитывать общее количество, иначе total = None
+        projection: Вернуть строки столбцов проекции вместо ORM объектов (без тегов)
+        fuzzy: Дополнительно искать с заменой слов с опечатками близкими терминами (app/search/fuzzy.py)
 
     Returns:
         Tuple: (список промптов, общее количество)
     """
-    # Экранирование специальных символов FTS5
-    # FTS5 использует специальный синтаксис, нужно экранировать
-    escaped_query = query.replace('"', '""').replace("'", "''")
-
-    # Построение базового запроса FTS5
-    fts_query = f'"{escaped_query}"* OR {escaped_query}*'
-
-    # Базовый SQL для поиска
-    base_sql = """
-        SELECT DISTINCT p.*,
-               bm25(prompts_fts) as rank_score,
-               CASE
-                   WHEN prompts_fts.tags MATCH :tag_match THEN 100
-                   WHEN prompts_fts.text MATCH :text_match THEN 50
-                   ELSE 10
-               END as match_score
+    # Запрос пользователя компилируется в выражение MATCH без синтаксических ошибок (app/search/query.py)
+    parsed = parse_query(query)
+    expansions = None
+    if fuzzy:
+        from app.search.fuzzy import fuzzy_search
+
+        expansions = fuzzy_search.expansions(db, parsed.words)
+    fts_query = parsed.to_match(expansions)
+    if fts_query is None:
+        # В запросе нет слов (только знаки препинания или исключения) - совпадений нет
+        return [], 0 if with_total else None
+
+    # Один проход: ранжирование через bm25 с весами столбцов (совпадение в тегах важнее текста),
+    # общее количество - оконной функцией по тому же набору совпадений
+    from_sql = """
         FROM prompts_fts
-        JOIN prompts p ON prompts_fts.prompt_id = p.id
+        JOIN prompts p ON p.id = prompts_fts.rowid
         WHERE prompts_fts MATCH :query
           AND p.deleted_at IS NULL
     """
 
     # Параметры запроса
-    params = {"query": fts_query, "tag_match": f'"{escaped_query}"', "text_match": f'"{escaped_query}"'}
+    params = {"query": fts_query, "limit": limit, "skip": skip}
 
     # Добавление фильтров
     if pinned_only is not None:
-        base_sql += " AND p.is_pinned = :pinned"
+        from_sql += " AND p.is_pinned = :pinned"
         params["pinned"] = pinned_only
 
     # Фильтр по тегам
     if tag_ids:
-        tag_ids_str = ",".join(map(str, tag_ids))
-        base_sql += f" AND p.id IN (SELECT prompt_id FROM prompt_tags WHERE tag_id IN ({tag_ids_str}))"
-
-    # Сортировка: сначала по match_score (точное совпадение тега > текста > частичное),
-    # затем по rank_score (BM25), затем по дате
-    base_sql += """
-        ORDER BY match_score DESC, rank_score ASC, p.created_at DESC
+        from_sql += " AND p.id IN (SELECT prompt_id FROM prompt_tags WHERE tag_id IN :tag_ids)"
+        params["tag_ids"] = list(tag_ids)
+
+    # Сортировка: по BM25 (меньше - релевантнее), затем по дате.
+    # bm25 нельзя вызывать рядом с оконной функцией, поэтому ранг считается во внутреннем запросе.
+    # Сортируются и считаются только (id, created_at, rank), полные строки читаются лишь для страницы.
+    if projection is not None:
+        columns = projection.sql_columns("p")
+        result_columns = projection.typed_columns()
+    else:
+        columns = ", ".join(f"p.{c.name}" for c in Prompt.__table__.columns)
+        result_columns = list(Prompt.__table__.columns)
+    total_sql = "COUNT(*) OVER ()" if with_total else "NULL"
+    search_sql = f"""
+        SELECT {columns}, page.search_total
+        FROM (
+            SELECT id, created_at, rank_score, {total_sql} AS search_total
+            FROM (
+                SELECT p.id, p.created_at, bm25(prompts_fts, {BM25_WEIGHTS}) AS rank_score
+                {from_sql}
+            )
+            ORDER BY rank_score, created_at DESC, id DESC
+            LIMIT :limit OFFSET :skip
+        ) AS page
+        JOIN prompts p ON p.id = page.id
+        ORDER BY page.rank_score, page.created_at DESC, page.id DESC
     """
 
-    # Подсчет общего количества
-    count_sql = """
-        SELECT COUNT(DISTINCT p.id)
-        FROM prompts_fts
-        JOIN prompts p ON prompts_fts.prompt_id = p.id
-        WHERE prompts_fts MATCH :query
-          AND p.deleted_at IS NULL
+    statement = _fts5_statement(search_sql, params)
+    statement = statement.columns(*result_columns, column("search_total", Integer))
+
+    try:
+        if projection is not None:
+            # Строки столбцов без ORM объектов (search_total остается лишним атрибутом строки)
+            rows = db.execute(statement, params).all()
+            prompts = rows
+        else:
+            # Промпты собираются из того же результата, теги догружаются одним SELECT ... IN
+            rows = db.execute(
+                select(Prompt, statement.selected_columns.search_total)
+                .from_statement(statement)
+                .options(selectinload(Prompt.tags)),
+                params,
+            ).all()
+            prompts = [row[0] for row in rows]
+
+        total = None
+        if with_total:
+            # Страница за пределами результатов - окно пустое, общее количество неизвестно
+            total = rows[0][-1] if rows else (_count_fts5(db, from_sql, params) if skip else 0)
+
+        return prompts, total
+
+    except Exception as e:
+        # Синтаксических ошибок в выражении быть не может: ошибка означает проблему индекса
+        # (нет таблицы, поврежден), вызывающий код переключается на search_fallback
+        logger.error(f"Ошибка FTS5 поиска: {e}", extra={"error": str(e), "query": query, "match": fts_query})
+        db.rollback()
+        raise
+
+
+def _fts5_statement(sql: str, params: dict):
+    """Текстовый запрос с раскрытием списка tag_ids в IN (...)"""
+    statement = text(sql)
+    if "tag_ids" in params:
+        statement = statement.bindparams(bindparam("tag_ids", expanding=True))
+    return statement
+
+
+def _count_fts5(db: Session, from_sql: str, params: dict) -> int:
+    """Подсчитать совпадения поискового запроса (только для страниц за пределами результатов)"""
+    return db.execute(_fts5_statement(f"SELECT COUNT(*) {from_sql}", params), params).scalar() or 0
+
+
+def trigram_match_query(query: str) -> Optional[str]:
     """
+    Выражение MATCH триграммного индекса для поиска подстроки
 
-    if pinned_only is not None:
-        count_sql += " AND p.is_pinned = :pinned"
+    Returns:
+        Optional[str]: Фраза из всей подстроки или None, если подстрока короче TRIGRAM_MIN_LENGTH
+    """
+    if len(query) < TRIGRAM_MIN_LENGTH:
+        return None
+    return '"' + query.replace('"', '""') + '"'
 
-    if tag_ids:
-        tag_ids_str = ",".join(map(str, tag_ids))
-        count_sql += f" AND p.id IN (SELECT prompt_id FROM prompt_tags WHERE tag_id IN ({tag_ids_str}))"
 
-    try:
-        # Выполнение запроса подсчета
-        count_result = db.execute(text(count_sql), params)
-        total = count_result.scalar() or 0
+def trigram_fuzzy_query(query: str) -> Optional[Tuple[List[str], int]]:
+    """
+    Триграммы подстроки для нечеткого поиска и минимальное число совпавших триграмм
 
-        # Выполнение основного запроса с пагинацией
-        search_sql = base_sql + " LIMIT :limit OFFSET :skip"
-        params["limit"] = limit
-        params["skip"] = skip
+    Нужна хотя бы половина из n триграмм запроса (TRIGRAM_FUZZY_MIN_SHARE), но не меньше двух.
+    Для длинных запросов порог выше: одна ошибка (замена, вставка, удаление буквы) затрагивает
+    не более трех триграмм, поэтому строка на расстоянии k от запроса содержит хотя бы n - 3k
+    его триграмм (k - как у поиска с опечатками, app/search/fuzzy.py).
 
-        result = db.execute(text(search_sql), params)
-        rows = result.fetchall()
+    Returns:
+        Optional[Tuple[List[str], int]]: (фразы MATCH триграмм, минимум совпадений) или None,
+            если в подстроке меньше TRIGRAM_FUZZY_MIN_OVERLAP триграмм
+    """
+    from app.search.fuzzy import max_distance_for
 
-        # Получение ID промптов
-        prompt_ids = [row[0] for row in rows]  # Первый столбец - id
+    trigrams = list(dict.fromkeys(query[i : i + 3] for i in range(len(query) - 2)))[:TRIGRAM_FUZZY_MAX_TRIGRAMS]
+    if len(trigrams) < TRIGRAM_FUZZY_MIN_OVERLAP:
+        return None
+    phrases = ['"' + trigram.replace('"', '""') + '"' for trigram in trigrams]
+    share = math.ceil(len(phrases) * TRIGRAM_FUZZY_MIN_SHARE)
+    return phrases, max(TRIGRAM_FUZZY_MIN_OVERLAP, share, len(phrases) - 3 * max_distance_for(query))
 
-        if not prompt_ids:
-            return [], total
 
-        # Загрузка промптов с тегами
-        prompts = db.query(Prompt).filter(Prompt.id.in_(prompt_ids), Prompt.deleted_at.is_(None)).all()
+def _trigram_fuzzy_matches(phrases: List[str], min_overlap: int):
+    """
+    Подзапрос (rowid, overlap): промпты, в которых нашлось не меньше min_overlap триграмм запроса
 
-        # Сортировка по порядку из FTS5 результата
-        prompt_dict = {p.id: p for p in prompts}
-        sorted_prompts = [prompt_dict[pid] for pid in prompt_ids if pid in prompt_dict]
+    Для каждой триграммы берется не больше TRIGRAM_FUZZY_MAX_CANDIDATES самых новых промптов.
+    """
+    union = " UNION ALL ".join(
+        f"SELECT rowid FROM (SELECT rowid FROM prompts_trigram WHERE prompts_trigram MATCH :trigram_{i} "
+        f"ORDER BY rowid DESC LIMIT {TRIGRAM_FUZZY_MAX_CANDIDATES})"
+        for i in range(len(phrases))
+    )
+    matches = text(f"SELECT rowid, COUNT(*) AS overlap FROM ({union}) GROUP BY rowid HAVING COUNT(*) >= :min_overlap")
+    params = {f"trigram_{i}": phrase for i, phrase in enumerate(phrases)}
+    matches = matches.bindparams(min_overlap=min_overlap, **params)
+    return matches.columns(column("rowid", Integer), column("overlap", Integer)).subquery("fuzzy_matches")
 
-        return sorted_prompts, total
 
-    except Exception as e:
-        logger.error(f"Ошибка FTS5 поиска: {e}", extra={"error": str(e), "query": query})
-        # Fallback на обычный поиск
-        return [], 0
+def _trigram_available(db: Session) -> bool:
+    """Создан ли триграммный индекс (до миграции резервный поиск работает через LIKE)"""
+    return _table_exists(db, "prompts_trigram")
 
 
 def search_fallback(
@@ -229,39 +573,66 @@ def search_fallback(
     limit: int = 50,
     tag_ids: Optional[List[int]] = None,
     pinned_only: Optional[bool] = None,
-) -> Tuple[List[Prompt], int]:
+    with_total: bool = True,
+    projection: Optional[PromptProjection] = None,
+) -> Tuple[List[Prompt], Optional[int]]:
     """
-    Резервный вариант поиска с использованием LIKE
+    Резервный поиск подстроки
 
-    Используется если FTS5 недоступен или произошла ошибка
+    Используется если FTS5 поиск недоступен или произошла ошибка. Подстрока ищется в normalized_text
+    по триграммному индексу prompts_trigram; для подстрок короче трех символов и до создания
+    индекса - через LIKE (полный просмотр таблицы). Если точных совпадений нет, по триграммному
+    индексу ищутся строки, похожие на подстроку с опечатками (trigram_fuzzy_query): они
+    сортируются по числу совпавших триграмм.
     """
     from app.utils.text import normalize_text
 
     normalized_query = normalize_text(query)
 
-    # Базовый запрос
-    q = db.query(Prompt).filter(Prompt.deleted_at.is_(None))
-
-    # Поиск по тексту или normalized_text
-    search_filter = Prompt.text.contains(query) | Prompt.normalized_text.contains(normalized_query)
-
-    # Поиск по тегам
+    # Базовый запрос (теги загружаются одним дополнительным SELECT ... IN, для проекции - только ее столбцы)
+    if projection is not None:
+        q = db.query(*projection.columns())
+    else:
+        q = db.query(Prompt).options(selectinload(Prompt.tags))
+    q = q.filter(Prompt.deleted_at.is_(None))
+
+    # Поиск подстроки: по индексу, иначе по тексту или normalized_text через LIKE
+    match_query = trigram_match_query(normalized_query)
+    trigram_available = match_query is not None and _trigram_available(db)
+    if trigram_available:
+        matches = text("SELECT rowid FROM prompts_trigram WHERE prompts_trigram MATCH :trigram_query")
+        matches = matches.bindparams(trigram_query=match_query).columns(column("rowid", Integer))
+        search_filter = Prompt.id.in_(matches)
+    else:
+        search_filter = Prompt.text.contains(query) | Prompt.normalized_text.contains(normalized_query)
+
+    # Поиск по тегам (подзапрос: промпт с несколькими тегами из фильтра не повторяется)
     if tag_ids:
-        q = q.join(Prompt.tags).filter(Tag.id.in_(tag_ids))
+        q = q.filter(Prompt.id.in_(select(PromptTag.prompt_id).where(PromptTag.tag_id.in_(tag_ids))))
 
     # Фильтр по закрепленным
     if pinned_only is not None:
         q = q.filter(Prompt.is_pinned == pinned_only)
 
     # Применение поискового фильтра
-    q = q.filter(search_filter)
+    exact = q.filter(search_filter)
 
     # Подсчет
-    total = q.count()
+    total = exact.count() if with_total else None
+
+    # Точных совпадений нет - нечеткий поиск по доле совпавших триграмм (все страницы запроса
+    # выбирают один и тот же режим: он зависит только от наличия точных совпадений)
+    fuzzy_query = trigram_fuzzy_query(normalized_query) if trigram_available else None
+    if fuzzy_query and (total == 0 if with_total else exact.with_entities(Prompt.id).first() is None):
+        fuzzy = _trigram_fuzzy_matches(*fuzzy_query)
+        q = q.join(fuzzy, fuzzy.c.rowid == Prompt.id)
+        total = q.count() if with_total else None
+        q = q.order_by(fuzzy.c.overlap.desc(), Prompt.is_pinned.desc(), Prompt.created_at.desc())
+        return q.offset(skip).limit(limit).all(), total
 
     # Сортировка: сначала закрепленные, потом по релевантности (начинается с запроса)
     # Простая эвристика: промпты, где текст начинается с запроса, выше
-    q = q.order_by(
+    q = exact.order_by(
         Prompt.is_pinned.desc(),
         Prompt.text.startswith(query).desc(),
         Prompt.normalized_text.startswith(normalized_query).desc(),
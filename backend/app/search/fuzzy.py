@@ -0,0 +1,255 @@
+"""
+Поиск с опечатками (fuzzy=true)
+
+Слова запроса (app/search/query.py), которых нет в словаре индекса (ни одного термина с таким началом), заменяются
+близкими терминами: расстояние редактирования до 2 (перестановка соседних букв - одна ошибка).
+Соседи находятся по индексу удалений SymSpell: для каждого термина заранее сохранены строки,
+получаемые удалением до двух букв из его начала, и совпадение таких строк у слова и термина
+дает кандидатов, которые проверяются точным расстоянием. Полный перебор словаря не выполняется.
+
+Индекс строится по словарю prompts_fts_vocab. После изменения данных собирается новый индекс,
+который разделяет с прежним основную таблицу удалений и добавляет удаления только новых терминов
+(см. app/search/vocabulary.py): прежний индекс не изменяется, пока его читают запросы.
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.search.vocabulary import VocabularyService, load_vocabulary
+
+# Максимальное расстояние редактирования
+FUZZY_MAX_DISTANCE = 2
+
+# Удаления строятся из начала термина такой длины (длинные термины не умножают размер индекса)
+FUZZY_PREFIX_LENGTH = 6
+
+# Замены выбираются из терминов, встречающихся хотя бы в стольких промптах
+# (единичные термины - чаще всего сами опечатки), и не более чем из FUZZY_MAX_TERMS самых частых
+FUZZY_MIN_TERM_DOCS = 2
+FUZZY_MAX_TERMS = 100000
+
+# Максимум замен одного слова
+FUZZY_MAX_EXPANSIONS = 5
+
+# Слова короче не исправляются
+FUZZY_MIN_WORD_LENGTH = 3
+
+# Ключей удалений новых терминов, после которых они переносятся в основную таблицу (ее копию)
+FUZZY_ADDED_MAX_KEYS = 200000
+
+
+def max_distance_for(word: str) -> int:
+    """Допустимое число ошибок для слова: до 4 букв - одна, длиннее - FUZZY_MAX_DISTANCE"""
+    if len(word) < FUZZY_MIN_WORD_LENGTH:
+        return 0
+    return 1 if len(word) <= 4 else FUZZY_MAX_DISTANCE
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (перестановка соседних букв - одна операция)
+
+    Считается только полоса матрицы шириной 2 * limit + 1 вокруг диагонали: ячейки вне полосы
+    заведомо больше limit.
+
+    Returns:
+        int: Расстояние или limit + 1, если оно больше limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous_previous: List[int] = []
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return over
+        previous_previous, previous = previous, current
+    return min(previous[-1], over)
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """Строки, получаемые из слова удалением до distance букв (включая само слово)"""
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1 :] for candidate in frontier for i in range(len(candidate))}
+        result |= frontier
+    return result
+
+
+class SymSpellIndex:
+    """
+    Индекс удалений терминов для поиска близких слов
+
+    Ключ индекса - хэш строки удаления (совпадение хэшей дает лишнего кандидата, которого отсеет
+    проверка расстояния), значение - термин или список терминов: вдвое меньше памяти, чем
+    словарь строк со списками.
+
+    add_many заполняет еще не опубликованный индекс. Опубликованный не изменяется: with_terms
+    возвращает новый индекс, разделяющий с ним основную таблицу deletes, а удаления новых терминов
+    хранятся в небольшой таблице added (копируется при каждом обновлении).
+    """
+
+    def __init__(self, max_distance: int = FUZZY_MAX_DISTANCE, prefix_length: int = FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.counts: Dict[str, int] = {}
+        self.sorted_terms: List[str] = []
+        self.deletes: Dict[int, Union[str, List[str]]] = {}
+        self.added: Dict[int, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add_many(self, terms: Iterable[Tuple[str, int]]) -> None:
+        """Добавить термины (для известных обновляется только количество промптов)"""
+        new_terms = []
+        for term, count in terms:
+            if term not in self.counts:
+                new_terms.append(term)
+                self._add_deletes(term)
+            self.counts[term] = count
+        if len(new_terms) > 100:
+            self.sorted_terms = sorted(self.counts)
+        else:
+            for term in new_terms:
+                insort(self.sorted_terms, term)
+
+    def with_terms(self, terms: Iterable[Tuple[str, int]]) -> "SymSpellIndex":
+        """Новый индекс с добавленными терминами (этот индекс не изменяется)"""
+        index = SymSpellIndex(self.max_distance, self.prefix_length)
+        index.counts = dict(self.counts)
+        index.deletes = self.deletes
+        index.added = dict(self.added)
+
+        new_terms = []
+        for term, count in terms:
+            if term not in index.counts:
+                new_terms.append(term)
+                for key in self._delete_keys(term):
+                    index.added[key] = index.added.get(key, ()) + (term,)
+            index.counts[term] = count
+
+        if len(new_terms) > 100:
+            index.sorted_terms = sorted(index.counts)
+        else:
+            index.sorted_terms = list(self.sorted_terms)
+            for term in new_terms:
+                insort(index.sorted_terms, term)
+        if len(index.added) > FUZZY_ADDED_MAX_KEYS:
+            index._merge_added()
+        return index
+
+    def _merge_added(self) -> None:
+        """Перенести удаления новых терминов в копию основной таблицы"""
+        merged = dict(self.deletes)
+        for key, terms in self.added.items():
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = terms[0] if len(terms) == 1 else list(terms)
+            elif isinstance(existing, str):
+                merged[key] = [existing, *terms]
+            else:
+                merged[key] = [*existing, *terms]
+        self.deletes = merged
+        self.added = {}
+
+    def _delete_keys(self, term: str) -> List[int]:
+        """Ключи удалений термина (пусто для коротких и не буквенных терминов)"""
+        if len(term) < FUZZY_MIN_WORD_LENGTH or not term.isalpha():
+            return []
+        return [hash(key) for key in deletes(term[: self.prefix_length], self.max_distance)]
+
+    def _add_deletes(self, term: str) -> None:
+        for key in self._delete_keys(term):
+            existing = self.deletes.get(key)
+            if existing is None:
+                self.deletes[key] = term
+            elif isinstance(existing, str):
+                self.deletes[key] = [existing, term]
+            else:
+                existing.append(term)
+
+    def is_known(self, word: str) -> bool:
+        """Есть ли термин, начинающийся со слова (поиск FTS5 ищет слова по префиксу)"""
+        index = bisect_left(self.sorted_terms, word)
+        return index < len(self.sorted_terms) and self.sorted_terms[index].startswith(word)
+
+    def lookup(self, word: str, max_distance: int, limit: int = FUZZY_MAX_EXPANSIONS) -> List[Tuple[str, int, int]]:
+        """
+        Близкие термины
+
+        Returns:
+            List[Tuple[str, int, int]]: (термин, расстояние, количество промптов) - по расстоянию,
+                затем по убыванию количества промптов
+        """
+        max_distance = min(max_distance, self.max_distance)
+        candidates: Set[str] = set()
+        for key in deletes(word[: self.prefix_length], max_distance):
+            key = hash(key)
+            terms = self.deletes.get(key)
+            if isinstance(terms, str):
+                candidates.add(terms)
+            elif terms is not None:
+                candidates.update(terms)
+            candidates.update(self.added.get(key, ()))
+        candidates.discard(word)
+
+        result = []
+        for term in candidates:
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                result.append((term, distance, self.counts[term]))
+        result.sort(key=lambda item: (item[1], -item[2], item[0]))
+        return result[:limit]
+
+
+class FuzzyService(VocabularyService[SymSpellIndex]):
+    """Индекс опечаток процесса: строится при первом запросе и дополняется новыми терминами"""
+
+    def build(self, db: Session) -> SymSpellIndex:
+        index = SymSpellIndex()
+        index.add_many(self._terms(db))
+        return index
+
+    def refresh(self, db: Session, value: SymSpellIndex) -> SymSpellIndex:
+        # Удаления строятся только для новых терминов, в новом индексе: прежний читают другие запросы.
+        # Исчезнувшие термины остаются (замена на них ничего не найдет и не помешает)
+        return value.with_terms(self._terms(db))
+
+    def _terms(self, db: Session) -> List[Tuple[str, int]]:
+        """Термины словаря для индекса: не реже FUZZY_MIN_TERM_DOCS, не более FUZZY_MAX_TERMS самых частых"""
+        terms = [(term, count) for term, count in load_vocabulary(db) if count >= FUZZY_MIN_TERM_DOCS]
+        if len(terms) > FUZZY_MAX_TERMS:
+            terms = heapq.nlargest(FUZZY_MAX_TERMS, terms, key=lambda item: item[1])
+        return terms
+
+    def expansions(self, db: Session, words: Iterable[str]) -> Dict[str, List[str]]:
+        """Замены неизвестных слов запроса: слово -> близкие термины (только слова с заменами)"""
+        index = self.current(db)
+        result = {}
+        for word in words:
+            distance = max_distance_for(word)
+            if distance == 0 or word in result or index.is_known(word):
+                continue
+            neighbours = [term for term, _, _ in index.lookup(word, distance)]
+            if neighbours:
+                result[word] = neighbours
+        return result
+
+
+fuzzy_search = FuzzyService()
@@ -0,0 +1,142 @@
+"""
+Обслуживание FTS5 индексов промптов: rebuild, merge, optimize, integrity-check и статистика
+
+После больших импортов и множества удалений индекс состоит из многих сегментов (каждая запись
+добавляет сегмент, удаление - маркеры удаления), и запросы читают их все. Слияние сегментов
+выполняется:
+    - командой merge небольшими порциями (fts5_merge_step) - фоновая задача API, запросы не ждут;
+    - командами optimize (все сегменты в один) и rebuild (индекс заново из prompts_fts_content)
+      из scripts/maintenance.py или эндпоинта /api/v1/admin/fts.
+"""
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.database import SessionLocal
+from app.search.fts5 import FTS5_INDEXES, FTS5_MERGE_PAGES
+
+logger = get_logger(__name__)
+
+# Команды обслуживания FTS5
+FTS5_COMMANDS = ("rebuild", "merge", "optimize", "integrity-check")
+
+# Строка %_data со структурой индекса (уровни и сегменты)
+_STRUCTURE_ROWID = 10
+
+# Маркер второй версии формата структуры (после 4-байтового cookie)
+_STRUCTURE_V2 = b"\xff\x00\x00\x01"
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Varint формата SQLite: (значение, смещение после него)"""
+    value = 0
+    for i in range(8):
+        byte = data[offset + i]
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, offset + i + 1
+    return (value << 8) | data[offset + 8], offset + 9
+
+
+def fts5_index_stats(db: Session, table: str) -> dict:
+    """
+    Статистика FTS5 индекса
+
+    Returns:
+        dict: table, rows (проиндексировано строк), levels и segments (уровни и сегменты b-деревьев),
+            size_bytes (размер блоков индекса)
+    """
+    size = db.execute(text(f"SELECT COALESCE(SUM(LENGTH(block)), 0) FROM {table}_data")).scalar()
+    rows = db.execute(text(f"SELECT COUNT(*) FROM {table}_docsize")).scalar()
+    structure = db.execute(text(f"SELECT block FROM {table}_data WHERE id = {_STRUCTURE_ROWID}")).scalar()
+
+    levels = segments = 0
+    if structure:
+        offset = 8 if structure[4:8] == _STRUCTURE_V2 else 4
+        levels, offset = _read_varint(structure, offset)
+        segments, _ = _read_varint(structure, offset)
+    return {"table": table, "rows": rows, "levels": levels, "segments": segments, "size_bytes": size}
+
+
+def fts5_stats(db: Session, tables: Sequence[str] = FTS5_INDEXES) -> List[dict]:
+    """Статистика всех FTS5 индексов промптов"""
+    return [fts5_index_stats(db, table) for table in tables]
+
+
+def run_fts5_command(
+    db: Session, command: str, pages: int = FTS5_MERGE_PAGES, tables: Sequence[str] = FTS5_INDEXES
+) -> dict:
+    """
+    Выполнить команду обслуживания для индексов
+
+    merge записывает не более pages страниц в каждом индексе; остальные команды обрабатывают
+    индекс целиком и на время выполнения блокируют запись в БД.
+
+    Returns:
+        dict: command, duration_ms, ok (False - integrity-check нашел повреждение), error, indexes (статистика после)
+
+    Raises:
+        ValueError: Если команда неизвестна
+    """
+    if command not in FTS5_COMMANDS:
+        raise ValueError(f"Неизвестная команда: {command}. Доступны: {', '.join(FTS5_COMMANDS)}")
+
+    started = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        for table in tables:
+            if command == "merge":
+                db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('merge', :pages)"), {"pages": pages})
+            elif command == "integrity-check":
+                # rank = 1: индекс сверяется и с содержимым (prompts_fts_content)
+                db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('integrity-check', 1)"))
+            else:
+                db.execute(text(f"INSERT INTO {table}({table}) VALUES('{command}')"))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if command != "integrity-check":
+            raise
+        # Сообщение SQLite без текста SQL запроса
+        error = str(getattr(e, "orig", None) or e)
+        logger.error(f"FTS5 integrity-check: {e}", extra={"error": error})
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"FTS5 {command} выполнен", extra={"duration_ms": duration_ms})
+    return {
+        "command": command,
+        "duration_ms": duration_ms,
+        "ok": error is None,
+        "error": error,
+        "indexes": fts5_stats(db, tables),
+    }
+
+
+def fts5_merge_step(db: Session, pages: int = FTS5_MERGE_PAGES) -> bool:
+    """
+    Одна порция слияния сегментов во всех индексах (короткая транзакция)
+
+    Returns:
+        bool: True если слияние выполняло работу (стоит запустить следующую порцию)
+    """
+    worked = False
+    for table in FTS5_INDEXES:
+        # По документации FTS5: total_changes вырос хотя бы на 2 - команда merge что-то слила
+        before = db.execute(text("SELECT total_changes()")).scalar()
+        db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('merge', :pages)"), {"pages": pages})
+        worked |= db.execute(text("SELECT total_changes()")).scalar() - before >= 2
+    db.commit()
+    return worked
+
+
+def run_fts5_merge_slice(pages: int = FTS5_MERGE_PAGES) -> bool:
+    """Порция слияния в собственной сессии (фоновая задача API, см. fts5_merge_step)"""
+    db = SessionLocal()
+    try:
+        return fts5_merge_step(db, pages)
+    finally:
+        db.close()
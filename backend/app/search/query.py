@@ -0,0 +1,157 @@
+"""
+Компилятор поисковых запросов пользователя в выражения FTS5 MATCH
+
+Поддерживаемый синтаксис:
+    слово        - слово или его начало (кот найдет котов)
+    "фраза"      - слова подряд
+    -слово       - исключить (также NOT слово)
+    a OR b       - любая из частей запроса
+    tags:кот     - поиск в столбце (tags/tag/#кот - теги, text - текст промпта)
+
+Все слова выводятся в выражение строками в кавычках, поэтому никакой ввод (кавычки, скобки,
+звездочки, двоеточия, NEAR, ^) не дает синтаксической ошибки FTS5. Разобранные запросы
+кэшируются (LRU), потому что одинаковые запросы повторяются постоянно.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.utils.text import fold_yo
+
+# Размер кэша разобранных запросов
+QUERY_CACHE_SIZE = 1024
+
+# Максимум слов в запросе (остальные отбрасываются, чтобы длинный ввод не стал дорогим запросом)
+MAX_QUERY_TERMS = 16
+
+# Префиксы столбцов в запросе -> столбцы prompts_fts
+COLUMN_ALIASES = {"tags": "tags", "tag": "tags", "text": "text"}
+
+# Слово в понимании токенизатора unicode61: буквы и цифры (подчеркивание - разделитель)
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Часть запроса: [-][столбец:]"фраза" или [-][столбец:]слово
+_CHUNK_PATTERN = re.compile(r'(-?)(?:([^\s:"]+):)?(?:"([^"]*)"?|([^\s"]+))')
+
+
+class Term(NamedTuple):
+    """Слово или фраза запроса"""
+
+    words: Tuple[str, ...]
+    phrase: bool = False  # Фраза в кавычках: точное совпадение последнего слова
+    column: Optional[str] = None
+
+    def to_match(self, expansions: Optional[Dict[str, List[str]]] = None) -> str:
+        text = " ".join(self.words)
+        expression = f'"{text}"' if self.phrase else f'"{text}"*'
+        variants = (expansions or {}).get(text, ()) if len(self.words) == 1 and not self.phrase else ()
+        if variants:
+            expression = "(" + " OR ".join([expression] + [f'"{variant}"' for variant in variants]) + ")"
+        return f"{self.column} : {expression}" if self.column else expression
+
+
+class Group(NamedTuple):
+    """Условия, которые должны выполняться вместе (части запроса между OR)"""
+
+    include: Tuple[Term, ...]
+    exclude: Tuple[Term, ...] = ()
+
+    def to_match(self, expansions: Optional[Dict[str, List[str]]] = None) -> str:
+        expression = " AND ".join(term.to_match(expansions) for term in self.include)
+        for term in self.exclude:
+            expression = f"({expression}) NOT {term.to_match()}"
+        return expression
+
+
+class ParsedQuery(NamedTuple):
+    """Разобранный запрос: группы, объединенные OR"""
+
+    groups: Tuple[Group, ...]
+
+    @property
+    def words(self) -> List[str]:
+        """Одиночные слова без столбца (кандидаты для замены при поиске с опечатками)"""
+        words = []
+        for group in self.groups:
+            for term in group.include:
+                if len(term.words) == 1 and not term.phrase and term.column is None and term.words[0] not in words:
+                    words.append(term.words[0])
+        return words
+
+    def to_match(self, expansions: Optional[Dict[str, List[str]]] = None) -> Optional[str]:
+        """
+        Выражение FTS5 MATCH
+
+        Args:
+            expansions: Замены слов (слово -> близкие термины) для поиска с опечатками
+
+        Returns:
+            Optional[str]: Выражение или None, если в запросе нет ни одного слова для поиска
+        """
+        if not self.groups:
+            return None
+        if len(self.groups) == 1:
+            return self.groups[0].to_match(expansions)
+        return " OR ".join(f"({group.to_match(expansions)})" for group in self.groups)
+
+
+def _make_term(column: Optional[str], phrase: Optional[str], word: Optional[str]) -> Optional[Term]:
+    """Слово или фраза из части запроса (None - в части нет слов)"""
+    text = phrase if phrase is not None else word
+    if column is not None and column.lower() not in COLUMN_ALIASES:
+        # Не столбец (например, адрес http://...) - двоеточие просто разделитель слов
+        text = f"{column} {text}"
+        column = None
+    elif column is not None:
+        column = COLUMN_ALIASES[column.lower()]
+    elif phrase is None and text.startswith("#"):
+        column = "tags"
+
+    words = tuple(WORD_PATTERN.findall(fold_yo(text.lower())))
+    if not words:
+        return None
+    # Слово с дефисом и т.п. токенизатор разбивает на несколько - ищем их подряд
+    return Term(words=words, phrase=phrase is not None, column=column)
+
+
+def _close_group(groups: List[Group], include: List[Term], exclude: List[Term]) -> None:
+    # Группа только из исключений в FTS5 невыразима и пропускается
+    if include:
+        groups.append(Group(tuple(include), tuple(exclude)))
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def parse_query(query: str) -> ParsedQuery:
+    """Разобрать запрос пользователя (результат кэшируется)"""
+    groups: List[Group] = []
+    include: List[Term] = []
+    exclude: List[Term] = []
+    negate_next = False
+    terms = 0
+
+    for match in _CHUNK_PATTERN.finditer(query):
+        minus, column, phrase, word = match.groups()
+        if phrase is None and column is None and not minus and word in ("OR", "AND", "NOT"):
+            if word == "OR":
+                _close_group(groups, include, exclude)
+                include, exclude = [], []
+            negate_next = word == "NOT"
+            continue
+
+        term = _make_term(column, phrase, word)
+        if term is None:
+            continue
+        if terms >= MAX_QUERY_TERMS:
+            break
+        terms += 1
+        (exclude if minus or negate_next else include).append(term)
+        negate_next = False
+
+    _close_group(groups, include, exclude)
+    return ParsedQuery(tuple(groups))
+
+
+def compile_query(query: str, expansions: Optional[Dict[str, List[str]]] = None) -> Optional[str]:
+    """Выражение FTS5 MATCH для запроса пользователя (None - искать нечего)"""
+    return parse_query(query).to_match(expansions)
@@ -0,0 +1,125 @@
+"""
+Подсказки поиска по мере ввода (typeahead)
+
+Словарь терминов берется из fts5vocab над индексом prompts_fts (термин и количество промптов с ним),
+к нему добавляются названия тегов. Словарь хранится в памяти отсортированным списком: завершения
+префикса находятся бинарным поиском, а для коротких префиксов, у которых тысячи завершений,
+лучшие варианты посчитаны заранее. Запрос подсказки не обращается к БД.
+
+Словарь перестраивается после изменения данных (см. app/search/vocabulary.py).
+"""
+
+import heapq
+from bisect import bisect_left
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.search.vocabulary import VocabularyService, load_vocabulary
+from app.utils.text import fold_yo
+
+# Максимум подсказок в ответе
+SUGGEST_LIMIT_MAX = 20
+
+# Для префиксов до этой длины лучшие завершения считаются при построении словаря
+PRECOMPUTED_PREFIX_LEN = 2
+
+# Верхняя граница диапазона строк с общим префиксом для бинарного поиска
+_PREFIX_END = "\uffff"
+
+
+class SuggestionIndex:
+    """Неизменяемый словарь подсказок: термины индекса и названия тегов с весами"""
+
+    def __init__(self, terms: List[tuple[str, int]], tags: List[tuple[str, int]]):
+        # Термины приводятся как введенный префикс (ё -> е): словарь строится по text и normalized_text,
+        # поэтому "котёнка" и "котенка" - один термин. Количество - максимум, а не сумма: промпт
+        # с "котёнка" в тексте содержит "котенка" в normalized_text и уже учтен в его количестве
+        merged: dict[str, int] = {}
+        for term, count in terms:
+            key = fold_yo(term)
+            merged[key] = max(merged.get(key, 0), count)
+        terms = sorted(merged.items())
+        self.terms = [term for term, _ in terms]
+        self.counts = [count for _, count in terms]
+        # Теги: (ключ, название, количество промптов); ключ приводится как введенный префикс
+        # и термины индекса: нижний регистр, ё -> е ("ёл" находит тег "Ёлка")
+        self.tags = sorted((fold_yo(name.lower()), name, count) for name, count in tags)
+        self.tag_keys = [key for key, _, _ in self.tags]
+
+        # Лучшие завершения коротких префиксов (индексы терминов по убыванию частоты)
+        top: dict[str, List[int]] = {}
+        for index, term in enumerate(self.terms):
+            for length in range(1, min(PRECOMPUTED_PREFIX_LEN, len(term)) + 1):
+                top.setdefault(term[:length], []).append(index)
+        self.top = {
+            prefix: heapq.nlargest(SUGGEST_LIMIT_MAX, indexes, key=self.counts.__getitem__)
+            for prefix, indexes in top.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        Завершения префикса: сначала теги, затем термины по убыванию количества промптов
+
+        Returns:
+            List[dict]: Подсказки {"text", "type" (tag/term), "count"}
+        """
+        if not prefix:
+            return []
+
+        start = bisect_left(self.tag_keys, prefix)
+        end = bisect_left(self.tag_keys, prefix + _PREFIX_END)
+        tags = heapq.nlargest(limit, self.tags[start:end], key=lambda tag: tag[2])
+        result = [{"text": name, "type": "tag", "count": count} for _, name, count in tags]
+        seen = {key for key, _, _ in tags}
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LEN:
+            indexes = self.top.get(prefix, [])
+        else:
+            start = bisect_left(self.terms, prefix)
+            end = bisect_left(self.terms, prefix + _PREFIX_END, lo=start)
+            indexes = heapq.nlargest(limit + len(seen), range(start, end), key=self.counts.__getitem__)
+
+        for index in indexes:
+            if len(result) >= limit:
+                break
+            term = self.terms[index]
+            if term not in seen:
+                result.append({"text": term, "type": "term", "count": self.counts[index]})
+        return result
+
+
+def load_suggestion_index(db: Session) -> SuggestionIndex:
+    """Построить словарь подсказок из fts5vocab и таблицы тегов"""
+    tags = db.execute(text("SELECT name, prompt_count FROM tags WHERE prompt_count > 0")).all()
+    return SuggestionIndex(load_vocabulary(db), [tuple(row) for row in tags])
+
+
+class SuggestionService(VocabularyService[SuggestionIndex]):
+    """Словарь подсказок процесса с ленивой перестройкой после изменения данных"""
+
+    def build(self, db: Session) -> SuggestionIndex:
+        return load_suggestion_index(db)
+
+    def suggest(self, db: Session, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        Подсказки для введенного текста (дополняется последнее слово, предыдущие сохраняются)
+
+        Выполняется в пуле потоков БД: при первом вызове и после изменения данных строит словарь.
+        """
+        query = " ".join(fold_yo(prefix.lower()).split())
+        if not query:
+            return []
+        head, _, last = query.rpartition(" ")
+        suggestions = self.current(db).complete(last, limit)
+        if head:
+            for suggestion in suggestions:
+                suggestion["text"] = f"{head} {suggestion['text']}"
+        return suggestions
+
+
+suggestions = SuggestionService()
@@ -0,0 +1,96 @@
+"""
+Словарь терминов полнотекстового индекса в памяти процесса
+
+Термины и количество промптов с ними читаются из fts5vocab над prompts_fts. Структуры, построенные
+по словарю (подсказки, индекс опечаток), обновляются лениво: не чаще refresh_interval секунд
+и только если данные изменились (таблица data_version). Новая структура (построенная заново
+или дополненная копия прежней) заменяет прежнюю целиком; пока один запрос ее готовит, остальные
+читают прежнюю, которая не изменяется.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Период проверки изменений данных, секунды
+VOCABULARY_REFRESH_INTERVAL = 30.0
+
+T = TypeVar("T")
+
+
+def load_vocabulary(db: Session) -> List[tuple[str, int]]:
+    """Термины индекса и количество промптов с ними (пустой список, если словарь FTS5 недоступен)"""
+    try:
+        return [tuple(row) for row in db.execute(text("SELECT term, doc FROM prompts_fts_vocab")).all()]
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Словарь FTS5 недоступен: {e}", extra={"error": str(e)})
+        return []
+
+
+def data_version(db: Session) -> Optional[int]:
+    """Версия данных (None - таблица версии недоступна, структура обновляется по времени)"""
+    try:
+        return db.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+    except Exception:
+        db.rollback()
+        return None
+
+
+class VocabularyService(ABC, Generic[T]):
+    """Структура по словарю индекса с ленивым обновлением после изменения данных"""
+
+    def __init__(self, refresh_interval: float = VOCABULARY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def build(self, db: Session) -> T:
+        """Построить новую структуру по словарю (построенную не изменять: ее читают другие запросы)"""
+
+    def refresh(self, db: Session, value: T) -> T:
+        """Новая структура после изменения данных (по умолчанию строится заново; value не изменять)"""
+        return self.build(db)
+
+    def current(self, db: Session) -> T:
+        """Актуальная структура (выполняется в пуле потоков БД: при первом вызове строит ее)"""
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._update(db, data_version(db), self.build)
+            return self._value
+
+        if time.monotonic() - self._checked_at >= self.refresh_interval and self._lock.acquire(blocking=False):
+            try:
+                version = data_version(db)
+                if version is None or version != self._version:
+                    self._update(db, version, lambda db: self.refresh(db, self._value))
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._value
+
+    def expire(self) -> None:
+        """Проверить версию данных при следующем обращении, не дожидаясь refresh_interval"""
+        self._checked_at = 0.0
+
+    def _update(self, db: Session, version: Optional[int], update: Callable[[Session], T]) -> None:
+        started = time.perf_counter()
+        self._value = update(db)
+        self._version = version
+        self._checked_at = time.monotonic()
+        logger.info(
+            f"{type(self).__name__}: словарь обновлен",
+            extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+        )
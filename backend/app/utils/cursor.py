@@ -0,0 +1,41 @@
+"""
+Утилиты для курсорной (keyset) пагинации
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """
+    Закодировать позицию в непрозрачный курсор
+
+    Args:
+        data: Значения ключа сортировки последнего элемента страницы
+
+    Returns:
+        str: base64url строка без выравнивания
+    """
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Раскодировать курсор
+
+    Raises:
+        ValueError: Если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError("Неверный курсор") from e
+
+    if not isinstance(data, dict):
+        raise ValueError("Неверный курсор")
+
+    return data
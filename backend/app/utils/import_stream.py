@@ -0,0 +1,299 @@
+"""
+Потоковое чтение файлов импорта (NDJSON и экспорт Telegram Desktop)
+
+Данные читаются из асинхронного потока байтов по частям, без загрузки всего файла в память.
+"""
+
+import codecs
+import json
+import re
+from typing import AsyncIterator, List, Optional
+
+# Начало массива сообщений в result.json экспорта Telegram Desktop
+_MESSAGES_KEY = re.compile(r'"messages"\s*:\s*\[')
+# id канала в заголовке экспорта (идет до массива messages)
+_CHAT_ID_KEY = re.compile(r'^\s*\{.*?"id"\s*:\s*(-?\d+)', re.DOTALL)
+_WHITESPACE = " \t\r\n"
+# Символы, меняющие вложенность JSON вне строк, и символы, значимые внутри строки
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'[\\"]')
+
+# Максимальный размер строки NDJSON и сообщения экспорта Telegram, байт
+MAX_ITEM_SIZE = 16 * 1024 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_size: int = MAX_ITEM_SIZE) -> AsyncIterator[Optional[bytes]]:
+    """
+    Разбить поток байтов на строки (NDJSON)
+
+    Пустые строки пропускаются. Перевод строки ищется только в новой части потока, а начало
+    незавершенной строки хранится частями и склеивается один раз, когда строка завершена.
+    Строка длиннее max_size не накапливается в памяти: ее остаток пропускается до конца строки,
+    а вместо строки возвращается None (ошибка этой строки).
+    """
+    pending: List[bytes] = []
+    pending_size = 0
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            piece = chunk[start:end]
+            start = end + 1
+            if skipping or pending_size + len(piece) > max_size:
+                yield None
+            else:
+                line = b"".join((*pending, piece)) if pending else piece
+                if line.strip():
+                    yield line
+            pending = []
+            pending_size = 0
+            skipping = False
+
+        if start < len(chunk) and not skipping:
+            pending.append(chunk[start:])
+            pending_size += len(chunk) - start
+            if pending_size > max_size:
+                pending = []
+                pending_size = 0
+                skipping = True
+
+    if skipping:
+        yield None
+    elif pending:
+        line = b"".join(pending)
+        if line.strip():
+            yield line
+
+
+def flatten_telegram_text(text) -> str:
+    """
+    Текст сообщения из экспорта Telegram Desktop
+
+    Поле text - строка или список строк и объектов {"type": ..., "text": ...} для форматированных фрагментов.
+    """
+    if isinstance(text, str):
+        return text
+    if isinstance(text, list):
+        return "".join(part if isinstance(part, str) else str(part.get("text", "")) for part in text)
+    return ""
+
+
+class _ArrayScanner:
+    """
+    Границы элементов массива JSON в тексте, поступающем частями
+
+    Отслеживает вложенность скобок и строки (с экранированием) между частями, просматривая
+    каждую часть один раз: поиск переходит сразу к следующему значимому символу. Текст после
+    последнего завершенного элемента хранится частями (pending) до завершения следующего.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.closed = False
+        self.pending: List[str] = []
+        self.pending_size = 0
+
+    def feed(self, text: str) -> Optional[str]:
+        """
+        Добавить следующую часть текста массива
+
+        Returns:
+            Optional[str]: Текст до конца последнего завершенного в этой части элемента или конца
+                массива (вместе с накопленным началом) или None, если ни один элемент не завершился
+        """
+        end = self._scan(text)
+        if end < 0:
+            self._keep(text)
+            return None
+        complete = "".join((*self.pending, text[:end]))
+        self.pending = []
+        self.pending_size = 0
+        self._keep(text[end:])
+        return complete
+
+    def unread(self, text: str) -> None:
+        """Вернуть недекодированный остаток в начало незавершенного текста"""
+        if text:
+            self.pending.insert(0, text)
+            self.pending_size += len(text)
+
+    def _keep(self, text: str) -> None:
+        if text:
+            self.pending.append(text)
+            self.pending_size += len(text)
+
+    def _scan(self, text: str) -> int:
+        """Смещение после последнего завершенного элемента или конца массива в тексте (-1 - нет)"""
+        end = -1
+        position = 0
+        if self.escaped and text:
+            # Экранирующая \ была последним символом предыдущей части
+            self.escaped = False
+            position = 1
+        while not self.closed:
+            match = (_STRING_SPECIAL if self.in_string else _STRUCTURAL).search(text, position)
+            if match is None:
+                break
+            position = match.end()
+            if self.in_string:
+                position, completed = self._string_char(match.group(), text, position)
+            else:
+                completed = self._structural_char(match.group())
+            if completed:
+                end = position
+        return end
+
+    def _string_char(self, char: str, text: str, position: int) -> tuple[int, bool]:
+        """Символ \\ или " внутри строки: (позиция продолжения, завершился элемент-строка)"""
+        if char == "\\":
+            # Экранированный символ пропускается (может прийти в следующей части)
+            self.escaped = position == len(text)
+            return position + 1, False
+        self.in_string = False
+        return position, self.depth == 0
+
+    def _structural_char(self, char: str) -> bool:
+        """Скобка или кавычка вне строки: True - завершился элемент верхнего уровня или массив"""
+        if char == '"':
+            self.in_string = True
+        elif char in "{[":
+            self.depth += 1
+        elif self.depth > 0:
+            self.depth -= 1
+            return self.depth == 0
+        else:
+            # Закрывающая скобка вне элементов: "]" - конец массива (лишнюю "}" отвергнет декодер)
+            self.closed = char == "]"
+            return True
+        return False
+
+
+class TelegramExportReader:
+    """
+    Потоковый разбор result.json экспорта Telegram Desktop
+
+    Ищет массив "messages" и декодирует его элементы по одному по мере поступления данных.
+    Начало незавершенного элемента хранится частями и декодируется один раз, когда в новой
+    части завершился элемент верхнего уровня (_ArrayScanner): большое сообщение, пришедшее
+    многими частями, не разбирается заново после каждой части.
+    id канала берется из заголовка экспорта, если он идет до массива сообщений.
+    """
+
+    def __init__(self, max_buffer: int = MAX_ITEM_SIZE):
+        self.channel_id: Optional[int] = None
+        self._max_buffer = max_buffer
+        self._decoder = json.JSONDecoder()
+        # Элементов массива messages декодировано (номер поврежденного элемента в ошибке)
+        self._decoded = 0
+        self._corrupt: Optional[str] = None
+
+    async def messages(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+        """
+        Итератор по сообщениям экспорта
+
+        Raises:
+            ValueError: Если файл не является экспортом Telegram или поврежден (сразу после
+                поврежденного сообщения, с его номером)
+        """
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        header: Optional[str] = ""
+        array = _ArrayScanner()
+
+        async for chunk in chunks:
+            text = text_decoder.decode(chunk)
+            if header is not None:
+                header += text
+                text = self._skip_header(header)
+                if text is None:
+                    continue
+                header = None
+
+            items, finished = self._feed_array(array, text)
+            for item in items:
+                yield item
+            if finished:
+                return
+            if array.pending_size > self._max_buffer:
+                raise ValueError("Слишком большое сообщение в экспорте Telegram")
+
+        if header is None:
+            items, finished = self._feed_array(array, text_decoder.decode(b"", final=True))
+            for item in items:
+                yield item
+            if finished:
+                return
+        raise ValueError("Экспорт Telegram оборван или поврежден")
+
+    def _feed_array(self, array: _ArrayScanner, text: str) -> tuple[list, bool]:
+        """
+        Передать часть текста массива и декодировать завершенные в ней элементы
+
+        Сообщения перед поврежденным возвращаются, ошибка - при следующем вызове.
+
+        Returns:
+            tuple: (элементы, достигнут конец массива)
+
+        Raises:
+            ValueError: Если найдено поврежденное сообщение
+        """
+        if self._corrupt:
+            raise ValueError(self._corrupt)
+        complete = array.feed(text)
+        if complete is None:
+            return [], False
+        rest, items, finished = self._decode_items(complete)
+        if self._corrupt and not items:
+            raise ValueError(self._corrupt)
+        array.unread(rest)
+        return items, finished
+
+    def _skip_header(self, buffer: str) -> Optional[str]:
+        """
+        Пропустить заголовок экспорта до начала массива messages
+
+        Returns:
+            Optional[str]: Буфер после "messages": [ или None, если массив еще не начался
+        """
+        match = _MESSAGES_KEY.search(buffer)
+        if not match:
+            if len(buffer) > self._max_buffer:
+                raise ValueError("Не найден массив messages в экспорте Telegram")
+            return None
+        header = _CHAT_ID_KEY.match(buffer[: match.start()])
+        if header:
+            self.channel_id = int(header.group(1))
+        return buffer[match.end() :]
+
+    def _decode_items(self, buffer: str) -> tuple[str, list, bool]:
+        """
+        Декодировать все полные элементы массива в начале буфера
+
+        Ошибка декодирования в конце буфера означает, что элемент получен не полностью; ошибка
+        внутри буфера (элемент уже закрыт) - что он поврежден: декодирование останавливается,
+        ошибка сохраняется в _corrupt.
+
+        Returns:
+            tuple: (остаток буфера, элементы, достигнут конец массива)
+        """
+        items = []
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position] in _WHITESPACE or buffer[position] == ","):
+                position += 1
+            if position >= len(buffer):
+                return "", items, False
+            if buffer[position] == "]":
+                return buffer[position + 1 :], items, True
+            try:
+                item, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if e.pos >= len(buffer):
+                    # Элемент еще не получен полностью - ждем следующую часть потока
+                    return buffer[position:], items, False
+                self._corrupt = f"Поврежденное сообщение {self._decoded + 1} в экспорте Telegram: {e.msg}"
+                return buffer[position:], items, False
+            self._decoded += 1
+            if isinstance(item, dict):
+                items.append(item)
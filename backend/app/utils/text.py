@@ -3,12 +3,28 @@
 """
 
 import re
+from typing import Iterable, List
+
+# Шаблоны нормализации (компилируются один раз, используются и при массовой обработке)
+_MARKDOWN_PATTERNS = [
+    (re.compile(r"\[([^\]]+)\]\([^\)]+\)"), r"\1"),  # Ссылки [текст](url)
+    (re.compile(r"\*\*([^\*]+)\*\*"), r"\1"),  # Жирный **текст**
+    (re.compile(r"\*([^\*]+)\*"), r"\1"),  # Курсив *текст*
+    (re.compile(r"`([^`]+)`"), r"\1"),  # Код `текст`
+    (re.compile(r"#+\s*"), ""),  # Заголовки
+]
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def fold_yo(text: str) -> str:
+    """Замена ё на е (в текстах и запросах пишут по-разному)"""
+    return text.replace("ё", "е").replace("Ё", "Е")
 
 
 def normalize_text(text: str) -> str:
     """
     Нормализация текста для поиска
-    - Приведение к нижнему регистру
+    - Приведение к нижнему регистру, замена ё на е
     - Удаление лишних пробелов
     - Удаление markdown разметки (базовое)
     """
@@ -16,19 +32,21 @@ def normalize_text(text: str) -> str:
         return ""
 
     # Удаление markdown разметки (базовое)
-    text = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", text)  # Ссылки [текст](url)
-    text = re.sub(r"\*\*([^\*]+)\*\*", r"\1", text)  # Жирный **текст**
-    text = re.sub(r"\*([^\*]+)\*", r"\1", text)  # Курсив *текст*
-    text = re.sub(r"`([^`]+)`", r"\1", text)  # Код `текст`
-    text = re.sub(r"#+\s*", "", text)  # Заголовки
+    for pattern, replacement in _MARKDOWN_PATTERNS:
+        text = pattern.sub(replacement, text)
 
-    # Приведение к нижнему регистру и удаление лишних пробелов
-    text = text.lower().strip()
-    text = re.sub(r"\s+", " ", text)
+    # Приведение к нижнему регистру (ё = е) и удаление лишних пробелов
+    text = fold_yo(text.lower()).strip()
+    text = _WHITESPACE_PATTERN.sub(" ", text)
 
     return text
 
 
+def normalize_texts(texts: Iterable[str]) -> List[str]:
+    """Нормализация пачки текстов (для массового импорта)"""
+    return list(map(normalize_text, texts))
+
+
 def generate_slug(name: str) -> str:
     """
     Генерация slug из названия тега
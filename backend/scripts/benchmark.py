@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+"""
+Скрипт для нагрузочного тестирования PromptVault API
+
+Запускается против работающего сервера, например:
+    python scripts/benchmark.py search-concurrency --url http://localhost:8000 --concurrency 200
+
+Для сравнения "до/после" запустите скрипт против обеих версий сервера с одинаковыми параметрами.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+# Добавление пути к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import aiohttp
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def print_latency_report(title: str, latencies: List[float], wall_time: float, errors: int = 0) -> None:
+    """Вывести отчет о задержках в миллисекундах"""
+    print(f"\n{title}")
+    print(f"  запросов: {len(latencies)}, ошибок: {errors}, общее время: {wall_time:.2f} с")
+    if not latencies:
+        return
+    print(f"  rps: {len(latencies) / wall_time:.1f}")
+    print(f"  mean: {statistics.mean(latencies) * 1000:.1f} мс")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {percentile(latencies, pct) * 1000:.1f} мс")
+    print(f"  max: {max(latencies) * 1000:.1f} мс")
+
+
+async def bench_search_concurrency(args: argparse.Namespace) -> None:
+    """Параллельные запросы к /api/v1/search: проверка, что event loop не блокируется БД"""
+    url = f"{args.url.rstrip('/')}/api/v1/search/"
+    queries = args.queries.split(",")
+    latencies: List[float] = []
+    errors = 0
+
+    async def one_request(session: aiohttp.ClientSession, i: int) -> None:
+        nonlocal errors
+        params = {"q": queries[i % len(queries)], "limit": args.limit}
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+                    return
+        except aiohttp.ClientError:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Прогрев
+        await one_request(session, 0)
+        latencies.clear()
+
+        started = time.perf_counter()
+        for start in range(0, args.requests, args.concurrency):
+            batch = range(start, min(start + args.concurrency, args.requests))
+            await asyncio.gather(*(one_request(session, i) for i in batch))
+        wall_time = time.perf_counter() - started
+
+    print_latency_report(
+        f"GET /api/v1/search, параллельно {args.concurrency}, всего {args.requests}", latencies, wall_time, errors
+    )
+
+
+async def bench_bot_api(args: argparse.Namespace) -> None:
+    """
+    Задержка запросов бота к API: новая сессия на каждое сообщение против общей сессии с пулом
+
+    Первый вариант повторяет старое поведение команд бота (aiohttp.ClientSession() на запрос),
+    второй - запросы через APIClient по одной сессии из create_session().
+    """
+    from app.bot.api_client import APIClient, create_session
+
+    client = APIClient(base_url=args.url)
+    queries = args.queries.split(",")
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(title: str, request) -> None:
+        latencies: List[float] = []
+        errors = 0
+
+        async def one_request(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                if await request(queries[i % len(queries)]) is None:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        # Прогрев
+        await request(queries[0])
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+        print_latency_report(title, latencies, time.perf_counter() - started, errors)
+
+    async def new_session_request(query: str):
+        async with aiohttp.ClientSession() as session:
+            return await client.search_prompts(session, query, limit=args.limit)
+
+    await run(f"Новая сессия на запрос, параллельно {args.concurrency}", new_session_request)
+
+    async with create_session() as shared_session:
+
+        async def shared_session_request(query: str):
+            return await client.search_prompts(shared_session, query, limit=args.limit)
+
+        await run(f"Общая сессия с пулом, параллельно {args.concurrency}", shared_session_request)
+
+
+def create_synthetic_db(prompts: int, path: str = "") -> str:
+    """
+    Создать (или переиспользовать) БД с синтетическим корпусом промптов и FTS5 индексом
+
+    Должна вызываться до импорта модулей app: путь к БД задается через DATABASE_URL.
+
+    Returns:
+        str: Путь к файлу БД
+    """
+    import random
+    import sqlite3
+    import tempfile
+
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="promptvault-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["ENVIRONMENT"] = "benchmark"
+
+    from app.database import Base, SessionLocal, engine
+    from app.search.fts5 import init_fts5_table
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    init_fts5_table(db)
+    db.close()
+
+    connection = sqlite3.connect(path)
+    existing = connection.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+    if existing >= prompts:
+        connection.close()
+        return path
+
+    insert_sql = (
+        "INSERT INTO prompts (tg_message_id, tg_channel_id, text, normalized_text, is_pinned) VALUES (?, ?, ?, ?, ?)"
+    )
+    words = SYNTHETIC_WORDS
+    rng = random.Random(42)
+    started = time.perf_counter()
+    batch = []
+    for i in range(existing, prompts):
+        # Словоформы (основа + окончание) дают словарь индекса, близкий к реальному тексту
+        body = " ".join(rng.choice(words) + rng.choice(SYNTHETIC_ENDINGS) for _ in range(rng.randint(15, 60)))
+        batch.append((i + 1, 1, body, body.lower(), int(i % 50 == 0)))
+        if len(batch) == 10000:
+            connection.executemany(insert_sql, batch)
+            connection.commit()
+            batch.clear()
+    if batch:
+        connection.executemany(insert_sql, batch)
+        connection.commit()
+    connection.close()
+    print(f"Синтетический корпус: {prompts} промптов за {time.perf_counter() - started:.1f} с ({path})")
+    return path
+
+
+SYNTHETIC_WORDS = (
+    "портрет пейзаж кот собака город ночь свет тень стиль акварель масло фото реализм аниме неон туман "
+    "горы море лес закат рассвет девушка робот космос замок дракон улица дождь снег кофе книга "
+    "portrait landscape cat dog city night light shadow style watercolor oil photo realism anime neon fog "
+    "mountains sea forest sunset sunrise girl robot space castle dragon street rain snow coffee book "
+    "cinematic detailed ultra sharp soft vibrant moody minimal vintage futuristic"
+).split()
+
+SYNTHETIC_ENDINGS = ("",) * 10 + tuple(
+    "а у ом ы ов ами ах е ей ный ная ное ные ского ская ик ища ка ки ник ница s ed ing er ly".split()
+)
+
+
+def bench_fts_search(args: argparse.Namespace) -> None:
+    """Задержка search_fts5 на синтетическом корпусе"""
+    create_synthetic_db(args.prompts, args.db)
+
+    from app.database import SessionLocal
+    from app.search.fts5 import search_fts5
+
+    db = SessionLocal()
+    for query in args.queries.split(","):
+        latencies = []
+        total = None
+        started = time.perf_counter()
+        for i in range(args.runs):
+            db.expire_all()
+            t0 = time.perf_counter()
+            _, total = search_fts5(db, query=query, skip=(i % 5) * args.limit, limit=args.limit)
+            latencies.append(time.perf_counter() - t0)
+        print_latency_report(
+            f"search_fts5('{query}'), найдено {total}, limit {args.limit}", latencies, time.perf_counter() - started
+        )
+    db.close()
+
+
+def bench_fts_maintenance(args: argparse.Namespace) -> None:
+    """
+    Фрагментация FTS5 индекса и ее устранение: поиск до и после слияния порциями и optimize
+
+    Индекс фрагментируется записями отдельными транзакциями при отключенном automerge (как во время
+    прерванного массового импорта), затем сливается порциями fts5_merge_step (фоновая задача API)
+    и полностью командой optimize.
+    """
+    import random
+
+    create_synthetic_db(args.prompts, args.db)
+
+    from sqlalchemy import text
+
+    from app.database import SessionLocal
+    from app.search.fts5 import FTS5_AUTOMERGE, FTS5_INDEXES, search_fts5
+    from app.search.maintenance import fts5_merge_step, fts5_stats, run_fts5_command
+
+    db = SessionLocal()
+    queries = args.queries.split(",")
+
+    def report(title: str) -> None:
+        segments = ", ".join(f"{index['table']} {index['segments']}" for index in fts5_stats(db))
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            for query in queries:
+                t0 = time.perf_counter()
+                search_fts5(db, query=query, limit=50)
+                latencies.append(time.perf_counter() - t0)
+        print_latency_report(f"{title} (сегментов: {segments})", latencies, time.perf_counter() - started)
+
+    rng = random.Random(7)
+    ids = db.execute(text("SELECT id FROM prompts WHERE deleted_at IS NULL")).scalars().all()
+    for table in FTS5_INDEXES:
+        db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('automerge', 0)"))
+    started = time.perf_counter()
+    for prompt_id in rng.sample(ids, min(args.writes, len(ids))):
+        words = " ".join(rng.choice(SYNTHETIC_WORDS) for _ in range(20))
+        db.execute(
+            text("UPDATE prompts SET text = :text, normalized_text = :text WHERE id = :id"),
+            {"text": words, "id": prompt_id},
+        )
+        db.commit()
+    for table in FTS5_INDEXES:
+        db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES('automerge', {FTS5_AUTOMERGE})"))
+    db.commit()
+    print(f"Записей отдельными транзакциями: {args.writes} за {time.perf_counter() - started:.1f} с")
+    report("Фрагментированный индекс")
+
+    slices = []
+    started = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        worked = fts5_merge_step(db, args.pages)
+        slices.append(time.perf_counter() - t0)
+        if not worked:
+            break
+    print(
+        f"\nСлияние порциями по {args.pages} страниц: {len(slices)} порций за {time.perf_counter() - started:.1f} с, "
+        f"p95 порции {percentile(slices, 95) * 1000:.1f} мс, max {max(slices) * 1000:.1f} мс"
+    )
+    report("После слияния порциями")
+
+    result = run_fts5_command(db, "optimize")
+    print(f"\noptimize: {result['duration_ms'] / 1000:.1f} с")
+    report("После optimize")
+    db.close()
+
+
+# Варианты индекса для сравнения: (название, tokenize, prefix)
+FTS_INDEX_VARIANTS = (
+    ("unicode61, без prefix (прежняя схема)", "unicode61", ""),
+    ("unicode61 remove_diacritics 2, prefix", "unicode61 remove_diacritics 2", "2 3 4"),
+    ("porter unicode61 remove_diacritics 2, prefix", "porter unicode61 remove_diacritics 2", "2 3 4"),
+    ("trigram (подстроки, префикс от 3 символов)", "trigram", ""),
+)
+
+
+def bench_fts_index(args: argparse.Namespace) -> None:
+    """
+    Размер индекса и задержка префиксных запросов для вариантов токенизатора и prefix=
+
+    Измеряется только поиск совпадений (COUNT), без ранжирования - часть запроса, которую меняет prefix=.
+    """
+    path = create_synthetic_db(args.prompts, args.db)
+
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    prefixes = [word[:length] for word in args.words.split(",") for length in range(1, len(word) + 1)]
+    for i, (title, tokenize, prefix) in enumerate(FTS_INDEX_VARIANTS):
+        table = f"bench_fts_{i}"
+        options = f", prefix='{prefix}'" if prefix else ""
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5(text, normalized_text, tags, "
+            f"content='prompts_fts_content', content_rowid='id', tokenize='{tokenize}'{options})"
+        )
+        started = time.perf_counter()
+        connection.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+        connection.commit()
+        build_time = time.perf_counter() - started
+        size = connection.execute(f"SELECT SUM(LENGTH(block)) FROM {table}_data").fetchone()[0] or 0
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            for query in prefixes:
+                if tokenize == "trigram":
+                    if len(query) < 3:
+                        continue
+                    expression = f'"{query}"'
+                else:
+                    expression = f'"{query}"*'
+                t0 = time.perf_counter()
+                connection.execute(f"SELECT COUNT(*) FROM {table} WHERE {table} MATCH ?", (expression,)).fetchone()
+                latencies.append(time.perf_counter() - t0)
+        print(f"\nИндекс {title}: {size / 1024 / 1024:.1f} МБ, построен за {build_time:.1f} с")
+        print_latency_report(f"Префиксные запросы: {title}", latencies, time.perf_counter() - started)
+        connection.execute(f"DROP TABLE {table}")
+        connection.commit()
+    connection.close()
+
+
+def bench_fallback_search(args: argparse.Namespace) -> None:
+    """Резервный поиск подстроки: LIKE '%...%' против триграммного индекса prompts_trigram"""
+    create_synthetic_db(args.prompts, args.db)
+
+    from unittest import mock
+
+    from app.database import SessionLocal
+    from app.search import fts5
+
+    db = SessionLocal()
+    for title, trigram in (("LIKE", False), ("триграммный индекс", True)):
+        with mock.patch.object(fts5, "_trigram_available", return_value=trigram):
+            for query in args.queries.split(","):
+                latencies = []
+                total = None
+                started = time.perf_counter()
+                for i in range(args.runs):
+                    db.expire_all()
+                    t0 = time.perf_counter()
+                    _, total = fts5.search_fallback(db, query=query, skip=(i % 5) * args.limit, limit=args.limit)
+                    latencies.append(time.perf_counter() - t0)
+                print_latency_report(f"{title}: '{query}', найдено {total}", latencies, time.perf_counter() - started)
+    db.close()
+
+
+def bench_fuzzy(args: argparse.Namespace) -> None:
+    """Поиск с опечатками: построение индекса удалений, подбор замен и search_fts5(fuzzy=True)"""
+    create_synthetic_db(args.prompts, args.db)
+
+    from app.database import SessionLocal
+    from app.search.fts5 import search_fts5
+    from app.search.fuzzy import FuzzyService
+    from app.search.query import compile_query, parse_query
+
+    db = SessionLocal()
+    service = FuzzyService()
+    started = time.perf_counter()
+    index = service.current(db)
+    print(
+        f"Индекс опечаток: {len(index)} терминов, {len(index.deletes)} ключей удалений "
+        f"за {(time.perf_counter() - started) * 1000:.0f} мс"
+    )
+    # Обновление после изменения данных: новый индекс разделяет таблицу удалений с прежним
+    started = time.perf_counter()
+    service.refresh(db, index)
+    print(f"Обновление индекса после изменения данных: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    queries = args.queries.split(",")
+    for title, run_one in (
+        ("подбор замен", lambda query: service.expansions(db, parse_query(query).words)),
+        ("search_fts5(fuzzy=True)", lambda query: search_fts5(db, query=query, limit=args.limit, fuzzy=True)),
+    ):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            for query in queries:
+                t0 = time.perf_counter()
+                run_one(query)
+                latencies.append(time.perf_counter() - t0)
+        print_latency_report(f"{title}, {len(queries)} запросов", latencies, time.perf_counter() - started)
+    for query in queries:
+        _, total = search_fts5(db, query=query, limit=args.limit, fuzzy=True)
+        match = compile_query(query, service.expansions(db, parse_query(query).words))
+        print(f"  '{query}' -> {match}, найдено {total}")
+    db.close()
+
+
+def bench_suggest(args: argparse.Namespace) -> None:
+    """Подсказки из словаря в памяти против полного search_fts5 на каждый префикс"""
+    create_synthetic_db(args.prompts, args.db)
+
+    from app.database import SessionLocal
+    from app.search.fts5 import search_fts5
+    from app.search.suggest import load_suggestion_index
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    index = load_suggestion_index(db)
+    print(f"Словарь подсказок: {len(index)} терминов за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    prefixes = [word[:length] for word in args.words.split(",") for length in range(1, len(word) + 1)]
+    for title, run_one in (
+        ("suggest (словарь в памяти)", lambda prefix: index.complete(prefix, args.limit)),
+        ("search_fts5 (полный поиск)", lambda prefix: search_fts5(db, query=prefix, limit=args.limit)),
+    ):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            for prefix in prefixes:
+                t0 = time.perf_counter()
+                run_one(prefix)
+                latencies.append(time.perf_counter() - t0)
+        print_latency_report(f"{title}, {len(prefixes)} префиксов", latencies, time.perf_counter() - started)
+    db.close()
+
+
+def bench_suggest_check(args: argparse.Namespace) -> None:
+    """
+    Проверка подсказок по тегам: префикс с ё и без находит тег с ё, термин индекса не дублирует тег
+
+    Заполняет временную БД тегами и вызывает suggestions.suggest; при ошибке завершается с кодом 1.
+    """
+    import tempfile
+
+    tmp_dir = tempfile.mkdtemp(prefix="promptvault-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ["ENVIRONMENT"] = "benchmark"
+
+    from app.database import Base, SessionLocal, engine
+    from app.models.prompt import Prompt
+    from app.models.tag import Tag
+    from app.search.fts5 import init_fts5_table
+    from app.search.suggest import SuggestionService
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tags = [Tag(name="Ёлка", slug="yolka", prompt_count=3), Tag(name="Елена", slug="elena", prompt_count=1)]
+    db.add_all(tags)
+    db.add(
+        Prompt(tg_message_id=1, tg_channel_id=1, text="Ёлка в снегу", normalized_text="елка в снегу", tags=[tags[0]])
+    )
+    db.commit()
+    try:
+        init_fts5_table(db)
+    except Exception as e:
+        db.rollback()
+        print(f"FTS5 индекс не построен, проверяются только теги: {e}")
+
+    service = SuggestionService()
+    failures = []
+    for prefix in ("ёл", "Ёл", "ел", "ЕЛ", "ёлк"):
+        items = service.suggest(db, prefix)
+        texts = [(item["type"], item["text"]) for item in items]
+        print(f"  {prefix!r} -> {texts}")
+        if ("tag", "Ёлка") not in texts:
+            failures.append(f"{prefix!r}: нет тега Ёлка")
+        if ("term", "елка") in texts:
+            failures.append(f"{prefix!r}: термин елка дублирует тег Ёлка")
+    db.close()
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Подсказки тегов с ё найдены")
+
+
+def bench_serialization(args: argparse.Namespace) -> None:
+    """
+    Сериализация страниц списка и поиска: ORM + pydantic против быстрого пути (FAST_JSON_RESPONSES)
+
+    Заполняет временную БД длинными промптами с тегами и сравнивает задержку полного запроса
+    через приложение в обоих режимах, а также совпадение ответов.
+    """
+    import json
+    import tempfile
+
+    tmp_dir = tempfile.mkdtemp(prefix="promptvault-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ["ENVIRONMENT"] = "benchmark"
+    # Измеряется сериализация, а не кэш результатов и ответы 304
+    os.environ["CACHE_BACKEND"] = "none"
+    os.environ["HTTP_CACHE_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+
+    from app.core.config import settings
+    from app.core.responses import JSON_ENCODER
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models.prompt import Prompt
+    from app.models.prompt_tag import PromptTag
+    from app.models.tag import Tag
+    from app.search.fts5 import init_fts5_table
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(insert(Tag), [{"name": f"тег {i}", "slug": f"tag-{i}"} for i in range(5)])
+    words = SYNTHETIC_WORDS
+    rows = []
+    for i in range(args.prompts):
+        body = " ".join(words[(i + j) % len(words)] for j in range(args.text_length // 6))[: args.text_length]
+        rows.append(
+            {"tg_message_id": i + 1, "tg_channel_id": 1, "text": body, "normalized_text": body, "is_pinned": False}
+        )
+    db.execute(insert(Prompt), rows)
+    db.execute(
+        insert(PromptTag), [{"prompt_id": i + 1, "tag_id": tag} for i in range(args.prompts) for tag in (1, 2 + i % 4)]
+    )
+    db.commit()
+    # Индекс FTS5 строится одним проходом ('rebuild') после вставки данных
+    init_fts5_table(db)
+    db.close()
+
+    client = TestClient(app)
+    paths = {
+        "prompts": ("/api/v1/prompts/", {"limit": args.limit}),
+        "search": ("/api/v1/search/", {"q": "кот", "limit": args.limit}),
+    }
+    print(
+        f"\n{args.prompts} промптов по {args.text_length} символов, страница {args.limit}, "
+        f"кодировщик JSON: {JSON_ENCODER}"
+    )
+
+    for name, (url, params) in paths.items():
+        bodies = {}
+        for fast in (False, True):
+            settings.fast_json_responses = fast
+            for _ in range(3):
+                client.get(url, params=params)
+            latencies = []
+            started = time.perf_counter()
+            for i in range(args.runs):
+                t0 = time.perf_counter()
+                response = client.get(url, params={**params, "page": 1 + i % 3})
+                latencies.append(time.perf_counter() - t0)
+            bodies[fast] = client.get(url, params=params).content
+            mode = "быстрый путь" if fast else "ORM + pydantic"
+            print_latency_report(
+                f"{name} ({mode}), {len(bodies[fast]) // 1024} КиБ, статус {response.status_code}",
+                latencies,
+                time.perf_counter() - started,
+            )
+        same = json.loads(bodies[False]) == json.loads(bodies[True])
+        print(f"  ответы совпадают: {'да' if same else 'НЕТ'}")
+
+
+def bench_etag_invalidation(args: argparse.Namespace) -> None:
+    """
+    Проверка смены ETag после записи вне API: пересчет счетчиков тегов (maintenance.py tag-counts)
+
+    Счетчик тега портится прямой записью в файл БД (как рассинхронизация), затем пересчитывается
+    отдельным процессом. Запрос /tags/cloud с прежним ETag должен вернуть 200 с исправленным
+    счетчиком, а не 304 или ответ из кэша процесса; иначе скрипт завершается с кодом 1.
+    """
+    import sqlite3
+    import subprocess
+    import tempfile
+
+    tmp_dir = tempfile.mkdtemp(prefix="promptvault-bench-")
+    db_path = f"{tmp_dir}/bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["ENVIRONMENT"] = "benchmark"
+
+    from fastapi.testclient import TestClient
+
+    from app.core.http_cache import init_data_version
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models.prompt import Prompt
+    from app.models.tag import Tag
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    init_data_version(db)
+    tag = Tag(name="тег", slug="tag", prompt_count=args.prompts)
+    db.add(tag)
+    for i in range(args.prompts):
+        db.add(
+            Prompt(tg_message_id=i + 1, tg_channel_id=1, text=f"Промпт {i}", normalized_text=f"промпт {i}", tags=[tag])
+        )
+    db.commit()
+    db.close()
+
+    client = TestClient(app)
+    url = "/api/v1/tags/cloud"
+
+    def cloud_count(response) -> int:
+        return response.json()[0]["prompt_count"] if response.status_code == 200 else -1
+
+    first = client.get(url)
+    etag = first.headers.get("etag")
+    print(f"ETag до рассинхронизации: {etag}, prompt_count: {cloud_count(first)}")
+
+    # Рассинхронизация счетчика в обход приложения: версия данных не меняется, ответ остается прежним
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE tags SET prompt_count = 0")
+
+    maintenance = os.path.join(os.path.dirname(__file__), "maintenance.py")
+    subprocess.run([sys.executable, maintenance, "tag-counts"], check=True, env=os.environ.copy())
+
+    second = client.get(url, headers={"If-None-Match": etag} if etag else {})
+    print(
+        f"После tag-counts: статус {second.status_code}, ETag: {second.headers.get('etag')}, "
+        f"prompt_count: {cloud_count(second)}"
+    )
+    if etag is None or second.status_code != 200 or second.headers.get("etag") == etag:
+        print("❌ ETag не изменился после пересчета счетчиков")
+        sys.exit(1)
+    if cloud_count(second) != args.prompts:
+        print(f"❌ Ответ из кэша: prompt_count {cloud_count(second)}, ожидалось {args.prompts}")
+        sys.exit(1)
+    print("✅ ETag и ответ обновлены после пересчета счетчиков")
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование PromptVault API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = subparsers.add_parser("search-concurrency", help="Параллельные запросы к /api/v1/search")
+    search_parser.add_argument("--url", default="http://localhost:8000", help="Базовый URL API")
+    search_parser.add_argument("--concurrency", type=int, default=200, help="Количество параллельных запросов")
+    search_parser.add_argument("--requests", type=int, default=1000, help="Общее количество запросов")
+    search_parser.add_argument("--limit", type=int, default=50, help="Размер страницы результатов")
+    search_parser.add_argument("--queries", default="промпт,image,стиль,portrait", help="Запросы через запятую")
+    search_parser.set_defaults(handler=bench_search_concurrency)
+
+    bot_parser = subparsers.add_parser("bot-api", help="Задержка запросов бота к API (новая/общая сессия)")
+    bot_parser.add_argument("--url", default="http://localhost:8000", help="Базовый URL API")
+    bot_parser.add_argument("--concurrency", type=int, default=1, help="Одновременных сообщений пользователей")
+    bot_parser.add_argument("--requests", type=int, default=500, help="Общее количество запросов")
+    bot_parser.add_argument("--limit", type=int, default=5, help="Размер страницы результатов")
+    bot_parser.add_argument("--queries", default="промпт,image,стиль,portrait", help="Запросы через запятую")
+    bot_parser.set_defaults(handler=bench_bot_api)
+
+    fts_parser = subparsers.add_parser("fts-search", help="Задержка FTS5 поиска на синтетическом корпусе")
+    fts_parser.add_argument("--prompts", type=int, default=200000, help="Размер синтетического корпуса")
+    fts_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    fts_parser.add_argument("--runs", type=int, default=20, help="Количество повторов на запрос")
+    fts_parser.add_argument("--limit", type=int, default=50, help="Размер страницы результатов")
+    fts_parser.add_argument("--queries", default="кот,portrait,неон город,sunset", help="Запросы через запятую")
+    fts_parser.set_defaults(handler=bench_fts_search)
+
+    fts_maintenance_parser = subparsers.add_parser(
+        "fts-maintenance", help="Поиск во фрагментированном FTS5 индексе до и после слияния сегментов"
+    )
+    fts_maintenance_parser.add_argument("--prompts", type=int, default=200000, help="Размер синтетического корпуса")
+    fts_maintenance_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    fts_maintenance_parser.add_argument("--writes", type=int, default=2000, help="Записей отдельными транзакциями")
+    fts_maintenance_parser.add_argument("--pages", type=int, default=64, help="Страниц за одну порцию слияния")
+    fts_maintenance_parser.add_argument("--runs", type=int, default=10, help="Количество повторов набора запросов")
+    fts_maintenance_parser.add_argument(
+        "--queries", default="кот,portrait,неон город,sunset", help="Запросы через запятую"
+    )
+    fts_maintenance_parser.set_defaults(handler=bench_fts_maintenance)
+
+    fts_index_parser = subparsers.add_parser(
+        "fts-index", help="Размер FTS5 индекса и префиксные запросы для токенизаторов и prefix="
+    )
+    fts_index_parser.add_argument("--prompts", type=int, default=200000, help="Размер синтетического корпуса")
+    fts_index_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    fts_index_parser.add_argument("--runs", type=int, default=3, help="Количество повторов набора префиксов")
+    fts_index_parser.add_argument("--words", default="портрет,sunset,акварель", help="Слова, набираемые по буквам")
+    fts_index_parser.set_defaults(handler=bench_fts_index)
+
+    fallback_parser = subparsers.add_parser(
+        "fallback-search", help="Резервный поиск подстроки: LIKE против триграммного индекса"
+    )
+    fallback_parser.add_argument("--prompts", type=int, default=500000, help="Размер синтетического корпуса")
+    fallback_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    fallback_parser.add_argument("--runs", type=int, default=10, help="Количество повторов на запрос")
+    fallback_parser.add_argument("--limit", type=int, default=50, help="Размер страницы результатов")
+    fallback_parser.add_argument(
+        "--queries", default="акварельн,ночь город,sunseting,дракона замок", help="Подстроки через запятую"
+    )
+    fallback_parser.set_defaults(handler=bench_fallback_search)
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="Поиск с опечатками на синтетическом корпусе")
+    fuzzy_parser.add_argument("--prompts", type=int, default=200000, help="Размер синтетического корпуса")
+    fuzzy_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    fuzzy_parser.add_argument("--runs", type=int, default=5, help="Количество повторов набора запросов")
+    fuzzy_parser.add_argument("--limit", type=int, default=50, help="Размер страницы результатов")
+    fuzzy_parser.add_argument(
+        "--queries", default="акварль,портерт города,sunest,дркаон,нчоь неон", help="Запросы с опечатками через запятую"
+    )
+    fuzzy_parser.set_defaults(handler=bench_fuzzy)
+
+    suggest_parser = subparsers.add_parser("suggest", help="Задержка подсказок поиска против полного FTS5 поиска")
+    suggest_parser.add_argument("--prompts", type=int, default=200000, help="Размер синтетического корпуса")
+    suggest_parser.add_argument("--db", default="", help="Путь к файлу БД (переиспользуется между запусками)")
+    suggest_parser.add_argument("--runs", type=int, default=5, help="Количество повторов набора префиксов")
+    suggest_parser.add_argument("--limit", type=int, default=10, help="Количество подсказок")
+    suggest_parser.add_argument("--words", default="портрет,sunset,неон", help="Слова, набираемые по буквам")
+    suggest_parser.set_defaults(handler=bench_suggest)
+
+    suggest_check_parser = subparsers.add_parser("suggest-check", help="Проверка подсказок тегов с ё")
+    suggest_check_parser.set_defaults(handler=bench_suggest_check)
+
+    serialization_parser = subparsers.add_parser(
+        "serialization", help="Сериализация списков: ORM + pydantic против FAST_JSON_RESPONSES"
+    )
+    serialization_parser.add_argument("--prompts", type=int, default=500, help="Количество промптов во временной БД")
+    serialization_parser.add_argument("--text-length", type=int, default=10000, help="Длина текста промпта")
+    serialization_parser.add_argument("--runs", type=int, default=50, help="Количество запросов на режим")
+    serialization_parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+    serialization_parser.set_defaults(handler=bench_serialization)
+
+    etag_parser = subparsers.add_parser(
+        "etag-invalidation", help="Проверка смены ETag после пересчета счетчиков тегов другим процессом"
+    )
+    etag_parser.add_argument("--prompts", type=int, default=5, help="Количество промптов с тегом")
+    etag_parser.set_defaults(handler=bench_etag_invalidation)
+
+    args = parser.parse_args()
+    if asyncio.iscoroutinefunction(args.handler):
+        asyncio.run(args.handler(args))
+    else:
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
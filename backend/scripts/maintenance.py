@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Служебные команды обслуживания базы данных
+
+Использование:
+    python scripts/maintenance.py tag-counts
+    python scripts/maintenance.py compact-changes
+    python scripts/maintenance.py fts-init
+    python scripts/maintenance.py fts-stats
+    python scripts/maintenance.py fts-merge [--pages 64] [--slices 0]
+    python scripts/maintenance.py fts-optimize | fts-rebuild | fts-integrity-check
+"""
+
+import argparse
+import os
+import sys
+
+# Добавление пути к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.crud import changes as crud_changes
+from app.crud import tag as crud_tag
+from app.database import SessionLocal
+from app.search.fts5 import init_fts5_table
+from app.search.maintenance import FTS5_MERGE_PAGES, fts5_merge_step, fts5_stats, run_fts5_command
+
+
+def repair_tag_counts(args: argparse.Namespace) -> bool:
+    """Пересчитать prompt_count всех тегов"""
+    db = SessionLocal()
+    try:
+        fixed = crud_tag.recompute_prompt_counts(db)
+        print(f"✅ Счетчики тегов пересчитаны, исправлено: {fixed}")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при пересчете счетчиков тегов: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def compact_changes(args: argparse.Namespace) -> bool:
+    """Сжать журнал изменений (оставить последнюю запись каждой сущности)"""
+    db = SessionLocal()
+    try:
+        removed = crud_changes.compact_change_log(db)
+        print(f"✅ Журнал изменений сжат, удалено записей: {removed}")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при сжатии журнала изменений: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def init_fts(args: argparse.Namespace) -> bool:
+    """Создать FTS5 индекс или пересоздать его, если изменилось определение (FTS5_TOKENIZER)"""
+    db = SessionLocal()
+    try:
+        init_fts5_table(db)
+        print("✅ FTS5 индекс готов")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при инициализации FTS5 индекса: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def print_fts_stats(indexes: list) -> None:
+    """Вывести статистику FTS5 индексов"""
+    for index in indexes:
+        print(
+            f"   {index['table']}: строк {index['rows']}, сегментов {index['segments']}, "
+            f"уровней {index['levels']}, размер {index['size_bytes'] / 1024 / 1024:.1f} МБ"
+        )
+
+
+def show_fts_stats(args: argparse.Namespace) -> bool:
+    """Показать количество сегментов и размер FTS5 индексов"""
+    db = SessionLocal()
+    try:
+        print("📊 FTS5 индексы:")
+        print_fts_stats(fts5_stats(db))
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка при чтении статистики FTS5: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def merge_fts(args: argparse.Namespace) -> bool:
+    """Слить сегменты FTS5 индексов порциями по --pages страниц (до конца или --slices порций)"""
+    db = SessionLocal()
+    try:
+        slices = 0
+        while (not args.slices or slices < args.slices) and fts5_merge_step(db, args.pages):
+            slices += 1
+        print(f"✅ Слияние сегментов FTS5 выполнено, порций: {slices}")
+        print_fts_stats(fts5_stats(db))
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при слиянии сегментов FTS5: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def run_fts_command(args: argparse.Namespace) -> bool:
+    """Выполнить команду FTS5 (rebuild, optimize, integrity-check) для всех индексов"""
+    db = SessionLocal()
+    try:
+        result = run_fts5_command(db, args.fts_command)
+        if not result["ok"]:
+            print(f"❌ FTS5 {args.fts_command}: {result['error']}")
+            return False
+        print(f"✅ FTS5 {args.fts_command} выполнен за {result['duration_ms'] / 1000:.1f} с")
+        print_fts_stats(result["indexes"])
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка FTS5 {args.fts_command}: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def main() -> bool:
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных PromptVault")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tag_counts_parser = subparsers.add_parser("tag-counts", help="Пересчитать количество промптов у тегов")
+    tag_counts_parser.set_defaults(handler=repair_tag_counts)
+
+    compact_parser = subparsers.add_parser("compact-changes", help="Сжать журнал изменений для дельта-синхронизации")
+    compact_parser.set_defaults(handler=compact_changes)
+
+    fts_init_parser = subparsers.add_parser("fts-init", help="Создать или пересоздать FTS5 индекс по настройкам")
+    fts_init_parser.set_defaults(handler=init_fts)
+
+    fts_stats_parser = subparsers.add_parser("fts-stats", help="Количество сегментов и размер FTS5 индексов")
+    fts_stats_parser.set_defaults(handler=show_fts_stats)
+
+    fts_merge_parser = subparsers.add_parser("fts-merge", help="Слить сегменты FTS5 индексов небольшими порциями")
+    fts_merge_parser.add_argument("--pages", type=int, default=FTS5_MERGE_PAGES, help="Страниц за одну порцию")
+    fts_merge_parser.add_argument("--slices", type=int, default=0, help="Максимум порций (0 - пока есть работа)")
+    fts_merge_parser.set_defaults(handler=merge_fts)
+
+    for command, help_text in (
+        ("optimize", "Слить все сегменты FTS5 индексов в один (блокирует запись на время выполнения)"),
+        ("rebuild", "Перестроить FTS5 индексы из таблицы промптов"),
+        ("integrity-check", "Проверить FTS5 индексы на повреждения и соответствие данным"),
+    ):
+        command_parser = subparsers.add_parser(f"fts-{command}", help=help_text)
+        command_parser.set_defaults(handler=run_fts_command, fts_command=command)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -6,7 +6,8 @@
 import asyncio
 import os
 import sys
-from typing import List, Optional, Tuple
+from contextlib import suppress
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 
 # Добавление пути к приложению
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -18,13 +19,17 @@ from telethon.tl.types import Message
 from app.core.config import settings
 from app.core.logging_config import get_logger, setup_logging
 from app.crud import prompt as crud_prompt
-from app.database import SessionLocal
-from app.schemas.prompt import PromptCreate, PromptUpdate
+from app.crud import sync_state as crud_sync_state
+from app.database import SessionLocal, run_db
+from app.schemas.prompt import PromptCreate
 
 # Настройка логирования
 setup_logging(level="INFO")
 logger = get_logger(__name__)
 
+# Пачек в очереди между загрузкой из Telegram и записью в БД (ограничивает память)
+SYNC_QUEUE_SIZE = 4
+
 
 def extract_text_from_message(message: Message) -> Optional[str]:
     """Извлечь текст из сообщения"""
@@ -47,7 +52,6 @@ async def extract_image_url(message: Message, channel_id: int) -> Optional[str]:
         return None
 
     try:
-
         # bot_api_url = f"https://api.telegram.org/bot{settings.bot_token}"
 
         # Получаем информацию о файле через Bot API
@@ -76,56 +80,132 @@ async def get_channel_entity(client: TelegramClient, channel_identifier: int | s
         return None
 
 
-async def process_messages(
-    db, client: TelegramClient, messages: List[Message], channel_id: int
-) -> Tuple[int, int]:
-    """Обработка списка сообщений"""
-    created_count = 0
-    skipped_count = 0
+async def build_prompt(message: Message, channel_id: int) -> Optional[PromptCreate]:
+    """Подготовить промпт из сообщения (None, если в сообщении нет текста)"""
+    text = extract_text_from_message(message)
+    if not text or len(text.strip()) < 1:
+        return None
 
-    for message in messages:
-        text = extract_text_from_message(message)
-        if not text or len(text.strip()) < 1:
-            continue
+    try:
+        return PromptCreate(
+            tg_message_id=message.id,
+            tg_channel_id=channel_id,
+            text=text,
+            # Определение закрепленного сообщения
+            is_pinned=bool(getattr(message, "pinned", False)),
+            image_url=await extract_image_url(message, channel_id),
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при подготовке промпта {message.id}: {e}")
+        return None
 
-        # Определение закрепленного сообщения
-        is_pinned = getattr(message, "pinned", False)
 
-        # Извлечение изображения
-        image_url = await extract_image_url(message, channel_id)
+async def _iterate(items: Iterable[Message]) -> AsyncIterator[Message]:
+    """Асинхронный итератор по уже загруженным сообщениям"""
+    for item in items:
+        yield item
 
-        # Проверка на существование
-        existing = crud_prompt.get_prompt_by_tg_message_id(db, message.id)
-        if existing:
-            # Обновляем, если появилось фото
-            if not existing.image_url and image_url:
-                crud_prompt.update_prompt(db, existing.id, PromptUpdate(image_url=image_url))
-                logger.debug(f"Обновлен промпт {message.id}: добавлено изображение")
-            skipped_count += 1
-            continue
 
-        # Создание промпта
-        try:
-            prompt_create = PromptCreate(
-                tg_message_id=message.id,
-                tg_channel_id=channel_id,
-                text=text,
-                is_pinned=is_pinned,
-                image_url=image_url,
-            )
+async def produce_batches(
+    client: TelegramClient,
+    entity: Entity,
+    queue: asyncio.Queue,
+    batch_size: int,
+    min_id: int = 0,
+    max_id: int = 0,
+    limit: Optional[int] = None,
+):
+    """
+    Загрузка сообщений из Telegram пачками (производитель)
 
-            crud_prompt.create_prompt(db, prompt_create)
-            created_count += 1
-            logger.debug(f"Создан промпт {'с изображением' if image_url else ''}: {message.id}")
+    В очередь кладутся кортежи (промпты, ID последнего просмотренного сообщения или None), в конце - None.
+    Сообщения идут от старых к новым, поэтому после записи пачки отметку синхронизации
+    можно сдвинуть до последнего сообщения пачки без пропусков.
 
-        except Exception as e:
-            logger.error(f"Ошибка при создании промпта {message.id}: {e}")
+    С limit загружаются limit самых новых сообщений диапазона (в памяти, затем от старых к новым).
+    Если в диапазоне остались более старые сообщения, отметка не сдвигается: иначе они были бы пропущены.
+    """
+    batch: List[PromptCreate] = []
+    last_message_id = 0
+
+    if limit is None:
+        messages = client.iter_messages(entity, min_id=min_id, max_id=max_id, reverse=True)
+        complete = True
+    else:
+        newest = [message async for message in client.iter_messages(entity, limit=limit, min_id=min_id, max_id=max_id)]
+        messages = _iterate(reversed(newest))
+        complete = len(newest) < limit
+        if not complete:
+            logger.warning(f"Загружаются {limit} самых новых сообщений, отметка синхронизации не сдвигается")
 
-    return created_count, skipped_count
+    try:
+        async for message in messages:
+            if not isinstance(message, Message):
+                continue
+            last_message_id = message.id
+            prompt = await build_prompt(message, entity.id)
+            if prompt:
+                batch.append(prompt)
+            if len(batch) >= batch_size:
+                await queue.put((batch, last_message_id if complete else None))
+                batch = []
+        if last_message_id:
+            await queue.put((batch, last_message_id if complete else None))
+    except Exception:
+        await queue.put(None)
+        raise
+    await queue.put(None)
+
+
+def process_messages(
+    db, prompts: List[PromptCreate], channel_id: int, last_message_id: Optional[int]
+) -> Tuple[int, int, int]:
+    """
+    Запись пачки промптов в БД
 
+    Существование проверяется одним запросом на пачку, запись - одной транзакцией.
+    Отметка синхронизации сдвигается после записи (если last_message_id задан): при сбое
+    между ними пачка будет обработана повторно, что безопасно, так как запись идемпотентна.
+    """
+    result = crud_prompt.bulk_upsert_prompts(db, prompts, batch_size=max(len(prompts), 1))
+    if last_message_id is not None:
+        crud_sync_state.advance_last_message_id(db, channel_id, last_message_id)
+    return result
+
+
+async def consume_batches(db, queue: asyncio.Queue, channel_id: int) -> Tuple[int, int, int]:
+    """Запись пачек в БД и сдвиг отметки синхронизации (потребитель)"""
+    created = 0
+    updated = 0
+    skipped = 0
+
+    while (item := await queue.get()) is not None:
+        prompts, last_message_id = item
+        batch_created, batch_updated, batch_skipped = await run_db(
+            process_messages, db, prompts, channel_id, last_message_id
+        )
+        created += batch_created
+        updated += batch_updated
+        skipped += batch_skipped
+        position = f" до сообщения {last_message_id}" if last_message_id is not None else ""
+        logger.info(f"Записана пачка{position}: всего создано {created}, обновлено {updated}, пропущено {skipped}")
+
+    return created, updated, skipped
+
+
+async def sync_channel(
+    limit: Optional[int] = None,
+    offset_id: int = 0,
+    full: bool = False,
+    batch_size: int = crud_prompt.BULK_BATCH_SIZE,
+):
+    """
+    Синхронизировать сообщения из канала
 
-async def sync_channel(limit: Optional[int] = None, offset_id: int = 0):
-    """Синхронизировать сообщения из канала"""
+    По умолчанию загружаются только сообщения новее сохраненной отметки (last_message_id).
+    В режиме full канал просматривается целиком. Загрузка и запись идут параллельно через
+    ограниченную очередь, поэтому память не зависит от размера канала.
+    """
     # Проверка настроек
     if not settings.telegram_api_id or not settings.telegram_api_hash:
         logger.error("TELEGRAM_API_ID/HASH должны быть установлены в .env")
@@ -155,17 +235,26 @@ async def sync_channel(limit: Optional[int] = None, offset_id: int = 0):
         if not entity:
             return
 
-        logger.info(f"Загрузка сообщений из канала (лимит: {limit or 'все'})...")
+        min_id = 0 if full else await run_db(crud_sync_state.get_last_message_id, db, entity.id)
+        logger.info(
+            f"Загрузка сообщений из канала (режим: {'полный' if full else 'инкрементальный'}, "
+            f"после сообщения {min_id}, лимит: {limit or 'все'})..."
+        )
 
-        messages = []
-        async for message in client.iter_messages(entity, limit=limit, offset_id=offset_id):
-            if isinstance(message, Message):
-                messages.append(message)
-
-        logger.info(f"Загружено {len(messages)} сообщений")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SYNC_QUEUE_SIZE)
+        producer = asyncio.create_task(
+            produce_batches(client, entity, queue, batch_size, min_id=min_id, max_id=offset_id, limit=limit)
+        )
+        try:
+            created, updated, skipped = await consume_batches(db, queue, entity.id)
+        except BaseException:
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+            raise
+        await producer
 
-        created, skipped = await process_messages(db, client, messages, entity.id)
-        logger.info(f"Синхронизация завершена: создано {created}, пропущено {skipped}")
+        logger.info(f"Синхронизация завершена: создано {created}, обновлено {updated}, пропущено {skipped}")
 
     except Exception as e:
         logger.error(f"Ошибка при синхронизации: {e}", extra={"error": str(e)})
@@ -179,11 +268,17 @@ async def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Синхронизация сообщений из Telegram канала")
-    parser.add_argument("--limit", type=int, help="Максимальное количество сообщений")
-    parser.add_argument("--offset-id", type=int, default=0, help="ID сообщения для начала загрузки")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="Загрузить только столько самых новых сообщений (отметка не сдвигается, если остались более старые)",
+    )
+    parser.add_argument("--offset-id", type=int, default=0, help="Загружать только сообщения старше этого ID")
+    parser.add_argument("--full", action="store_true", help="Полная синхронизация без учета сохраненной отметки")
+    parser.add_argument("--batch-size", type=int, default=crud_prompt.BULK_BATCH_SIZE, help="Размер пачки записи в БД")
 
     args = parser.parse_args()
-    await sync_channel(limit=args.limit, offset_id=args.offset_id)
+    await sync_channel(limit=args.limit, offset_id=args.offset_id, full=args.full, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+"""
+Общие фикстуры тестов: временная БД SQLite с FTS5 индексами
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 (регистрация моделей в Base.metadata)
+from app.database import Base
+from app.search.fts5 import init_fts5_table
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    init_fts5_table(session)
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,86 @@
+"""
+Потоковое чтение экспорта Telegram Desktop (TelegramExportReader)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.utils.import_stream import TelegramExportReader
+
+
+class CountingDecoder(json.JSONDecoder):
+    """Декодер, считающий вызовы raw_decode"""
+
+    calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+async def split(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def read(data: bytes, size: int, reader: TelegramExportReader) -> list:
+    async def collect():
+        return [message async for message in reader.messages(split(data, size))]
+
+    return asyncio.run(collect())
+
+
+def test_large_message_decoded_once():
+    # Форматированный текст: во вложенных объектах "}" встречается почти в каждой части
+    text = [{"type": "bold", "text": "жирный } ]"}, 'обычный \\ " текст'] * 2000
+    message = {"id": 7, "type": "message", "text": text}
+    data = json.dumps({"id": -100123, "messages": [message]}, ensure_ascii=False).encode("utf-8")
+
+    reader = TelegramExportReader()
+    reader._decoder = CountingDecoder()
+    assert read(data, 100, reader) == [message]
+    assert reader._decoder.calls == 1
+    assert reader.channel_id == -100123
+
+
+def test_messages_split_anywhere():
+    messages = [{"id": i, "type": "message", "text": f"сообщение {i} ]}}"} for i in range(20)]
+    data = json.dumps({"id": 1, "messages": messages, "other": [1]}, indent=1, ensure_ascii=False).encode("utf-8")
+    for size in (1, 2, 3, 5, 64):
+        assert read(data, size, TelegramExportReader()) == messages
+
+
+def test_truncated_export():
+    data = json.dumps({"messages": [{"id": 1}, {"id": 2}]}).encode("utf-8")
+    with pytest.raises(ValueError):
+        read(data[:-3], 4, TelegramExportReader())
+
+
+def test_message_too_large():
+    data = json.dumps({"messages": [{"id": 1, "text": "x" * 1000}]}).encode("utf-8")
+    with pytest.raises(ValueError):
+        read(data, 16, TelegramExportReader(max_buffer=100))
+
+
+def test_corrupt_message_fails_fast():
+    # Поврежденный элемент уже закрыт - ошибка сразу, без ожидания конца потока
+    messages = ", ".join(['{"id": 1}', '{"id": 2, "text": oops}', *['{"id": 3}'] * 500])
+    data = f'{{"id": 1, "messages": [{messages}]}}'.encode("utf-8")
+    consumed = []
+    received = []
+
+    async def chunks():
+        async for chunk in split(data, 8):
+            consumed.append(chunk)
+            yield chunk
+
+    async def collect():
+        async for message in TelegramExportReader().messages(chunks()):
+            received.append(message)
+
+    with pytest.raises(ValueError, match="сообщение 2"):
+        asyncio.run(collect())
+    assert received == [{"id": 1}]
+    assert len(consumed) < len(data) // 8 // 2
@@ -0,0 +1,103 @@
+"""
+Количество SQL запросов на списочных путях (отсутствие N+1)
+
+Количество запросов не должно зависеть от размера страницы и не должно превышать QUERY_BUDGET.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import prompt as crud_prompt
+from app.crud import tag as crud_tag
+from app.crud.projection import PromptProjection
+from app.models.prompt import Prompt
+from app.models.tag import Tag
+from app.schemas.prompt import PromptResponse
+from app.schemas.tag import TagWithCountResponse
+from app.search.fts5 import search_fallback
+
+# Максимум SQL запросов на один список
+QUERY_BUDGET = 5
+
+PAGE_SIZES = (1, 20, 100)
+PROMPTS = 150
+TAGS = 5
+
+
+@pytest.fixture
+def tags(db):
+    tags = [Tag(name=f"тег {i}", slug=f"tag-{i}", prompt_count=2 * PROMPTS // TAGS) for i in range(TAGS)]
+    db.add_all(tags)
+    for i in range(PROMPTS):
+        db.add(
+            Prompt(
+                tg_message_id=i + 1,
+                tg_channel_id=1,
+                text=f"Промпт {i} про котов",
+                normalized_text=f"промпт {i} про котов",
+                is_pinned=i % 10 == 0,
+                tags=[tags[i % TAGS], tags[(i + 1) % TAGS]],
+            )
+        )
+    db.commit()
+    return tags
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def serialize(prompts_and_total):
+    prompts, _ = prompts_and_total
+    return [PromptResponse.model_validate(prompt) for prompt in prompts]
+
+
+LIST_PATHS = {
+    "prompts": lambda db, tags, limit: serialize(crud_prompt.get_prompts(db, limit=limit)),
+    "prompts?tags": lambda db, tags, limit: serialize(crud_prompt.get_prompts(db, limit=limit, tag_ids=[tags[0].id])),
+    "prompts?pinned": lambda db, tags, limit: serialize(crud_prompt.get_prompts(db, limit=limit, pinned_only=True)),
+    "search": lambda db, tags, limit: serialize(crud_prompt.get_prompts(db, limit=limit, search="котов")),
+    "search_fallback": lambda db, tags, limit: serialize(search_fallback(db, query="котов", limit=limit)),
+    "tags/cloud": lambda db, tags, limit: [
+        TagWithCountResponse.model_validate(tag) for tag in crud_tag.get_tags_with_count(db, limit=limit)
+    ],
+}
+
+
+@pytest.mark.parametrize("path", LIST_PATHS)
+def test_list_query_budget(db, tags, statements, path):
+    counts = []
+    for limit in PAGE_SIZES:
+        db.expire_all()
+        statements.clear()
+        LIST_PATHS[path](db, tags, limit)
+        counts.append(len(statements))
+    assert max(counts) <= QUERY_BUDGET, counts
+    assert len(set(counts)) == 1, f"Количество запросов зависит от размера страницы: {counts}"
+
+
+@pytest.mark.parametrize("path", ["prompts", "search", "search_fallback"])
+@pytest.mark.parametrize("projection", [None, PromptProjection(["id", "text"])], ids=["orm", "fields"])
+def test_multi_tag_filter_without_duplicates(db, tags, path, projection):
+    # Промпт с двумя тегами из фильтра не повторяется, общее количество совпадает с числом промптов
+    tag_ids = [tags[0].id, tags[1].id]
+    expected = {prompt.id for prompt in db.query(Prompt).filter(Prompt.tags.any(Tag.id.in_(tag_ids)))}
+    filters = {"limit": PROMPTS, "tag_ids": tag_ids, "projection": projection}
+    if path == "search_fallback":
+        rows, total = search_fallback(db, query="котов", **filters)
+    else:
+        rows, total = crud_prompt.get_prompts(db, search="котов" if path == "search" else None, **filters)
+
+    ids = [row.id for row in rows]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+    assert total == len(expected)
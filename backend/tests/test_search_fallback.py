@@ -0,0 +1,72 @@
+"""
+Резервный поиск подстроки по триграммному индексу (search_fallback)
+"""
+
+import pytest
+
+from app.crud.projection import PromptProjection
+from app.models.prompt import Prompt
+from app.search.fts5 import search_fallback, trigram_fuzzy_query
+from app.utils.text import normalize_text
+
+TEXTS = (
+    "Портрет девушки в стиле акварели",
+    "Кот в космическом скафандре",
+    "Пейзаж с горами на закате",
+)
+
+
+@pytest.fixture
+def prompts(db):
+    for i, text in enumerate(TEXTS, start=1):
+        db.add(Prompt(tg_message_id=i, tg_channel_id=1, text=text, normalized_text=normalize_text(text)))
+    db.commit()
+
+
+def texts(result):
+    prompts, _ = result
+    return [prompt.text for prompt in prompts]
+
+
+def test_substring(db, prompts):
+    assert texts(search_fallback(db, "космическ")) == ["Кот в космическом скафандре"]
+
+
+def test_one_character_typo(db, prompts):
+    prompts, total = search_fallback(db, "акверели")
+    assert [prompt.text for prompt in prompts] == ["Портрет девушки в стиле акварели"]
+    assert total == 1
+
+
+def test_fuzzy_ranked_by_trigram_overlap(db, prompts):
+    # Больше всего общих триграмм у опечатки со скафандром
+    assert texts(search_fallback(db, "скафондре", with_total=False))[0] == "Кот в космическом скафандре"
+
+
+def test_fuzzy_not_used_with_exact_matches(db, prompts):
+    assert texts(search_fallback(db, "закат")) == ["Пейзаж с горами на закате"]
+
+
+def test_unrelated_query_finds_nothing(db, prompts):
+    assert search_fallback(db, "трактор") == ([], 0)
+
+
+def test_one_shared_trigram_is_not_a_match(db, prompts):
+    # "закупка" и "закате" делят только триграмму "зак"
+    assert search_fallback(db, "закупка") == ([], 0)
+
+
+def test_fuzzy_threshold():
+    phrases, min_overlap = trigram_fuzzy_query("акверели")
+    # Половина из 6 триграмм
+    assert len(phrases) == 6
+    assert min_overlap == 3
+    assert trigram_fuzzy_query("закупка")[1] == 3
+    # Из одной триграммы две не набрать - нечеткий поиск не выполняется
+    assert trigram_fuzzy_query("кот") is None
+
+
+def test_fuzzy_with_projection(db, prompts):
+    rows, total = search_fallback(db, "акверели", projection=PromptProjection(["id", "text"]))
+    assert [row.text for row in rows] == ["Портрет девушки в стиле акварели"]
+    assert total == 1
@@ -0,0 +1,27 @@
+"""
+Подсказки поиска по мере ввода (SuggestionIndex)
+"""
+
+from app.models.prompt import Prompt
+from app.search.suggest import SuggestionIndex, load_suggestion_index
+from app.utils.text import normalize_text
+
+
+def test_yo_variants_are_one_suggestion(db):
+    for i, text in enumerate(("Рисунок котёнка", "Два котёнка на окне"), start=1):
+        db.add(Prompt(tg_message_id=i, tg_channel_id=1, text=text, normalized_text=normalize_text(text)))
+    db.commit()
+
+    index = load_suggestion_index(db)
+    for prefix in ("ко", "кот"):
+        assert [s for s in index.complete(prefix) if s["text"].startswith("кот")] == [
+            {"text": "котенка", "type": "term", "count": 2}
+        ]
+
+
+def test_folded_terms_keep_largest_count():
+    index = SuggestionIndex([("ёлка", 1), ("елка", 3), ("ель", 2)], [])
+    assert index.complete("ел") == [
+        {"text": "елка", "type": "term", "count": 3},
+        {"text": "ель", "type": "term", "count": 2},
+    ]
@@ -15,6 +15,8 @@ module.exports = {
       args: 'app.main:app --host 0.0.0.0 --port 8000',
       cwd: '/home/your-user/projects/promptvault/backend',  // Измените на ваш путь
       interpreter: 'python3',
+      // Несколько воркеров: добавьте в args "--workers N" и включите общий кэш (CACHE_BACKEND=sqlite),
+      // чтобы горячие результаты и их сброс после записи были общими для всех воркеров
       env: {
         ENVIRONMENT: 'production',
       },